@@ -34,6 +34,13 @@ def create_app():
             response.headers.add('Access-Control-Max-Age', '86400')
             return response
     
+    # Attribute AI usage recorded during the request to the signed-in user
+    from app.services.telemetry import bind_request_user
+    
+    @app.before_request
+    def bind_telemetry_user():
+        bind_request_user()
+    
     # Configure CORS after JWT
     CORS(app, 
          resources={r"/api/*": {"origins": "http://localhost:3000"}},
@@ -71,6 +78,14 @@ def create_app():
     from app.controllers.settings import settings_bp
     from app.controllers.advanced_analysis import advanced_analysis_bp
     from app.controllers.translation import translation_bp
+    from app.controllers.telemetry import telemetry_bp
+    from app.services.job_queue import setup_job_indexes, start_extraction_workers
+    from app.services.file_storage import setup_storage_indexes
+    from app.services.extraction_cache import setup_extraction_cache_indexes
+    from app.services.content_store import setup_content_indexes
+    from app.services.llm_cache import setup_llm_cache_indexes
+    from app.services.single_flight import setup_single_flight_indexes
+    from app.services.telemetry import setup_telemetry_indexes, start_telemetry_flusher
 
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(documents_bp, url_prefix='/api/documents')
@@ -79,11 +94,25 @@ def create_app():
     app.register_blueprint(settings_bp, url_prefix='/api/settings') 
     app.register_blueprint(advanced_analysis_bp, url_prefix='/api/advanced-analysis')
     app.register_blueprint(translation_bp, url_prefix='/api/translation')
+    app.register_blueprint(telemetry_bp)  # Serves /metrics and /api/telemetry routes
     # The search blueprint already has /api/search prefix in its routes
     
     # Set up MongoDB indexes for search on application startup
     with app.app_context():
         setup_search_indexes()
+        setup_job_indexes()
+        setup_storage_indexes()
+        setup_extraction_cache_indexes()
+        setup_content_indexes()
+        setup_llm_cache_indexes()
+        setup_single_flight_indexes()
+        setup_telemetry_indexes()
+    
+    # Start background workers that drain the text extraction queue
+    start_extraction_workers()
+    
+    # Start writing AI usage records to MongoDB in batches
+    start_telemetry_flusher()
     
     # Add a simple test route
     @app.route('/api/test', methods=['GET'])
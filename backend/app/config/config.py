@@ -5,4 +5,88 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # MongoDB Configuration
-MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/legalassistant')
\ No newline at end of file
+MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/legalassistant')
+
+# Background text extraction workers
+EXTRACTION_WORKERS = int(os.getenv('EXTRACTION_WORKERS', '2'))
+EXTRACTION_POLL_INTERVAL = float(os.getenv('EXTRACTION_POLL_INTERVAL', '1.0'))  # seconds
+EXTRACTION_JOB_LEASE_SECONDS = int(os.getenv('EXTRACTION_JOB_LEASE_SECONDS', '300'))
+EXTRACTION_MAX_ATTEMPTS = int(os.getenv('EXTRACTION_MAX_ATTEMPTS', '3'))
+
+# Page-parallel PDF extraction
+PDF_EXTRACTION_PROCESSES = int(os.getenv('PDF_EXTRACTION_PROCESSES', str(os.cpu_count() or 1)))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '24'))
+
+# Extraction result cache
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv('EXTRACTION_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+
+# Batch uploads
+BATCH_MAX_FILES = int(os.getenv('BATCH_MAX_FILES', '500'))
+BATCH_MAX_MEMBER_BYTES = int(os.getenv('BATCH_MAX_MEMBER_BYTES', str(100 * 1024 * 1024)))
+
+# Compression of stored text
+TEXT_COMPRESSION_LEVEL = int(os.getenv('TEXT_COMPRESSION_LEVEL', '6'))
+TEXT_COMPRESSION_MIN_CHARS = int(os.getenv('TEXT_COMPRESSION_MIN_CHARS', '1024'))
+
+# Cache of OpenAI responses
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv('LLM_CACHE_MEMORY_ENTRIES', '512'))
+LLM_CACHE_TTL_SECONDS = int(os.getenv('LLM_CACHE_TTL_SECONDS', str(7 * 24 * 60 * 60)))
+
+# Shared async OpenAI client
+# Point at another OpenAI-compatible server, e.g. loadtest/stub_server.py
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL') or None
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))
+LLM_MAX_CONNECTIONS = int(os.getenv('LLM_MAX_CONNECTIONS', '20'))
+LLM_REQUEST_TIMEOUT = float(os.getenv('LLM_REQUEST_TIMEOUT', '60'))  # seconds
+
+# Shared OpenAI rate limits (per model, across all workers)
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+OPENAI_RPM_LIMIT = int(os.getenv('OPENAI_RPM_LIMIT', '500'))
+OPENAI_TPM_LIMIT = int(os.getenv('OPENAI_TPM_LIMIT', '200000'))
+RATE_LIMIT_BURST_SECONDS = float(os.getenv('RATE_LIMIT_BURST_SECONDS', '10'))
+RATE_LIMIT_JITTER_SECONDS = float(os.getenv('RATE_LIMIT_JITTER_SECONDS', '0.25'))
+
+# Sharing of identical in-flight OpenAI calls between workers
+SINGLE_FLIGHT_LEASE_SECONDS = int(os.getenv('SINGLE_FLIGHT_LEASE_SECONDS', '300'))
+SINGLE_FLIGHT_POLL_INTERVAL = float(os.getenv('SINGLE_FLIGHT_POLL_INTERVAL', '0.25'))  # seconds
+
+# AI usage telemetry
+TELEMETRY_ENABLED = os.getenv('TELEMETRY_ENABLED', 'true').lower() == 'true'
+TELEMETRY_BATCH_SIZE = int(os.getenv('TELEMETRY_BATCH_SIZE', '100'))
+TELEMETRY_FLUSH_SECONDS = float(os.getenv('TELEMETRY_FLUSH_SECONDS', '5'))
+TELEMETRY_MAX_BUFFER = int(os.getenv('TELEMETRY_MAX_BUFFER', '10000'))
+TELEMETRY_RETENTION_DAYS = int(os.getenv('TELEMETRY_RETENTION_DAYS', '90'))
+# Bearer token required to scrape /metrics; unset leaves it open
+METRICS_TOKEN = os.getenv('METRICS_TOKEN') or None
+
+# Circuit breaker and hedged requests for OpenAI calls (per model, per worker)
+CIRCUIT_BREAKER_ENABLED = os.getenv('CIRCUIT_BREAKER_ENABLED', 'true').lower() == 'true'
+CIRCUIT_WINDOW_SECONDS = float(os.getenv('CIRCUIT_WINDOW_SECONDS', '60'))
+CIRCUIT_MIN_CALLS = int(os.getenv('CIRCUIT_MIN_CALLS', '10'))
+CIRCUIT_ERROR_THRESHOLD = float(os.getenv('CIRCUIT_ERROR_THRESHOLD', '0.5'))
+CIRCUIT_OPEN_SECONDS = float(os.getenv('CIRCUIT_OPEN_SECONDS', '30'))
+LLM_HEDGE_ENABLED = os.getenv('LLM_HEDGE_ENABLED', 'false').lower() == 'true'
+LLM_HEDGE_PERCENTILE = float(os.getenv('LLM_HEDGE_PERCENTILE', '0.95'))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv('LLM_HEDGE_MIN_SAMPLES', '20'))
+LLM_HEDGE_MAX_SHARE = float(os.getenv('LLM_HEDGE_MAX_SHARE', '0.1'))  # of requests sent
+
+# Local document category classifier (python -m app.services.category_classifier train)
+CATEGORY_CLASSIFIER_ENABLED = os.getenv('CATEGORY_CLASSIFIER_ENABLED', 'true').lower() == 'true'
+# Below this confidence the LLM is asked instead
+CATEGORY_CLASSIFIER_THRESHOLD = float(os.getenv('CATEGORY_CLASSIFIER_THRESHOLD', '0.8'))
+CATEGORY_CLASSIFIER_MIN_DOCUMENTS = int(os.getenv('CATEGORY_CLASSIFIER_MIN_DOCUMENTS', '50'))
+CATEGORY_CLASSIFIER_TEXT_CHARS = int(os.getenv('CATEGORY_CLASSIFIER_TEXT_CHARS', '6000'))
+CATEGORY_CLASSIFIER_MAX_FEATURES = int(os.getenv('CATEGORY_CLASSIFIER_MAX_FEATURES', '20000'))
+CATEGORY_CLASSIFIER_RELOAD_SECONDS = float(os.getenv('CATEGORY_CLASSIFIER_RELOAD_SECONDS', '60'))
+
+# Rule-based key information extraction; fields found with less confidence are asked of the LLM
+KEY_INFO_MIN_CONFIDENCE = float(os.getenv('KEY_INFO_MIN_CONFIDENCE', '0.7'))
+
+# Map-reduce summaries of documents too long for one prompt
+SUMMARY_MAP_REDUCE_ENABLED = os.getenv('SUMMARY_MAP_REDUCE_ENABLED', 'true').lower() == 'true'
+SUMMARY_CHUNK_TOKENS = int(os.getenv('SUMMARY_CHUNK_TOKENS', '3000'))
+SUMMARY_MAP_CONCURRENCY = int(os.getenv('SUMMARY_MAP_CONCURRENCY', '4'))  # chunk calls in flight per document
+SUMMARY_REDUCE_INPUT_TOKENS = int(os.getenv('SUMMARY_REDUCE_INPUT_TOKENS', '6000'))
+# Longer documents get a summary of their most relevant passages only
+SUMMARY_MAP_REDUCE_MAX_TOKENS = int(os.getenv('SUMMARY_MAP_REDUCE_MAX_TOKENS', '250000'))
@@ -5,6 +5,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from bson import ObjectId
 from app.config.database import get_database
 from app.services.advanced_legal_ai import AdvancedLegalAnalysis
+from app.utils.sse import sse_response
 from datetime import datetime
 
 advanced_analysis_bp = Blueprint('advanced_analysis', __name__)
@@ -32,6 +33,19 @@ def assess_contract_risks(document_id):
     except Exception as e:
         return jsonify({"message": f"Error during risk assessment: {str(e)}"}), 500
 
+@advanced_analysis_bp.route('/risk-assessment/<document_id>/stream', methods=['POST'])
+@jwt_required()
+def stream_contract_risks(document_id):
+    """Assess legal risks in a contract, streaming the response as server-sent events"""
+    user_id = get_jwt_identity()
+    
+    # Verify document access
+    document = db.documents.find_one({"_id": ObjectId(document_id), "user_id": user_id}, {"_id": 1})
+    if not document:
+        return jsonify({"message": "Document not found or access denied"}), 404
+    
+    return sse_response(legal_ai.stream_contract_risks(document_id))
+
 @advanced_analysis_bp.route('/clause-recommendations/<document_id>', methods=['POST'])
 @jwt_required()
 def recommend_clauses(document_id):
@@ -3,15 +3,22 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask_cors import cross_origin
 from werkzeug.utils import secure_filename
 import os
+import zipfile
 from app.config.database import get_database
+from app.config.config import BATCH_MAX_FILES, BATCH_MAX_MEMBER_BYTES
 from bson import ObjectId
 from datetime import datetime
-from app.services.document_processor import extract_text_from_document
+from app.services.job_queue import enqueue_extraction, get_job, serialize_job
+from app.services.file_storage import store_upload, release_reference, find_extracted_copy
+from app.services.content_store import (
+    METADATA_PROJECTION, load_content, copy_content, delete_content
+)
+from app.services.segmentation import load_segments
 
 try:
-    from app.services.ai_processor import summarize_document, extract_key_info
+    from app.services.ai_processor import summarize_document, extract_key_info, analyze_document
 except ImportError:
-    from app.services.ai_processor import summarize_document, extract_key_info
+    from app.services.ai_processor import summarize_document, extract_key_info, analyze_document
 
 from ..services.comparison_service import DocumentComparisonService
 
@@ -50,17 +57,40 @@ def upload_document():
     # Get category from form data
     category = request.form.get('category', 'Uncategorized')
     
-    # Save file
-    filename = secure_filename(file.filename)
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    new_filename = f"{timestamp}_{filename}"
-    file_path = os.path.join(UPLOAD_FOLDER, new_filename)
-    file.save(file_path)
+    entry = _ingest_file(file.stream, secure_filename(file.filename), user_id, category)
+    
+    if entry["status"] == "extracted":
+        return jsonify({
+            "message": "Document uploaded successfully",
+            "document_id": entry["document_id"],
+            "status": "extracted",
+            "deduplicated": True
+        }), 201
+    
+    return jsonify({
+        "message": "Document uploaded, text extraction queued",
+        "document_id": entry["document_id"],
+        "job_id": entry["job_id"],
+        "status": "queued",
+        "status_url": entry["status_url"]
+    }), 202
+
+def _ingest_file(stream, filename, user_id, category):
+    """
+    Store an uploaded file, record its document and queue extraction.
+
+    Returns:
+        dict: Manifest entry with the document id and extraction status
+    """
+    # Save file once per content digest
+    stored = store_upload(stream)
     
     # Save document metadata to database
     document = {
         "name": filename,
-        "file_path": file_path,
+        "file_path": stored["path"],
+        "file_digest": stored["digest"],
+        "file_size": stored["size"],
         "upload_date": datetime.now(),
         "user_id": user_id,
         "file_type": filename.rsplit('.', 1)[1].lower(),
@@ -68,18 +98,141 @@ def upload_document():
         "processed": False,
         "category": category
     }
+    if category and category != 'Uncategorized':
+        # Chosen by the user; only these train the category classifier
+        document["category_source"] = "user"
+    
+    # Identical content has already been extracted; reuse its text
+    existing = None if stored["is_new"] else find_extracted_copy(stored["digest"])
+    if existing:
+        source_id = existing.pop("_id")
+        document.update(existing)
+        document.update({"status": "extracted", "processed": True})
     
-    result = db.documents.insert_one(document)
-    document_id = result.inserted_id
+    # The blob reference taken above belongs to this document; give it back
+    # if the document can't be recorded, or the blob is never collected
+    document_id = None
+    try:
+        result = db.documents.insert_one(document)
+        document_id = result.inserted_id
+        
+        if existing:
+            copy_content(source_id, document_id, user_id)
+            return {"name": filename, "document_id": str(document_id), "status": "extracted"}
+        
+        # Hand text extraction to the background workers
+        job_id = enqueue_extraction(document_id, user_id)
+    except Exception:
+        if document_id is not None:
+            db.documents.delete_one({"_id": document_id})
+            delete_content(document_id)
+        release_reference(stored["digest"])
+        raise
     
-    # Extract text asynchronously (in a real app, you'd use a task queue)
-    # For now, we'll do it synchronously
-    extract_text_from_document(document_id)
+    return {
+        "name": filename,
+        "document_id": str(document_id),
+        "job_id": str(job_id),
+        "status": "queued",
+        "status_url": f"/api/documents/jobs/{job_id}"
+    }
+
+def _ingest_batch_entry(stream, original_name, user_id, category):
+    """Ingest one file of a batch, reporting problems in the manifest instead of failing the batch"""
+    filename = secure_filename(original_name)
+    if not filename or not allowed_file(filename):
+        return {"name": original_name, "status": "rejected",
+                "error": f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"}
+    try:
+        return _ingest_file(stream, filename, user_id, category)
+    except Exception as e:
+        print(f"Error ingesting {original_name}: {str(e)}")
+        return {"name": original_name, "status": "failed", "error": str(e)}
+
+def _ingest_archive(stream, user_id, category):
+    """Ingest every supported member of a ZIP archive, streaming each straight into storage"""
+    with zipfile.ZipFile(stream) as archive:
+        members = [
+            member for member in archive.infolist()
+            if not member.is_dir()
+            and not member.filename.startswith('__MACOSX/')
+            and not os.path.basename(member.filename).startswith('.')
+        ]
+        if len(members) > BATCH_MAX_FILES:
+            raise ValueError(f"Archive contains {len(members)} files; the limit is {BATCH_MAX_FILES}")
+        
+        manifest = []
+        for member in members:
+            name = os.path.basename(member.filename)
+            # The declared size bounds how much ZipExtFile will inflate
+            if member.file_size > BATCH_MAX_MEMBER_BYTES:
+                manifest.append({"name": name, "status": "rejected", "error": "File too large"})
+                continue
+            with archive.open(member) as member_stream:
+                manifest.append(_ingest_batch_entry(member_stream, name, user_id, category))
+        return manifest
+
+@documents_bp.route('/batch', methods=['POST'])
+@jwt_required()
+def upload_batch():
+    """
+    Upload many documents in one request.
+    
+    Accepts either repeated 'files' parts or a single ZIP archive in the
+    'archive' part (a lone .zip sent as 'files' also works). Extraction of
+    every accepted file is queued for the background workers, which
+    process them concurrently.
+    """
+    user_id = get_jwt_identity()
+    category = request.form.get('category', 'Uncategorized')
+    
+    archive = request.files.get('archive')
+    files = [f for f in request.files.getlist('files') if f.filename]
+    if archive is None and len(files) == 1 and files[0].filename.lower().endswith('.zip'):
+        archive, files = files[0], []
+    
+    if archive is None and not files:
+        return jsonify({"message": "No files provided"}), 400
+    
+    if archive is not None:
+        try:
+            manifest = _ingest_archive(archive.stream, user_id, category)
+        except zipfile.BadZipFile:
+            return jsonify({"message": "Archive is not a valid ZIP file"}), 400
+        except ValueError as e:
+            return jsonify({"message": str(e)}), 400
+    else:
+        if len(files) > BATCH_MAX_FILES:
+            return jsonify({"message": f"Too many files; the limit is {BATCH_MAX_FILES}"}), 400
+        manifest = [
+            _ingest_batch_entry(file.stream, file.filename, user_id, category)
+            for file in files
+        ]
+    
+    summary = {}
+    for entry in manifest:
+        summary[entry["status"]] = summary.get(entry["status"], 0) + 1
     
     return jsonify({
-        "message": "Document uploaded successfully",
-        "document_id": str(document_id)
-    }), 201
+        "message": f"Processed {len(manifest)} files",
+        "documents": manifest,
+        "summary": summary
+    }), 202
+
+@documents_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_extraction_job(job_id):
+    """Report the progress of a background extraction job"""
+    try:
+        user_id = get_jwt_identity()
+        
+        job = get_job(ObjectId(job_id), user_id)
+        if not job:
+            return jsonify({"message": "Job not found"}), 404
+        
+        return jsonify({"job": serialize_job(job)}), 200
+    except Exception as e:
+        return jsonify({"message": f"Error retrieving job: {str(e)}"}), 500
 
 @documents_bp.route('/', methods=['GET'])
 @jwt_required()
@@ -107,7 +260,8 @@ def get_documents():
         print(f"JWT identity (user_id): {user_id}")
         
         # Get documents for the current user
-        documents = list(db.documents.find({"user_id": user_id}))
+        # Text and analysis payloads stay in the content store
+        documents = list(db.documents.find({"user_id": user_id}, METADATA_PROJECTION))
         print(f"Found {len(documents)} documents for user")
         
         # Convert ObjectId to string for JSON serialization
@@ -186,7 +340,13 @@ def extract_document_info(document_id):
         if not key_info:
             return jsonify({"message": "Failed to extract key information"}), 500
         
-        return jsonify({"message": "Key information extracted successfully", "key_info": key_info}), 200
+        # Confidence of each field found by patterns; null for fields the model filled in
+        extracted = db.documents.find_one({"_id": ObjectId(document_id)}, {"key_info_confidence": 1})
+        return jsonify({
+            "message": "Key information extracted successfully",
+            "key_info": key_info,
+            "confidence": (extracted or {}).get("key_info_confidence")
+        }), 200
     except Exception as e:
         return jsonify({"message": f"Error extracting key information: {str(e)}"}), 500
 
@@ -211,8 +371,13 @@ def delete_document(document_id):
         if result.deleted_count == 0:
             return jsonify({"message": "Failed to delete document"}), 500
         
+        delete_content(ObjectId(document_id))
+        
+        # Content-addressed files are shared; only the last reference unlinks
+        if document.get('file_digest'):
+            release_reference(document['file_digest'])
         # Delete the file from file system if it exists
-        if file_path and os.path.exists(file_path):
+        elif file_path and os.path.exists(file_path):
             try:
                 os.remove(file_path)
             except Exception as e:
@@ -254,6 +419,26 @@ def options_document_detail():
     response.headers.add('Access-Control-Allow-Credentials', 'true')
     return response
 
+@documents_bp.route('/batch', methods=['OPTIONS'])
+@cross_origin()
+def options_documents_batch():
+    response = make_response()
+    response.headers.add('Access-Control-Allow-Origin', 'http://localhost:3000')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+    response.headers.add('Access-Control-Allow-Methods', 'POST,OPTIONS')
+    response.headers.add('Access-Control-Allow-Credentials', 'true')
+    return response
+
+@documents_bp.route('/jobs/<job_id>', methods=['OPTIONS'])
+@cross_origin()
+def options_extraction_job():
+    response = make_response()
+    response.headers.add('Access-Control-Allow-Origin', 'http://localhost:3000')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+    response.headers.add('Access-Control-Allow-Methods', 'GET,OPTIONS')
+    response.headers.add('Access-Control-Allow-Credentials', 'true')
+    return response
+
 @documents_bp.route('/<document_id>/summarize', methods=['OPTIONS'])
 @cross_origin()
 def options_document_summarize():
@@ -296,6 +481,9 @@ def get_document(document_id):
         if not document:
             return jsonify({"message": "Document not found"}), 404
         
+        # Include the full text and analysis results from the content store
+        document.update(load_content(document['_id']))
+        
         # Convert ObjectId to string for JSON serialization
         document['_id'] = str(document['_id'])
         if 'upload_date' in document:
@@ -324,6 +512,13 @@ def suggest_document_category(document_id):
                 "category": document['category']
             }), 200
         
+        # Category suggestion needs the extracted text
+        if not document.get('text_extracted'):
+            return jsonify({
+                "message": "Document text has not been extracted yet",
+                "status": document.get('status')
+            }), 409
+        
         # Suggest category
         from app.services.ai_processor import suggest_document_category
         suggested_category = suggest_document_category(ObjectId(document_id))
@@ -334,7 +529,7 @@ def suggest_document_category(document_id):
         # Update document with suggested category
         db.documents.update_one(
             {"_id": ObjectId(document_id)},
-            {"$set": {"category": suggested_category}}
+            {"$set": {"category": suggested_category, "category_source": "suggested"}}
         )
         
         return jsonify({
@@ -354,6 +549,43 @@ def options_document_suggest_category():
     response.headers.add('Access-Control-Allow-Credentials', 'true')
     return response
 
+# Summary, key information and category from a single AI call
+@documents_bp.route('/<document_id>/analyze', methods=['POST'])
+@jwt_required()
+def analyze_document_bundle(document_id):
+    try:
+        user_id = get_jwt_identity()
+        
+        # Verify document ownership
+        document = db.documents.find_one({"_id": ObjectId(document_id), "user_id": user_id}, METADATA_PROJECTION)
+        if not document:
+            return jsonify({"message": "Document not found"}), 404
+        
+        # Analysis needs the extracted text
+        if not document.get('text_extracted'):
+            return jsonify({
+                "message": "Document text has not been extracted yet",
+                "status": document.get('status')
+            }), 409
+        
+        analysis = analyze_document(ObjectId(document_id))
+        if not isinstance(analysis, dict) or "error" in analysis:
+            return jsonify({"message": "Failed to analyze document"}), 500
+        
+        return jsonify({"message": "Document analyzed successfully", **analysis}), 200
+    except Exception as e:
+        return jsonify({"message": f"Error analyzing document: {str(e)}"}), 500
+
+@documents_bp.route('/<document_id>/analyze', methods=['OPTIONS'])
+@cross_origin()
+def options_document_analyze():
+    response = make_response()
+    response.headers.add('Access-Control-Allow-Origin', 'http://localhost:3000')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+    response.headers.add('Access-Control-Allow-Methods', 'POST,OPTIONS')
+    response.headers.add('Access-Control-Allow-Credentials', 'true')
+    return response
+
 # UPDATED: Enhanced document comparison route with better authentication and error handling
 @documents_bp.route('/compare', methods=['POST'])
 @jwt_required()
@@ -381,7 +613,7 @@ def compare_documents():
                 # Ensure document ID is valid
                 object_id = ObjectId(doc_id)
                 # Find document and verify it belongs to the user
-                doc = db.documents.find_one({"_id": object_id, "user_id": user_id})
+                doc = db.documents.find_one({"_id": object_id, "user_id": user_id}, METADATA_PROJECTION)
                 
                 print(f"Document {doc_id} found: {doc is not None}")
                 
@@ -390,13 +622,14 @@ def compare_documents():
                         'error': f'Document with ID {doc_id} not found or access denied'
                     }), 404
                     
-                if 'extracted_text' not in doc:
+                segments = load_segments(object_id)
+                if segments is None:
                     print(f"Document {doc_id} missing extracted_text")
                     return jsonify({
                         'error': f'Document {doc_id} has no content or has not been processed yet'
                     }), 400
                     
-                documents.append(doc)
+                documents.append(segments)
             except Exception as doc_error:
                 print(f"Error processing document {doc_id}: {str(doc_error)}")
                 return jsonify({
@@ -406,8 +639,10 @@ def compare_documents():
         # Compare documents
         print("Comparing document contents...")
         comparison_result = comparison_service.compare_documents(
-            documents[0].get('extracted_text', ''),
-            documents[1].get('extracted_text', '')
+            documents[0].text,
+            documents[1].text,
+            documents[0].paragraphs,
+            documents[1].paragraphs
         )
         
         # Update comparison metadata
@@ -5,6 +5,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 from bson import ObjectId
 from app.config.database import get_database
+from app.services.content_store import METADATA_PROJECTION, load_texts
 import pymongo
 import re
 import html
@@ -13,6 +14,9 @@ from difflib import get_close_matches
 search_bp = Blueprint('search', __name__)
 db = get_database()
 
+# Upper bound on text-search matches considered per collection
+SEARCH_CANDIDATE_LIMIT = 1000
+
 # Set up text index on application startup
 def setup_search_indexes():
     """
@@ -20,10 +24,15 @@ def setup_search_indexes():
     Should be called during application startup.
     """
     try:
+        # Document text is indexed in the content store; drop the older
+        # index that also covered extracted_text before building this one
+        legacy_index = db.documents.index_information().get("document_search_index")
+        if legacy_index and "extracted_text" in legacy_index.get("weights", {}):
+            db.documents.drop_index("document_search_index")
+        
         # Create text index on searchable document fields
         db.documents.create_index([
             ("name", "text"),
-            ("extracted_text", "text"),
             ("category", "text")
         ], name="document_search_index")
         
@@ -140,8 +149,6 @@ def search_documents():
     # Split query into terms for highlighting
     query_terms = []
     if query:
-        # Add text search
-        mongo_query["$text"] = {"$search": query}
         # Store terms for highlighting
         query_terms = query.split()
     
@@ -174,30 +181,42 @@ def search_documents():
         if valid_tags:
             mongo_query["tags"] = {"$all": valid_tags}
     
-    # Determine sort order (by text score if text search, otherwise by date)
-    sort_params = []
-    projection = None
-    
-    if query:
-        # Sort by text score for relevance when performing text search
-        sort_params.append(("score", {"$meta": "textScore"}))
-        projection = {"score": {"$meta": "textScore"}}
-    
-    # Always include date as a sort parameter
-    sort_params.append(("upload_date", pymongo.DESCENDING))
-    
     try:
-        # Get total count for pagination
-        total = db.documents.count_documents(mongo_query)
-        
         # Calculate skip for pagination
         skip = (page - 1) * per_page
         
-        # Execute query with pagination
-        documents = list(db.documents.find(
-            mongo_query,
-            projection
-        ).sort(sort_params).skip(skip).limit(per_page))
+        if query:
+            # Text matches come from two indexes: name/category on documents
+            # and the full text in the content store. Scores are summed.
+            text_scores = {}
+            text_search = {"user_id": current_user, "$text": {"$search": query}}
+            score_projection = {"score": {"$meta": "textScore"}}
+            for collection in (db.documents, db.document_content):
+                matches = collection.find(text_search, score_projection) \
+                    .sort([("score", {"$meta": "textScore"})]).limit(SEARCH_CANDIDATE_LIMIT)
+                for match in matches:
+                    text_scores[match["_id"]] = text_scores.get(match["_id"], 0) + match["score"]
+            
+            mongo_query["_id"] = {"$in": list(text_scores)}
+            candidates = list(db.documents.find(mongo_query, METADATA_PROJECTION))
+            
+            # Sort by relevance, then by date
+            candidates.sort(key=lambda doc: doc["upload_date"], reverse=True)
+            candidates.sort(key=lambda doc: text_scores[doc["_id"]], reverse=True)
+            
+            total = len(candidates)
+            documents = candidates[skip:skip + per_page]
+            for doc in documents:
+                doc["score"] = text_scores[doc["_id"]]
+        else:
+            # Get total count for pagination
+            total = db.documents.count_documents(mongo_query)
+            
+            # Execute query with pagination
+            documents = list(db.documents.find(
+                mongo_query,
+                METADATA_PROJECTION
+            ).sort("upload_date", pymongo.DESCENDING).skip(skip).limit(per_page))
         
         # Prepare search suggestions if no results and query provided
         suggestion = None
@@ -205,16 +224,16 @@ def search_documents():
             # Try to suggest alternative search terms from the document collection
             all_terms = []
             # Get terms from recent documents (limit to 50 to avoid processing too much)
-            recent_docs = list(db.documents.find(
+            recent_ids = [doc["_id"] for doc in db.documents.find(
                 {"user_id": current_user},
-                {"extracted_text": 1}
-            ).sort("upload_date", pymongo.DESCENDING).limit(50))
+                {"_id": 1}
+            ).sort("upload_date", pymongo.DESCENDING).limit(50)]
             
             # Extract words for suggestion matching
-            for doc in recent_docs:
-                if "extracted_text" in doc and doc["extracted_text"]:
+            for text in load_texts(recent_ids).values():
+                if text:
                     # Simple tokenization for suggestion purposes
-                    words = re.findall(r'\b\w+\b', doc["extracted_text"].lower())
+                    words = re.findall(r'\b\w+\b', text.lower())
                     all_terms.extend([w for w in words if len(w) > 3])
             
             # Remove duplicates
@@ -237,8 +256,12 @@ def search_documents():
                 if suggested_query != query:
                     suggestion = suggested_query
         
+        # Full text is only needed to build snippets around the search terms
+        texts = load_texts(doc["_id"] for doc in documents) if query_terms else {}
+        
         # Process results - add highlighting and format for JSON
         for doc in documents:
+            text = texts.get(doc["_id"]) or doc.get("text_preview", "")
             doc["_id"] = str(doc["_id"])
             
             # Format date fields for JSON
@@ -246,15 +269,16 @@ def search_documents():
                 doc["upload_date"] = doc["upload_date"].isoformat()
             
             # Create highlighted snippets for extracted text if query provided
-            if "extracted_text" in doc and doc["extracted_text"] and query_terms:
+            if text and query_terms:
                 # Create a snippet around search terms
-                snippet = create_text_snippet(doc["extracted_text"], query_terms)
+                snippet = create_text_snippet(text, query_terms)
                 
                 # Highlight the terms in the snippet
                 doc["highlighted_snippet"] = highlight_text(snippet, query_terms)
-                
-                # Keep a limited preview in the main result
-                doc["extracted_text"] = doc["extracted_text"][:250] + "..." if len(doc["extracted_text"]) > 250 else doc["extracted_text"]
+            
+            # Keep a limited preview in the main result
+            if text:
+                doc["extracted_text"] = text[:250] + "..." if len(text) > 250 else text
             
             # Highlight the document name if it matches search terms
             if "name" in doc and doc["name"] and query_terms:
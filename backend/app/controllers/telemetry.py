@@ -0,0 +1,67 @@
+# app/controllers/telemetry.py
+
+from flask import Blueprint, Response, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from bson import ObjectId
+from app.config.database import get_database
+from app.config.config import METRICS_TOKEN
+from app.services import telemetry
+
+telemetry_bp = Blueprint('telemetry', __name__)
+db = get_database()
+
+# Longest period a spend report may cover
+MAX_REPORT_DAYS = 365
+
+
+def _report_days():
+    try:
+        days = int(request.args.get('days', 30))
+    except ValueError:
+        days = 30
+    return min(max(days, 1), MAX_REPORT_DAYS)
+
+
+@telemetry_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """AI usage metrics of this worker for Prometheus to scrape"""
+    if METRICS_TOKEN and request.headers.get('Authorization') != f"Bearer {METRICS_TOKEN}":
+        return jsonify({"message": "Unauthorized"}), 401
+    return Response(telemetry.render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+@telemetry_bp.route('/api/telemetry/usage', methods=['GET'])
+@jwt_required()
+def get_my_usage():
+    """AI spend of the current user, broken down by feature"""
+    user_id = get_jwt_identity()
+    days = _report_days()
+    try:
+        features = telemetry.user_spend(user_id, days=days)
+        return jsonify({
+            "days": days,
+            "total_cost": round(sum(row["cost"] for row in features), 6),
+            "features": features
+        }), 200
+    except Exception as e:
+        return jsonify({"message": f"Error loading usage: {str(e)}"}), 500
+
+
+@telemetry_bp.route('/api/telemetry/usage/users', methods=['GET'])
+@jwt_required()
+def get_usage_by_user():
+    """AI spend of every user (admins only)"""
+    user = db.users.find_one({"_id": ObjectId(get_jwt_identity())})
+    if not user or user.get('role') != 'admin':
+        return jsonify({"message": "Usage by user is only available to admins"}), 403
+
+    days = _report_days()
+    try:
+        users = telemetry.user_spend(days=days)
+        return jsonify({
+            "days": days,
+            "total_cost": round(sum(row["cost"] for row in users), 6),
+            "users": users
+        }), 200
+    except Exception as e:
+        return jsonify({"message": f"Error loading usage: {str(e)}"}), 500
@@ -5,6 +5,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from bson import ObjectId
 from app.config.database import get_database
 from app.services.translation_service import TranslationService
+from app.utils.sse import sse_response
 
 translation_bp = Blueprint('translation', __name__)
 db = get_database()
@@ -56,6 +57,23 @@ def translate_document(document_id):
     except Exception as e:
         return jsonify({"message": f"Error during translation: {str(e)}"}), 500
 
+@translation_bp.route('/document/<document_id>/stream', methods=['POST'])
+@jwt_required()
+def stream_document_translation(document_id):
+    """Translate a document, streaming the translation as server-sent events"""
+    user_id = get_jwt_identity()
+    
+    # Verify document access
+    document = db.documents.find_one({"_id": ObjectId(document_id), "user_id": user_id}, {"_id": 1})
+    if not document:
+        return jsonify({"message": "Document not found or access denied"}), 404
+    
+    # Get target language
+    data = request.get_json() or {}
+    target_language = data.get('target_language', 'en')
+    
+    return sse_response(translation_service.stream_document_translation(document_id, target_language))
+
 @translation_bp.route('/search-query', methods=['POST'])
 @jwt_required()
 def translate_search_query():
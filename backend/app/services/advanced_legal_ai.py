@@ -7,10 +7,37 @@ from app.config.database import get_database
 from bson import ObjectId
 import re
 import json
-from app.services.ai_processor import safe_openai_call, format_openai_response
+from app.services.ai_processor import safe_openai_call, stream_openai_call, format_openai_response
+from app.services.content_store import METADATA_PROJECTION, get_document_text, save_content
+from app.services.segmentation import load_segments
+from app.services.passage_ranker import PassageRanker
 
 db = get_database()
 
+# Terms of the clauses each analysis should see first when a contract is
+# too long to send whole
+RISK_TERMS = [
+    "liability", "limitation of liability", "indemnif", "hold harmless", "warrant",
+    "damages", "breach", "default", "terminat", "penalt", "exclusive", "non-compete",
+    "assignment", "force majeure", "dispute", "arbitration", "governing law",
+    "jurisdiction", "insurance", "intellectual property", "confidential",
+    "sole discretion", "without notice", "automatic renewal", "auto-renew"
+]
+COMPLIANCE_TERMS = [
+    "comply", "compliance", "regulation", "regulatory", "statute", "law",
+    "personal data", "data protection", "privacy", "gdpr", "ccpa", "hipaa",
+    "consumer", "employment", "anti-bribery", "anti-corruption", "sanction",
+    "export control", "licen", "tax", "disclos", "filing", "notice", "audit",
+    "record", "jurisdiction", "governing law"
+]
+
+RISK_RANKER = PassageRanker(RISK_TERMS)
+COMPLIANCE_RANKER = PassageRanker(COMPLIANCE_TERMS)
+
+# Token budgets for the contract text in each prompt
+RISK_CONTEXT_TOKENS = 3500
+COMPLIANCE_CONTEXT_TOKENS = 3000
+
 class AdvancedLegalAnalysis:
     """Advanced legal analysis capabilities"""
     
@@ -18,18 +45,25 @@ class AdvancedLegalAnalysis:
         self.openai_api_key = os.environ.get('OPENAI_API_KEY', 'your-api-key-here')
         self.model = "gpt-3.5-turbo"
     
-    def assess_contract_risks(self, document_id):
-        """Identify potential legal risks in a contract"""
-        document = db.documents.find_one({"_id": ObjectId(document_id)})
-        if not document or "extracted_text" not in document:
-            return {"error": "Document not found or text extraction failed"}
+    def _risk_assessment_request(self, document_id):
+        """
+        Build the risk assessment prompt for a document
+        
+        Returns:
+            (messages, default_response), or None if the document has no text
+        """
+        document = db.documents.find_one({"_id": ObjectId(document_id)}, METADATA_PROJECTION)
         
         # Get document text
-        contract_text = document.get("extracted_text", "")
+        segments = load_segments(ObjectId(document_id)) if document else None
+        if segments is None:
+            return None
         
-        # Truncate if needed
-        if len(contract_text) > 15000:
-            contract_text = contract_text[:15000] + "..."
+        # Long contracts are cut down to their most risk-relevant clauses
+        contract_text = RISK_RANKER.build_context(
+            segments, RISK_CONTEXT_TOKENS, self.model,
+            lead_tokens=RISK_CONTEXT_TOKENS // 10
+        )
         
         # Define the prompt for risk assessment
         prompt = f"""Analyze the following contract for legal risks. Identify:
@@ -51,7 +85,7 @@ Format your response as JSON with these sections:
 4. "missing_elements": Array of standard elements that appear to be missing
 """
         
-        # Get AI analysis
+        # Returned if the analysis fails
         default_response = {
             "risk_summary": "Unable to complete risk assessment",
             "risk_score": 5,
@@ -59,44 +93,88 @@ Format your response as JSON with these sections:
             "missing_elements": []
         }
         
-        response = safe_openai_call(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": "You are a specialized legal AI with expertise in contract analysis and risk assessment."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=1500,
-            expected_format='json',
-            default_result=default_response
-        )
-        
+        messages = [
+            {"role": "system", "content": "You are a specialized legal AI with expertise in contract analysis and risk assessment."},
+            {"role": "user", "content": prompt}
+        ]
+        return messages, default_response
+    
+    def _save_risk_assessment(self, document_id, response):
         # Save results to database
+        save_content(ObjectId(document_id), {"risk_assessment": response})
         db.documents.update_one(
             {"_id": ObjectId(document_id)},
             {"$set": {
-                "risk_assessment": response,
                 "risk_assessment_date": datetime.utcnow()
             }}
         )
+    
+    def assess_contract_risks(self, document_id):
+        """Identify potential legal risks in a contract"""
+        request = self._risk_assessment_request(document_id)
+        if request is None:
+            return {"error": "Document not found or text extraction failed"}
+        messages, default_response = request
+        
+        response = safe_openai_call(
+            model=self.model,
+            messages=messages,
+            max_tokens=1500,
+            expected_format='json',
+            default_result=default_response,
+            feature="risk_assessment"
+        )
+        
+        self._save_risk_assessment(document_id, response)
         
         return response
     
+    def stream_contract_risks(self, document_id):
+        """
+        Identify potential legal risks in a contract, streaming the response
+        
+        Yields:
+            ("delta", {"text": ...}) as the response arrives, then
+            ("result", assessment) once it has been parsed and saved
+        """
+        request = self._risk_assessment_request(document_id)
+        if request is None:
+            yield "error", {"message": "Document not found or text extraction failed"}
+            return
+        messages, default_response = request
+        
+        parts = []
+        for text in stream_openai_call(
+            model=self.model,
+            messages=messages,
+            max_tokens=1500,
+            expected_format='json',
+            feature="risk_assessment"
+        ):
+            parts.append(text)
+            yield "delta", {"text": text}
+        
+        response = format_openai_response("".join(parts), 'json') if parts else default_response
+        self._save_risk_assessment(document_id, response)
+        
+        yield "result", response
+    
     def recommend_clause_improvements(self, document_id, clause_text=None):
         """Suggest improvements for contract clauses"""
-        document = db.documents.find_one({"_id": ObjectId(document_id)})
+        document = db.documents.find_one({"_id": ObjectId(document_id)}, METADATA_PROJECTION)
         if not document:
             return {"error": "Document not found"}
             
         # If specific clause provided, analyze just that
         if clause_text:
             text_to_analyze = clause_text
-        elif "extracted_text" in document:
+        else:
             # Otherwise use whole document (truncated if needed)
-            text_to_analyze = document.get("extracted_text", "")
+            text_to_analyze = get_document_text(ObjectId(document_id))
+            if text_to_analyze is None:
+                return {"error": "No text found for analysis"}
             if len(text_to_analyze) > 10000:
                 text_to_analyze = text_to_analyze[:10000] + "..."
-        else:
-            return {"error": "No text found for analysis"}
         
         # Define the prompt for clause improvement
         prompt = f"""Analyze the following contract text and suggest improvements:
@@ -129,7 +207,8 @@ Format your response as JSON with these sections:
             ],
             max_tokens=1500,
             expected_format='json',
-            default_result=default_response
+            default_result=default_response,
+            feature="clause_recommendations"
         )
         
         # If analyzing a specific clause, no need to save to DB
@@ -137,10 +216,10 @@ Format your response as JSON with these sections:
             return response
             
         # Save results to database
+        save_content(ObjectId(document_id), {"clause_improvements": response})
         db.documents.update_one(
             {"_id": ObjectId(document_id)},
             {"$set": {
-                "clause_improvements": response,
                 "clause_analysis_date": datetime.utcnow()
             }}
         )
@@ -149,19 +228,19 @@ Format your response as JSON with these sections:
     
     def find_similar_precedents(self, document_id, query=None):
         """Find similar legal precedents based on document content"""
-        document = db.documents.find_one({"_id": ObjectId(document_id)})
+        document = db.documents.find_one({"_id": ObjectId(document_id)}, METADATA_PROJECTION)
         if not document:
             return {"error": "Document not found"}
             
         # Extract document text or use query
         if query:
             search_text = query
-        elif "extracted_text" in document:
-            search_text = document.get("extracted_text", "")
+        else:
+            search_text = get_document_text(ObjectId(document_id))
+            if search_text is None:
+                return {"error": "No text found for precedent matching"}
             # Only use first portion for precedent matching
             search_text = search_text[:5000]
-        else:
-            return {"error": "No text found for precedent matching"}
         
         # Define the prompt for precedent matching
         prompt = f"""Based on the following legal text, identify:
@@ -194,7 +273,8 @@ Format your response as JSON with these sections:
             ],
             max_tokens=1500,
             expected_format='json',
-            default_result=default_response
+            default_result=default_response,
+            feature="precedent_matching"
         )
         
         # If using a custom query, no need to save to DB
@@ -202,10 +282,10 @@ Format your response as JSON with these sections:
             return response
             
         # Save results to database
+        save_content(ObjectId(document_id), {"precedent_matches": response})
         db.documents.update_one(
             {"_id": ObjectId(document_id)},
             {"$set": {
-                "precedent_matches": response,
                 "precedent_match_date": datetime.utcnow()
             }}
         )
@@ -214,16 +294,21 @@ Format your response as JSON with these sections:
     
     def check_compliance(self, document_id, jurisdiction=None, regulation_type=None):
         """Check contract for compliance with regulations"""
-        document = db.documents.find_one({"_id": ObjectId(document_id)})
-        if not document or "extracted_text" not in document:
-            return {"error": "Document not found or text extraction failed"}
+        document = db.documents.find_one({"_id": ObjectId(document_id)}, METADATA_PROJECTION)
         
         # Get document text
-        contract_text = document.get("extracted_text", "")
+        segments = load_segments(ObjectId(document_id)) if document else None
+        if segments is None:
+            return {"error": "Document not found or text extraction failed"}
         
-        # Truncate if needed
-        if len(contract_text) > 12000:
-            contract_text = contract_text[:12000] + "..."
+        # Long contracts are cut down to the clauses most relevant to the
+        # requested jurisdiction and regulation
+        extra_terms = [term for term in (jurisdiction, regulation_type) if term]
+        ranker = PassageRanker(COMPLIANCE_TERMS + extra_terms) if extra_terms else COMPLIANCE_RANKER
+        contract_text = ranker.build_context(
+            segments, COMPLIANCE_CONTEXT_TOKENS, self.model,
+            lead_tokens=COMPLIANCE_CONTEXT_TOKENS // 10
+        )
         
         # Build prompt based on inputs
         jurisdiction_text = f"Jurisdiction: {jurisdiction}" if jurisdiction else "Identify the likely jurisdiction"
@@ -266,14 +351,15 @@ Format your response as JSON with these sections:
             ],
             max_tokens=1500,
             expected_format='json',
-            default_result=default_response
+            default_result=default_response,
+            feature="compliance_check"
         )
         
         # Save results to database
+        save_content(ObjectId(document_id), {"compliance_check": response})
         db.documents.update_one(
             {"_id": ObjectId(document_id)},
             {"$set": {
-                "compliance_check": response,
                 "compliance_check_date": datetime.utcnow(),
                 "compliance_jurisdiction": jurisdiction,
                 "compliance_regulation_type": regulation_type
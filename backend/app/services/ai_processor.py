@@ -1,31 +1,105 @@
 import os
 import openai
 from app.config.database import get_database
+from app.config.config import (
+    SUMMARY_MAP_REDUCE_ENABLED, SUMMARY_CHUNK_TOKENS, SUMMARY_MAP_CONCURRENCY,
+    SUMMARY_REDUCE_INPUT_TOKENS, SUMMARY_MAP_REDUCE_MAX_TOKENS
+)
+from app.services.content_store import METADATA_PROJECTION, load_content, get_document_text, save_content
+from app.services.segmentation import load_segments, section_chunks
+from app.services.llm_cache import cache_key, get_cached_response, put_cached_response
+from app.services.llm_client import create_chat_completion, stream_chat_completion, run_sync, gather_sync, iterate_sync
+from app.services import rate_limiter, single_flight, telemetry, llm_resilience
+from app.services.tokenizer import count_tokens, count_message_tokens, truncate_to_tokens, TokenBudget
+from app.services.passage_ranker import PassageRanker
+from app.services import category_classifier
+from app.services.key_info_extractor import KEY_INFO_FIELDS, NOT_SPECIFIED, resolve_key_info
 from bson import ObjectId
 from datetime import datetime
+import asyncio
 import json
 import re
+import time
 
 # Initialize OpenAI API
 openai.api_key = os.environ.get('OPENAI_API_KEY', 'your-api-key-here')
 
-# Track API usage for cost monitoring
-api_usage_log = []
+# Completion size assumed for rate limiting when a call sets no max_tokens
+DEFAULT_COMPLETION_TOKENS = 500
 
-def count_tokens(text):
-    """Estimate token count - approximately 4 chars per token for English text"""
-    return len(text) // 4
+# Paragraphs mentioning these are preferred when selecting text to summarize
+SUMMARY_KEYWORDS = [
+    # General contract terms
+    "obligations", "responsibilities", "duties", "shall", "must", "requirements",
+    "terms", "conditions", "provisions", "clauses",
+    
+    # Confidentiality and IP
+    "confidential", "proprietary", "secret", "privacy", "disclosure",
+    "intellectual property", "copyright", "patent", "trademark",
+    
+    # Term and termination
+    "termination", "expiration", "duration", "term", "cancel", "renew",
+    
+    # Legal elements
+    "agreement", "contract", "covenant", "warranty", "representation",
+    "liability", "indemnity", "indemnification", "damages", "remedies",
+    "breach", "default", "compliance", "force majeure",
+    
+    # Payment and compensation
+    "payment", "compensation", "fee", "expense", "cost", "price", "tax",
+    
+    # Dispute resolution
+    "dispute", "arbitration", "mediation", "jurisdiction", "governing law"
+]
 
-def estimate_cost(input_tokens, output_tokens, model="gpt-3.5-turbo"):
-    """Estimate cost in USD based on current OpenAI pricing"""
-    if model == "gpt-3.5-turbo":
-        input_cost = (input_tokens / 1000) * 0.0015
-        output_cost = (output_tokens / 1000) * 0.002
-    else:  # Default to GPT-4 pricing
-        input_cost = (input_tokens / 1000) * 0.03
-        output_cost = (output_tokens / 1000) * 0.06
-        
-    return input_cost + output_cost
+# For legal documents, focus on sections with key information;
+# paragraphs containing these are preferred for key info extraction
+KEY_INFO_TERMS = [
+    # Parties and identification
+    "parties:", "between:", "agreement between", "this agreement", 
+    
+    # Dates and timing
+    "effective date:", "date of this agreement", "commencement date:",
+    "term:", "duration:", "period of", 
+    
+    # Termination
+    "termination:", "terminate:", "expiration:", "cancellation:",
+    
+    # Payment and financial
+    "payment:", "fee:", "compensation:", "consideration:", "price:",
+    "amount:", "cost:", "expense:", "invoice:", "billing:",
+    
+    # Confidentiality
+    "confidentiality:", "confidential information:", "non-disclosure:",
+    "proprietary information:", "trade secret:",
+    
+    # Liability
+    "liability:", "limitation of liability:", "indemnification:", 
+    "indemnity:", "hold harmless:", "warranty:", "representation:",
+    
+    # Governing law
+    "governing law:", "jurisdiction:", "venue:", "applicable law:",
+    "dispute resolution:", "arbitration:", "mediation:"
+]
+
+# Built once; each ranks a document's paragraphs against its terms in one pass
+SUMMARY_RANKER = PassageRanker(SUMMARY_KEYWORDS)
+KEY_INFO_RANKER = PassageRanker(KEY_INFO_TERMS)
+ANALYSIS_RANKER = PassageRanker(SUMMARY_KEYWORDS + KEY_INFO_TERMS)
+
+# Documents longer than this are summarized part by part (2000 tokens is ~1500 words)
+SUMMARY_MAX_INPUT_TOKENS = 2000
+
+# Summaries focus on the same four things whether made in one call or map-reduced
+SUMMARY_SYSTEM_PROMPT = "You are a legal assistant that creates concise summaries. Focus only on identifying: 1) parties involved, 2) key dates, 3) main obligations, 4) termination conditions."
+CHUNK_SUMMARY_INSTRUCTION = "Summarize only the most important details from this part of a legal document. Say nothing about parts you haven't seen:"
+REDUCE_SUMMARY_INSTRUCTION = "These are summaries of consecutive parts of one legal document. Combine them into one concise summary of the whole document, without repeating details:"
+
+# Categories documents are classified into
+DOCUMENT_CATEGORIES = [
+    "NDA", "Contract", "Agreement", "Employment", "Legal Brief",
+    "Terms of Service", "Privacy Policy", "License", "Other"
+]
 
 def format_openai_response(response_text, expected_format='json'):
     """
@@ -88,10 +162,63 @@ def format_openai_response(response_text, expected_format='json'):
         text = text.replace('```', '')
         return text.strip()
 
-def safe_openai_call(model, messages, max_tokens=None, temperature=0.7, 
-                    expected_format='json', default_result=None):
+def format_text_stream(pieces):
     """
-    Makes a safe OpenAI API call with error handling
+    Clean streamed text the way format_openai_response(text, 'text') does
+
+    Text is passed on as soon as it can no longer be part of a code fence
+    or of the whitespace stripped from the ends, so the pieces yielded join
+    to exactly the formatted response.
+
+    Args:
+        pieces: Iterable of response text pieces, e.g. from stream_openai_call
+    """
+    pending = ""
+    spaces = ""
+    started = False
+
+    def clean(text):
+        text = re.sub(r'```[a-zA-Z]*\n', '', text)
+        return text.replace('```', '')
+
+    for piece in pieces:
+        pending += piece
+        # Hold back a backtick run that may still become a fence
+        cut = len(pending)
+        fence = pending.rfind('`')
+        if fence != -1 and '\n' not in pending[fence:]:
+            cut = len(pending[:fence + 1].rstrip('`'))
+        text = clean(pending[:cut])
+        if text.endswith('`'):
+            # Backticks left around a removed fence may join the next ones
+            continue
+        pending = pending[cut:]
+
+        if not started:
+            text = text.lstrip()
+        body = text.rstrip()
+        if not body:
+            spaces += text
+            continue
+        started = True
+        yield spaces + body
+        spaces = text[len(body):]
+
+    text = clean(pending)
+    if not started:
+        text = text.lstrip()
+    if text.rstrip():
+        yield spaces + text.rstrip()
+
+async def async_openai_call(model, messages, max_tokens=None, temperature=0.7,
+                            expected_format='json', default_result=None, use_cache=True,
+                            feature=None):
+    """
+    Makes a safe OpenAI API call with error handling, without blocking
+    
+    Runs on the shared client loop (see llm_client). Identical requests are
+    answered from the response cache (see llm_cache). Every call is recorded
+    in the usage telemetry (see telemetry).
     
     Args:
         model (str): The model to use
@@ -100,19 +227,20 @@ def safe_openai_call(model, messages, max_tokens=None, temperature=0.7,
         temperature (float): Temperature parameter for the model
         expected_format (str): Expected response format ('json' or 'text')
         default_result: Default result to return on failure
+        use_cache (bool): Set to False to always call the API; the fresh
+            response still replaces any cached one
+        feature (str): Name of the calling feature, for usage telemetry
         
     Returns:
         The formatted API response or default_result on failure
     """
-    import time
-    
-    # Set maximum retries
-    max_retries = 3
-    base_delay = 2  # seconds
-    
-    # Make sure API key is set
-    if not openai.api_key:
-        openai.api_key = os.environ.get('OPENAI_API_KEY', 'your-api-key-here')
+    started = time.monotonic()
+    key = cache_key(model, messages, temperature, max_tokens)
+    if use_cache:
+        cached_text = await asyncio.to_thread(get_cached_response, key)
+        if cached_text is not None:
+            telemetry.record_call(feature, model, time.monotonic() - started, cache_hit=True)
+            return format_openai_response(cached_text, expected_format)
     
     # Prepare parameters
     params = {
@@ -124,317 +252,519 @@ def safe_openai_call(model, messages, max_tokens=None, temperature=0.7,
     if max_tokens:
         params["max_tokens"] = max_tokens
     
+    # Identical requests already running here or in another worker are
+    # joined rather than sent again
+    stats = {"retries": 0, "usage": None, "circuit_open": False}
+    response_text, is_leader = await single_flight.run_once(
+        key, lambda: _request_completion(params, stats), reuse_results=use_cache
+    )
+    usage = stats["usage"]
+    telemetry.record_call(
+        feature, model, time.monotonic() - started,
+        prompt_tokens=usage.prompt_tokens if usage else 0,
+        completion_tokens=usage.completion_tokens if usage else 0,
+        retries=stats["retries"], shared=not is_leader, success=response_text is not None,
+        circuit_open=stats["circuit_open"]
+    )
+    if response_text is None:
+        return default_result
+    
+    result = format_openai_response(response_text, expected_format)
+    
+    # Don't keep responses that could not be parsed
+    if is_leader and not (isinstance(result, dict) and result.get("error") is True and "raw_response" in result):
+        await asyncio.to_thread(put_cached_response, key, model, response_text)
+    return result
+
+async def _request_completion(params, stats):
+    """
+    Send a chat completion request, retrying transient errors
+    
+    Args:
+        params (dict): Request parameters
+        stats (dict): Receives the number of "retries", the reported "usage"
+            and whether the open circuit breaker kept every request from
+            being sent ("circuit_open")
+    
+    Returns:
+        The response text, or None if every attempt failed
+    """
+    model = params["model"]
+    
+    # Set maximum retries
+    max_retries = 3
+    base_delay = 2  # seconds
+    
+    # Tokens reserved from the shared rate limit until the response reports usage
+    estimated_tokens = count_message_tokens(params["messages"], model) + (params.get("max_tokens") or DEFAULT_COMPLETION_TOKENS)
+    breaker = llm_resilience.breaker_for(model)
+    
+    async def send():
+        return await create_chat_completion(**params)
+    
+    async def send_hedge():
+        await rate_limiter.acquire(model, estimated_tokens)
+        return await create_chat_completion(**params)
+    
     # Try the API call with retries for transient errors
     for attempt in range(max_retries):
+        stats["retries"] = attempt
+        # Fail fast while the provider is known to be down
+        if not breaker.allow():
+            print(f"Circuit for {model} is open. Returning default result.")
+            stats["circuit_open"] = attempt == 0
+            return None
         try:
-            response = openai.chat.completions.create(**params)
+            await rate_limiter.acquire(model, estimated_tokens)
+            response = await llm_resilience.hedged(model, send, send_hedge)
+            breaker.record_success()
             
-            # Extract and format the response
-            response_text = response.choices[0].message.content
-            return format_openai_response(response_text, expected_format)
+            usage = getattr(response, "usage", None)
+            stats["usage"] = usage
+            if usage is not None:
+                await asyncio.to_thread(rate_limiter.record_usage, model, estimated_tokens, usage.total_tokens)
+            
+            return response.choices[0].message.content
             
         except Exception as e:
-            # Log the error
-            error_type = type(e).__name__
-            print(f"OpenAI API Error (Attempt {attempt+1}/{max_retries}): {error_type} - {str(e)}")
+            if not await _wait_before_retry(e, model, attempt, max_retries, base_delay):
+                break
+    
+    print(f"All {max_retries} attempts failed. Returning default result.")
+    return None
+
+async def _wait_before_retry(error, model, attempt, max_retries, base_delay):
+    """
+    Log a failed API attempt and wait before the next one
+    
+    Returns:
+        False if no attempts are left
+    """
+    # Log the error
+    error_type = type(error).__name__
+    print(f"OpenAI API Error (Attempt {attempt+1}/{max_retries}): {error_type} - {str(error)}")
+    
+    # Outages count towards the model's circuit breaker; any other error
+    # still shows the provider is up. Once open, don't wait to retry.
+    breaker = llm_resilience.breaker_for(model)
+    if llm_resilience.is_provider_failure(error):
+        breaker.record_failure()
+        if breaker.is_open:
+            return False
+    else:
+        breaker.record_success()
+    
+    # Handle rate limits by pausing every worker for the Retry-After
+    # period (or exponential backoff); the next acquire waits it out
+    if isinstance(error, openai.RateLimitError) or "rate limit" in str(error).lower():
+        delay = rate_limiter.retry_after_seconds(error) or base_delay * (2 ** attempt)
+        print(f"Rate limited. Retrying in {delay:.1f} seconds...")
+        await asyncio.to_thread(rate_limiter.block_for, model, delay)
+        return attempt < max_retries - 1
+    
+    # Handle other errors
+    if attempt == max_retries - 1:
+        return False
+    
+    # Wait before retrying other errors
+    await asyncio.sleep(base_delay)
+    return True
+
+async def _stream_completion(params, key, expected_format, feature):
+    """
+    Stream a chat completion, yielding text as it arrives
+    
+    Attempts are retried only until the first text has been yielded. The
+    complete response is cached once the stream ends.
+    
+    Raises:
+        Exception: The last API error if the stream could not be completed
+    """
+    started = time.monotonic()
+    model = params["model"]
+    max_retries = 3
+    base_delay = 2  # seconds
+    estimated_tokens = count_message_tokens(params["messages"], model) + (params.get("max_tokens") or DEFAULT_COMPLETION_TOKENS)
+    
+    breaker = llm_resilience.breaker_for(model)
+    
+    parts = []
+    usage = None
+    for attempt in range(max_retries):
+        try:
+            if not breaker.allow():
+                raise llm_resilience.CircuitOpenError(f"The AI service for {model} is unavailable, try again shortly")
+            await rate_limiter.acquire(model, estimated_tokens)
+            usage = None
+            async for chunk in stream_chat_completion(**params):
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                if chunk.choices:
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                        yield delta
             
-            # Handle rate limits with exponential backoff
-            if "rate limit" in str(e).lower():
-                delay = base_delay * (2 ** attempt)
-                print(f"Rate limited. Retrying in {delay} seconds...")
-                time.sleep(delay)
-                continue
-                
-            # Handle other errors
-            if attempt == max_retries - 1:
-                print(f"All {max_retries} attempts failed. Returning default result.")
-                return default_result
+            breaker.record_success()
+            if usage is not None:
+                await asyncio.to_thread(rate_limiter.record_usage, model, estimated_tokens, usage.total_tokens)
+            break
             
-            # Wait before retrying other errors
-            time.sleep(base_delay)
+        except Exception as e:
+            # Text already sent can't be taken back, so don't start over
+            if (isinstance(e, llm_resilience.CircuitOpenError) or parts
+                    or not await _wait_before_retry(e, model, attempt, max_retries, base_delay)):
+                telemetry.record_call(
+                    feature, model, time.monotonic() - started,
+                    retries=attempt, success=False, streamed=True,
+                    circuit_open=isinstance(e, llm_resilience.CircuitOpenError) and attempt == 0
+                )
+                raise
+    
+    telemetry.record_call(
+        feature, model, time.monotonic() - started,
+        prompt_tokens=usage.prompt_tokens if usage else 0,
+        completion_tokens=usage.completion_tokens if usage else 0,
+        retries=attempt, streamed=True
+    )
+    response_text = "".join(parts)
+    result = format_openai_response(response_text, expected_format)
+    if not (isinstance(result, dict) and result.get("error") is True and "raw_response" in result):
+        await asyncio.to_thread(put_cached_response, key, model, response_text)
+
+def stream_openai_call(model, messages, max_tokens=None, temperature=0.7,
+                       expected_format='json', use_cache=True, feature=None):
+    """
+    Makes a streaming OpenAI API call, yielding the response text piece by piece
+    
+    Takes the same arguments as safe_openai_call. The caller joins the
+    pieces and formats them with format_openai_response. A cached response
+    is yielded whole.
+    
+    Raises:
+        Exception: If the API call fails; there is no default result
+    """
+    started = time.monotonic()
+    key = cache_key(model, messages, temperature, max_tokens)
+    if use_cache:
+        cached_text = get_cached_response(key)
+        if cached_text is not None:
+            telemetry.record_call(feature, model, time.monotonic() - started, cache_hit=True, streamed=True)
+            yield cached_text
+            return
+    
+    params = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature
+    }
+    
+    if max_tokens:
+        params["max_tokens"] = max_tokens
     
-    # This should not be reached due to the return in the loop
-    return default_result
+    yield from iterate_sync(_stream_completion(params, key, expected_format, feature))
+
+def safe_openai_call(model, messages, max_tokens=None, temperature=0.7, 
+                    expected_format='json', default_result=None, use_cache=True,
+                    feature=None):
+    """
+    Makes a safe OpenAI API call with error handling
+    
+    Blocking facade over async_openai_call; takes the same arguments. To run
+    several independent calls at once, pass async_openai_call coroutines to
+    llm_client.gather_sync instead.
+    """
+    return run_sync(async_openai_call(
+        model, messages, max_tokens=max_tokens, temperature=temperature,
+        expected_format=expected_format, default_result=default_result, use_cache=use_cache,
+        feature=feature
+    ))
 
 def summarize_document(document_id):
     """Generate a summary of a document using OpenAI's API"""
     db = get_database()
     
     # Check if document has already been summarized
-    document = db.documents.find_one({"_id": document_id})
+    document = db.documents.find_one({"_id": document_id}, METADATA_PROJECTION)
     if not document:
         return None
         
     # Return existing summary if available
-    if document.get("summarized") and document.get("summary"):
-        print("Using cached summary - no API call needed")
-        return document["summary"]
+    if document.get("summarized"):
+        summary = load_content(document_id, ("summary",)).get("summary")
+        if summary:
+            print("Using cached summary - no API call needed")
+            return summary
         
     # Check if text has been extracted
-    if "extracted_text" not in document:
+    segments = load_segments(document_id)
+    if segments is None:
         return "Text extraction needed before summarization"
     
-    extracted_text = document["extracted_text"]
+    model = "gpt-3.5-turbo"
     
-    # Limit input tokens to control costs - 2000 tokens is ~1500 words
-    max_input_tokens = 2000
-    input_char_limit = max_input_tokens * 4
+    # Limit input tokens to control costs
+    max_input_tokens = SUMMARY_MAX_INPUT_TOKENS
     
-    # Get important parts of the document
-    # For legal docs: beginning (parties, dates) and keywords sections are most important
-    beginning = extracted_text[:input_char_limit // 2]
+    default_summary = "Unable to generate summary at this time. Please try again later."
     
-    # Expanded list with more synonyms and related terms
-    keywords = [
-        # General contract terms
-        "obligations", "responsibilities", "duties", "shall", "must", "requirements",
-        "terms", "conditions", "provisions", "clauses",
-        
-        # Confidentiality and IP
-        "confidential", "proprietary", "secret", "privacy", "disclosure",
-        "intellectual property", "copyright", "patent", "trademark",
-        
-        # Term and termination
-        "termination", "expiration", "duration", "term", "cancel", "renew",
-        
-        # Legal elements
-        "agreement", "contract", "covenant", "warranty", "representation",
-        "liability", "indemnity", "indemnification", "damages", "remedies",
-        "breach", "default", "compliance", "force majeure",
+    # Documents too long for one prompt are summarized part by part, then
+    # the summaries of the parts are combined
+    chunks = _summary_chunks(segments, model, max_input_tokens)
+    
+    if len(chunks) > 1:
+        print(f"Summarizing in {len(chunks)} chunks")
+        summary = run_sync(_map_reduce_summary(chunks, model))
+        if summary is None:
+            # Chunks that did succeed are cached for the next attempt
+            return default_summary
+    else:
+        if chunks:
+            # Slightly over the budget but a single chunk; send it whole
+            trimmed_text = chunks[0]
+        else:
+            # For legal docs the beginning (parties, dates) matters most,
+            # then the paragraphs that rank best for a summary
+            trimmed_text = SUMMARY_RANKER.build_context(
+                segments, max_input_tokens, model,
+                lead_tokens=max_input_tokens // 4, min_passages=3
+            )
         
-        # Payment and compensation
-        "payment", "compensation", "fee", "expense", "cost", "price", "tax",
+        # Use the safe API call
+        prompt = f"Summarize only the most important details from this legal document:\n\n{trimmed_text}"
         
-        # Dispute resolution
-        "dispute", "arbitration", "mediation", "jurisdiction", "governing law"
-    ]
+        summary = safe_openai_call(
+            model=model,
+            messages=[
+                {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=500,
+            expected_format='text',
+            default_result=default_summary,
+            feature="summarize"
+        )
     
-    # Look for important sections with keywords
-    important_sections = ""
-    remaining_chars = input_char_limit // 2
+    # Update document with summary
+    save_content(document_id, {"summary": summary})
+    db.documents.update_one(
+        {"_id": document_id},
+        {"$set": {"summarized": True}}
+    )
     
-    # Extract paragraphs containing keywords
-    paragraphs = extracted_text.split('\n\n')
+    return summary
+
+def _summary_chunks(segments, model, max_input_tokens=SUMMARY_MAX_INPUT_TOKENS):
+    """
+    Section chunks of a document too long to summarize in one prompt
     
-    # Keep track of how many paragraphs we've found with keywords
-    paragraphs_found = 0
+    Returns:
+        The chunks, or an empty list if the document fits the prompt or
+        map-reduce summaries are off or it is too long even for those
+    """
+    document_tokens = count_tokens(segments.text, model)
+    if SUMMARY_MAP_REDUCE_ENABLED and max_input_tokens < document_tokens <= SUMMARY_MAP_REDUCE_MAX_TOKENS:
+        return section_chunks(segments, SUMMARY_CHUNK_TOKENS, model)
+    return []
+
+async def _summarize_parts(model, parts, instruction, max_tokens, feature):
+    """
+    Summarize texts concurrently, at most SUMMARY_MAP_CONCURRENCY at a time
     
-    for para in paragraphs:
-        if remaining_chars <= 0:
-            break
-            
-        if any(keyword.lower() in para.lower() for keyword in keywords):
-            if len(para) <= remaining_chars:
-                important_sections += para + "\n\n"
-                remaining_chars -= len(para) + 2
-                paragraphs_found += 1
-    
-    # Fallback: If we didn't find enough paragraphs with keywords,
-    # include evenly spaced sections from the document
-    if paragraphs_found < 3 and len(paragraphs) > 5:
-        # Calculate how many additional paragraphs to include
-        paragraphs_to_add = min(5, len(paragraphs)) - paragraphs_found
-        if paragraphs_to_add > 0:
-            # Select paragraphs at regular intervals through the document
-            step = len(paragraphs) // (paragraphs_to_add + 1)
-            for i in range(step, len(paragraphs), step):
-                if remaining_chars <= 0 or paragraphs_to_add <= 0:
-                    break
-                    
-                para = paragraphs[i]
-                if len(para) <= remaining_chars:
-                    important_sections += para + "\n\n"
-                    remaining_chars -= len(para) + 2
-                    paragraphs_to_add -= 1
-    
-    # Combine beginning and important sections
-    trimmed_text = beginning + "\n\n" + important_sections
-    
-    # Use the safe API call
-    prompt = f"Summarize only the most important details from this legal document:\n\n{trimmed_text}"
+    The prompt holds nothing but the instruction and the text, so the
+    response cache (see llm_cache) answers any part summarized before, in
+    this document or another - e.g. the unchanged sections of a re-uploaded
+    document.
     
-    default_summary = "Unable to generate summary at this time. Please try again later."
+    Returns:
+        The summaries in the order of parts, None for any that failed
+    """
+    semaphore = asyncio.Semaphore(SUMMARY_MAP_CONCURRENCY)
+    
+    async def summarize(part):
+        async with semaphore:
+            return await async_openai_call(
+                model=model,
+                messages=[
+                    {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                    {"role": "user", "content": f"{instruction}\n\n{part}"}
+                ],
+                max_tokens=max_tokens,
+                expected_format='text',
+                default_result=None,
+                feature=feature
+            )
+    
+    return await asyncio.gather(*(summarize(part) for part in parts))
+
+async def _map_reduce_summary(chunks, model):
+    """
+    Summarize a long document from its chunks
     
-    summary = safe_openai_call(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are a legal assistant that creates concise summaries. Focus only on identifying: 1) parties involved, 2) key dates, 3) main obligations, 4) termination conditions."},
-            {"role": "user", "content": prompt}
-        ],
-        max_tokens=500,
-        expected_format='text',
-        default_result=default_summary
-    )
+    Each chunk is summarized on its own (map); the partial summaries are then
+    combined into one (reduce). Partial summaries too long to combine in one
+    prompt are first combined in consecutive groups, as often as needed.
     
-    # Update document with summary
-    db.documents.update_one(
-        {"_id": document_id},
-        {"$set": {
-            "summary": summary, 
-            "summarized": True
-        }}
+    Returns:
+        The summary, or None if any call failed
+    """
+    partials = await _summarize_parts(
+        model, chunks, CHUNK_SUMMARY_INSTRUCTION, 300, "summarize_chunk"
     )
     
-    return summary
+    while None not in partials and len(partials) > 1:
+        joined = "\n\n".join(partials)
+        if count_tokens(joined, model) <= SUMMARY_REDUCE_INPUT_TOKENS:
+            break
+        groups = []
+        budget = None
+        for partial in partials:
+            if budget is None or not budget.add(partial + "\n\n"):
+                groups.append([])
+                budget = TokenBudget(SUMMARY_REDUCE_INPUT_TOKENS, model)
+                budget.add(partial + "\n\n")
+            groups[-1].append(partial)
+        partials = await _summarize_parts(
+            model, ["\n\n".join(group) for group in groups], REDUCE_SUMMARY_INSTRUCTION, 500, "summarize_reduce"
+        )
+    
+    if None in partials:
+        print(f"{partials.count(None)} of {len(partials)} partial summaries failed")
+        return None
+    
+    summaries = await _summarize_parts(
+        model, ["\n\n".join(partials)], REDUCE_SUMMARY_INSTRUCTION, 500, "summarize_reduce"
+    )
+    return summaries[0]
 
 def extract_key_info(document_id):
     """Extract key information from document using OpenAI's API"""
     db = get_database()
     
     # Check if key info has already been extracted
-    document = db.documents.find_one({"_id": document_id})
+    document = db.documents.find_one({"_id": document_id}, METADATA_PROJECTION)
     if not document:
         return None
         
     # Return existing key info if available
-    if document.get("info_extracted") and document.get("key_info"):
-        print("Using cached key info - no API call needed")
-        return document["key_info"]
+    if document.get("info_extracted"):
+        key_info = load_content(document_id, ("key_info",)).get("key_info")
+        if key_info:
+            print("Using cached key info - no API call needed")
+            return key_info
     
     # Check if text has been extracted
-    if "extracted_text" not in document:
+    segments = load_segments(document_id)
+    if segments is None:
         return "Text extraction needed before key info extraction"
     
-    extracted_text = document["extracted_text"]
-    
-    # Limit input tokens to control costs
-    max_input_tokens = 2000
-    input_char_limit = max_input_tokens * 4
+    # Most fields are stated in fixed phrasings that patterns find; only the
+    # rest are asked of the model
+    key_info, confidence = resolve_key_info(segments.text)
+    missing_fields = [field for field in KEY_INFO_FIELDS if field not in key_info]
     
-    # For legal documents, focus on sections with key information
-    # Expanded list of important terms to look for
-    important_terms = [
-        # Parties and identification
-        "parties:", "between:", "agreement between", "this agreement", 
+    if missing_fields:
+        model = "gpt-3.5-turbo"
         
-        # Dates and timing
-        "effective date:", "date of this agreement", "commencement date:",
-        "term:", "duration:", "period of", 
+        # Limit input tokens to control costs
+        max_input_tokens = 2000
         
-        # Termination
-        "termination:", "terminate:", "expiration:", "cancellation:",
-        
-        # Payment and financial
-        "payment:", "fee:", "compensation:", "consideration:", "price:",
-        "amount:", "cost:", "expense:", "invoice:", "billing:",
-        
-        # Confidentiality
-        "confidentiality:", "confidential information:", "non-disclosure:",
-        "proprietary information:", "trade secret:",
-        
-        # Liability
-        "liability:", "limitation of liability:", "indemnification:", 
-        "indemnity:", "hold harmless:", "warranty:", "representation:",
+        # The beginning usually names the parties; then the paragraphs that
+        # rank best for the fields we extract
+        key_sections = KEY_INFO_RANKER.build_context(
+            segments, max_input_tokens, model,
+            lead_tokens=max_input_tokens // 4, min_passages=5
+        )
         
-        # Governing law
-        "governing law:", "jurisdiction:", "venue:", "applicable law:",
-        "dispute resolution:", "arbitration:", "mediation:"
-    ]
-    
-    # First, get the beginning of the document (usually contains parties)
-    intro_limit = min(input_char_limit // 4, len(extracted_text))
-    key_sections = extracted_text[:intro_limit]
-    remaining_chars = input_char_limit - intro_limit
-    
-    # Split into paragraphs for analysis
-    paragraphs = extracted_text.split('\n\n')
-    
-    # Keep track of how many important paragraphs we've found
-    sections_found = 0
-    
-    # Then find paragraphs with important terms
-    for para in paragraphs:
-        if remaining_chars <= 0:
-            break
-            
-        lower_para = para.lower()
-        if any(term.lower() in lower_para for term in important_terms):
-            if len(para) <= remaining_chars:
-                key_sections += "\n\n" + para
-                remaining_chars -= len(para) + 2
-                sections_found += 1
-    
-    # Fallback: If we didn't find enough sections with important terms,
-    # include sections at regular intervals
-    if sections_found < 5 and len(paragraphs) > 10:
-        # Calculate how many additional paragraphs to include
-        sections_to_add = min(5, len(paragraphs) // 2) - sections_found
-        if sections_to_add > 0:
-            # Choose paragraphs at regular intervals
-            interval = len(paragraphs) // (sections_to_add + 1)
-            for i in range(interval, len(paragraphs), interval):
-                if remaining_chars <= 0 or sections_to_add <= 0:
-                    break
-                
-                para = paragraphs[i]
-                if len(para) <= remaining_chars:
-                    key_sections += "\n\n" + para
-                    remaining_chars -= len(para) + 2
-                    sections_to_add -= 1
-    
-    # Use the safe API call with structured JSON format
-    prompt = f"""Extract only the following key information from this legal document in JSON format. If information is not found, indicate 'Not specified':
-1. Parties
-2. Effective Date
-3. Term/Duration
-4. Governing Law
-5. Key Payment Terms
+        # Use the safe API call with structured JSON format
+        field_list = "\n".join(f"{number}. {field}" for number, field in enumerate(missing_fields, start=1))
+        prompt = f"""Extract only the following key information from this legal document as a JSON object with exactly these keys. If information is not found, indicate '{NOT_SPECIFIED}':
+{field_list}
 
 Document:
 {key_sections}"""
-
-    default_info = {
-        "Parties": "Not specified",
-        "Effective Date": "Not specified",
-        "Term/Duration": "Not specified",
-        "Governing Law": "Not specified",
-        "Key Payment Terms": "Not specified"
-    }
+        
+        model_info = safe_openai_call(
+            model=model,
+            messages=[
+                {"role": "system", "content": "You are a legal assistant that extracts specific key information only. Extract only the fields asked for."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=500,
+            expected_format='json',
+            default_result={},
+            feature="key_info"
+        )
+        if not isinstance(model_info, dict):
+            model_info = {}
+        for field in missing_fields:
+            key_info[field] = model_info.get(field, NOT_SPECIFIED)
+            confidence[field] = None
+    else:
+        print("Key info found by patterns - no API call needed")
     
-    key_info = safe_openai_call(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are a legal assistant that extracts specific key information only. Extract only: parties, dates, governing law, and payment terms if present."},
-            {"role": "user", "content": prompt}
-        ],
-        max_tokens=500,
-        expected_format='json',
-        default_result=default_info
-    )
+    key_info = {field: key_info[field] for field in KEY_INFO_FIELDS}
     
     # Update document with key info
+    save_content(document_id, {"key_info": key_info})
     db.documents.update_one(
         {"_id": document_id},
-        {"$set": {
-            "key_info": key_info, 
-            "info_extracted": True
-        }}
+        {"$set": {"info_extracted": True, "key_info_confidence": confidence}}
     )
     
     return key_info
     
+def normalize_category(suggested_category):
+    """Map a model's category answer onto one of DOCUMENT_CATEGORIES"""
+    suggested_category = str(suggested_category or "").strip('".,;:').strip()
+    if suggested_category.lower() == "nda" or "non-disclosure" in suggested_category.lower():
+        suggested_category = "NDA"
+    elif "privacy" in suggested_category.lower():
+        suggested_category = "Privacy Policy"
+    elif "service" in suggested_category.lower() or "tos" in suggested_category.lower():
+        suggested_category = "Terms of Service"
+    elif "employment" in suggested_category.lower():
+        suggested_category = "Employment"
+    elif "license" in suggested_category.lower():
+        suggested_category = "License"
+    elif "contract" in suggested_category.lower():
+        suggested_category = "Contract"
+    elif "agreement" in suggested_category.lower():
+        suggested_category = "Agreement"
+    elif "brief" in suggested_category.lower() or "legal brief" in suggested_category.lower():
+        suggested_category = "Legal Brief"
+    else:
+        suggested_category = "Other"
+    
+    return suggested_category
+
 def suggest_document_category(document_id):
     """Suggest a document category based on content analysis"""
     db = get_database()
     
     # Check if document exists
-    document = db.documents.find_one({"_id": document_id})
+    document = db.documents.find_one({"_id": document_id}, METADATA_PROJECTION)
     if not document:
         return None
         
     # Check if text has been extracted
-    if "extracted_text" not in document:
+    extracted_text = get_document_text(document_id)
+    if extracted_text is None:
         return "Text extraction needed before categorization"
     
-    extracted_text = document["extracted_text"]
+    # The local classifier answers most documents without an API call
+    local_category = category_classifier.classify(extracted_text, document.get("name"))
+    if local_category:
+        return local_category
+    
+    model = "gpt-3.5-turbo"
     
     # Limit input tokens to control costs
     max_input_tokens = 1500
-    input_char_limit = max_input_tokens * 4
     
     # Get important parts of the document
     # Beginning often contains the document type/title
-    beginning = extracted_text[:input_char_limit]
+    beginning = truncate_to_tokens(extracted_text, max_input_tokens, model)
     
     # Use safe API call
     prompt = f"Based on the following document text, classify it into one of these categories: NDA, Contract, Agreement, Employment, Legal Brief, Terms of Service, Privacy Policy, License, or Other. Return only the category name.\n\n{beginning}"
@@ -442,43 +772,170 @@ def suggest_document_category(document_id):
     default_category = "Other"
     
     suggested_category = safe_openai_call(
-        model="gpt-3.5-turbo",
+        model=model,
         messages=[
             {"role": "system", "content": "You are a legal document classifier. Analyze the text and determine the document type from these categories only: 'NDA', 'Contract', 'Agreement', 'Employment', 'Legal Brief', 'Terms of Service', 'Privacy Policy', 'License', or 'Other'."},
             {"role": "user", "content": prompt}
         ],
         max_tokens=10,
         expected_format='text',
-        default_result=default_category
+        default_result=default_category,
+        feature="category"
     )
     
     # Normalize the category
-    suggested_category = suggested_category.strip('".,;:').strip()
-    if suggested_category.lower() == "nda" or "non-disclosure" in suggested_category.lower():
-        suggested_category = "NDA"
-    elif "privacy" in suggested_category.lower():
-        suggested_category = "Privacy Policy"
-    elif "service" in suggested_category.lower() or "tos" in suggested_category.lower():
-        suggested_category = "Terms of Service"
-    elif "employment" in suggested_category.lower():
-        suggested_category = "Employment"
-    elif "license" in suggested_category.lower():
-        suggested_category = "License"
-    elif "contract" in suggested_category.lower():
-        suggested_category = "Contract"
-    elif "agreement" in suggested_category.lower():
-        suggested_category = "Agreement"
-    elif "brief" in suggested_category.lower() or "legal brief" in suggested_category.lower():
-        suggested_category = "Legal Brief"
-    else:
-        suggested_category = "Other"
+    suggested_category = normalize_category(suggested_category)
     
     return suggested_category
 
-def get_field_suggestions(template_id, field_id, context=None):
+def analyze_document(document_id):
+    """
+    Summarize, extract key info and categorize a document with one API call
+    
+    Builds a single context for all three tasks instead of three separate
+    prompts. A document too long for one summary prompt is summarized by
+    map-reduce instead, alongside the call for the rest. The summary and key
+    info are stored as summarize_document and extract_key_info would store
+    them; the category is only applied if the document is still
+    uncategorized.
+    
+    Returns:
+        dict with "summary", "key_info", "key_info_confidence" and
+        "category", None if the document does not exist, or a message
+        string if its text is not extracted yet
+    """
+    db = get_database()
+    
+    document = db.documents.find_one({"_id": document_id}, METADATA_PROJECTION)
+    if not document:
+        return None
+    
+    current_category = document.get("category")
+    uncategorized = current_category in ["Uncategorized", None, ""]
+    
+    # Everything already done - nothing to send
+    if document.get("summarized") and document.get("info_extracted") and not uncategorized:
+        content = load_content(document_id, ("summary", "key_info"))
+        if content.get("summary") and content.get("key_info"):
+            print("Using cached analysis - no API call needed")
+            return {
+                "summary": content["summary"],
+                "key_info": content["key_info"],
+                "key_info_confidence": document.get("key_info_confidence"),
+                "category": current_category
+            }
+    
+    segments = load_segments(document_id)
+    if segments is None:
+        return "Text extraction needed before analysis"
+    
+    # The category is only asked for if it is needed and the local
+    # classifier can't tell
+    local_category = category_classifier.classify(segments.text, document.get("name")) if uncategorized else None
+    ask_category = uncategorized and not local_category
+    
+    # Likewise only the key info fields the patterns can't find
+    key_info, confidence = resolve_key_info(segments.text)
+    missing_fields = [field for field in KEY_INFO_FIELDS if field not in key_info]
+    
+    model = "gpt-3.5-turbo"
+    
+    # A document too long for one prompt gets the map-reduce summary
+    # summarize_document would give it, not one of the shared context
+    summary_chunks = _summary_chunks(segments, model)
+    long_document = len(summary_chunks) > 1
+    ask_model = not long_document or missing_fields or ask_category
+    
+    calls = []
+    if long_document:
+        print(f"Summarizing {len(summary_chunks)} chunks alongside the analysis")
+        calls.append(_map_reduce_summary(summary_chunks, model))
+    
+    if ask_model:
+        # One context serves all three tasks: the beginning carries the title,
+        # parties and dates, then paragraphs relevant to the summary or key info
+        max_input_tokens = 2500
+        context = ANALYSIS_RANKER.build_context(
+            segments, max_input_tokens, model,
+            lead_tokens=max_input_tokens // 4, min_passages=3
+        )
+        
+        keys = []
+        if not long_document:
+            keys.append('"summary": a concise summary covering 1) parties involved, 2) key dates, 3) main obligations, 4) termination conditions')
+        if missing_fields:
+            field_names = ", ".join(f'"{field}"' for field in missing_fields)
+            keys.append(f'"key_info": an object with the keys {field_names}; use \'{NOT_SPECIFIED}\' for anything not found')
+        if ask_category:
+            category_names = ", ".join(f"'{category}'" for category in DOCUMENT_CATEGORIES)
+            keys.append(f'"category": one of {category_names}')
+        key_lines = "\n".join(keys)
+        
+        prompt = f"""Analyze this legal document and respond with a single JSON object with exactly these keys:
+{key_lines}
+
+Document:
+{context}"""
+        
+        calls.append(async_openai_call(
+            model=model,
+            messages=[
+                {"role": "system", "content": "You are a legal assistant that summarizes, extracts key information from and classifies legal documents. Respond only with JSON."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=900,
+            expected_format='json',
+            default_result=None,
+            feature="document_analysis"
+        ))
+    
+    results = gather_sync(calls)
+    result = results[-1] if ask_model else {}
+    
+    if not isinstance(result, dict) or result.get("error") is True:
+        return {"error": "Unable to analyze document at this time. Please try again later."}
+    if long_document:
+        # Parts that did succeed are cached for the next attempt
+        summary = results[0]
+    else:
+        summary = result.get("summary")
+        if summary and not isinstance(summary, str):
+            summary = json.dumps(summary)
+    if not summary:
+        return {"error": "Unable to analyze document at this time. Please try again later."}
+    
+    model_info = result.get("key_info") if isinstance(result.get("key_info"), dict) else {}
+    for field in missing_fields:
+        key_info[field] = model_info.get(field, NOT_SPECIFIED)
+        confidence[field] = None
+    key_info = {field: key_info[field] for field in KEY_INFO_FIELDS}
+    
+    # Store all three results together
+    save_content(document_id, {"summary": summary, "key_info": key_info})
+    update = {
+        "summarized": True,
+        "info_extracted": True,
+        "key_info_confidence": confidence,
+        "analyzed_at": datetime.utcnow()
+    }
+    if uncategorized:
+        category = local_category or normalize_category(result.get("category"))
+        # Marked so the classifier isn't trained on its own suggestions
+        update["category"] = category
+        update["category_source"] = "suggested"
+    else:
+        category = current_category
+    db.documents.update_one({"_id": document_id}, {"$set": update})
+    
+    return {"summary": summary, "key_info": key_info, "key_info_confidence": confidence, "category": category}
+
+async def get_field_suggestions_async(template_id, field_id, context=None):
     """
     Enhanced function to get AI suggestions for a specific field based on context
     
+    Coroutine version, so suggestions for several fields can be requested
+    together with llm_client.gather_sync
+    
     Args:
         template_id (str): The template identifier
         field_id (str): The field identifier to get suggestions for
@@ -628,7 +1085,7 @@ IMPORTANT: Provide ONLY the suggested text value. No explanations or labels."""
         default_suggestion = default_suggestions.get(field_id, "Example value")
         
         # Make the API call
-        suggestion = safe_openai_call(
+        suggestion = await async_openai_call(
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": "You are a legal contract drafting assistant. Provide realistic, specific information."},
@@ -636,7 +1093,8 @@ IMPORTANT: Provide ONLY the suggested text value. No explanations or labels."""
             ],
             max_tokens=150,
             expected_format='text',
-            default_result=default_suggestion
+            default_result=default_suggestion,
+            feature="field_suggestion"
         )
         
         # Clean up the response
@@ -665,6 +1123,10 @@ IMPORTANT: Provide ONLY the suggested text value. No explanations or labels."""
             "value": default_suggestions.get(field_id, "Example value"),
             "label": field_labels.get(field_id, field_id.replace('_', ' ').title())
         }
+
+def get_field_suggestions(template_id, field_id, context=None):
+    """Blocking version of get_field_suggestions_async"""
+    return run_sync(get_field_suggestions_async(template_id, field_id, context))
     
 
 def analyze_contract_content(template_id, contract_text, form_data=None):
@@ -737,7 +1199,8 @@ Provide your analysis in JSON format with these keys:
         ],
         max_tokens=800,
         expected_format='json',
-        default_result=default_result
+        default_result=default_result,
+        feature="contract_analysis"
     )
 
 def suggest_contract_template(user_requirements):
@@ -787,5 +1250,6 @@ Provide your recommendation in this JSON format:
         ],
         max_tokens=200,
         expected_format='json',
-        default_result=default_recommendation
+        default_result=default_recommendation,
+        feature="template_recommendation"
     )
\ No newline at end of file
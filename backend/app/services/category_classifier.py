@@ -0,0 +1,346 @@
+# backend/app/services/category_classifier.py
+
+import math
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from app.config.database import get_database
+from app.config.config import (
+    CATEGORY_CLASSIFIER_ENABLED, CATEGORY_CLASSIFIER_THRESHOLD, CATEGORY_CLASSIFIER_MIN_DOCUMENTS,
+    CATEGORY_CLASSIFIER_TEXT_CHARS, CATEGORY_CLASSIFIER_MAX_FEATURES, CATEGORY_CLASSIFIER_RELOAD_SECONDS
+)
+from app.services.content_store import load_texts
+
+db = get_database()
+
+# Suggests document categories without an API call. A naive Bayes model over
+# TF-IDF weighted words and word pairs of a document's file name and opening
+# text is trained from documents whose category users chose themselves,
+# i.e. those with category_source "user", set when a category is picked at
+# upload. Suggested categories are marked "suggested" and left out, as are
+# documents with no category_source at all: those predate the marking and
+# include categories filled in by the old suggestion endpoint, which would
+# train the model on past LLM guesses. The model is stored in the
+# category_models collection, so every worker uses the one most recently
+# trained, and callers fall back to the LLM when its confidence is below
+# CATEGORY_CLASSIFIER_THRESHOLD.
+#
+# Retrain and print the cross-validated accuracy report with
+#   python -m app.services.category_classifier train
+MODEL_ID = "current"
+
+# Additive smoothing of per-category term weights
+ALPHA = 0.1
+# A term must occur in this many training documents to become a feature
+MIN_DOCUMENT_FREQUENCY = 2
+CROSS_VALIDATION_FOLDS = 5
+REPORT_THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.9, 0.95)
+
+WORD_PATTERN = re.compile(r"[a-z][a-z0-9]+")
+
+_lock = threading.Lock()
+_model = None
+_checked_at = 0.0
+_stats = {"classifier": 0, "llm": 0}
+
+
+def _features(text, name=None):
+    """Term counts of a document: words and adjacent word pairs"""
+    text = ((name or "").replace("_", " ") + "\n" + (text or "")[:CATEGORY_CLASSIFIER_TEXT_CHARS]).lower()
+    words = WORD_PATTERN.findall(text)
+    counts = Counter(words)
+    counts.update(f"{first} {second}" for first, second in zip(words, words[1:]))
+    return counts
+
+
+class NaiveBayesModel:
+    """Multinomial naive Bayes over L2-normalised TF-IDF vectors"""
+
+    def __init__(self, categories, idf, log_priors, log_likelihoods, trained_at=None):
+        self.categories = categories
+        self.idf = idf
+        self.log_priors = log_priors
+        # term -> log P(term | category) for each category, in category order
+        self.log_likelihoods = log_likelihoods
+        self.trained_at = trained_at
+
+    @classmethod
+    def train(cls, samples, max_features=CATEGORY_CLASSIFIER_MAX_FEATURES):
+        """
+        Fit a model.
+
+        Args:
+            samples: List of (term counts, category)
+            max_features: Most frequent terms kept as features
+        """
+        categories = sorted({category for _, category in samples})
+        document_frequency = Counter()
+        for counts, _ in samples:
+            document_frequency.update(counts.keys())
+        vocabulary = [
+            term for term, df in document_frequency.most_common(max_features)
+            if df >= MIN_DOCUMENT_FREQUENCY
+        ]
+        total = len(samples)
+        idf = {term: math.log((1 + total) / (1 + document_frequency[term])) + 1 for term in vocabulary}
+
+        index = {category: i for i, category in enumerate(categories)}
+        documents = [0] * len(categories)
+        weights = {term: [0.0] * len(categories) for term in vocabulary}
+        for counts, category in samples:
+            i = index[category]
+            documents[i] += 1
+            for term, weight in _tfidf(counts, idf).items():
+                weights[term][i] += weight
+
+        totals = [sum(row[i] for row in weights.values()) for i in range(len(categories))]
+        log_likelihoods = {
+            term: [
+                math.log((row[i] + ALPHA) / (totals[i] + ALPHA * len(vocabulary)))
+                for i in range(len(categories))
+            ]
+            for term, row in weights.items()
+        }
+        log_priors = [math.log(count / total) for count in documents]
+        return cls(categories, idf, log_priors, log_likelihoods)
+
+    def predict(self, counts):
+        """(category, probability) of the most likely category"""
+        scores = list(self.log_priors)
+        for term, weight in _tfidf(counts, self.idf).items():
+            for i, log_likelihood in enumerate(self.log_likelihoods[term]):
+                scores[i] += weight * log_likelihood
+        best = max(range(len(scores)), key=scores.__getitem__)
+        total = sum(math.exp(score - scores[best]) for score in scores)
+        return self.categories[best], 1 / total
+
+    def to_document(self):
+        terms = list(self.idf)
+        return {
+            "categories": self.categories,
+            "terms": terms,
+            "idf": [self.idf[term] for term in terms],
+            "log_priors": self.log_priors,
+            "log_likelihoods": [self.log_likelihoods[term] for term in terms]
+        }
+
+    @classmethod
+    def from_document(cls, document):
+        terms = document["terms"]
+        return cls(
+            document["categories"],
+            dict(zip(terms, document["idf"])),
+            document["log_priors"],
+            dict(zip(terms, document["log_likelihoods"])),
+            document.get("trained_at")
+        )
+
+
+def _tfidf(counts, idf):
+    """Sublinear TF-IDF weights of the known terms, scaled to unit length"""
+    vector = {term: (1 + math.log(count)) * idf[term] for term, count in counts.items() if term in idf}
+    norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+    return {term: weight / norm for term, weight in vector.items()}
+
+
+def _current_model():
+    """The stored model, reloaded when another process has retrained it"""
+    global _model, _checked_at
+    now = time.monotonic()
+    with _lock:
+        if now - _checked_at < CATEGORY_CLASSIFIER_RELOAD_SECONDS:
+            return _model
+        _checked_at = now
+        model = _model
+
+    try:
+        stored = db.category_models.find_one({"_id": MODEL_ID}, {"trained_at": 1})
+        if stored is None:
+            model = None
+        elif model is None or model.trained_at != stored["trained_at"]:
+            document = db.category_models.find_one({"_id": MODEL_ID})
+            model = NaiveBayesModel.from_document(document)
+            print(f"Loaded category classifier trained at {model.trained_at}")
+    except Exception as e:
+        print(f"Error loading category classifier: {str(e)}")
+
+    with _lock:
+        _model = model
+    return model
+
+
+def classify(text, name=None):
+    """
+    Category of a document if the local model is confident enough.
+
+    Args:
+        text: Extracted text of the document
+        name: File name of the document
+
+    Returns:
+        The category, or None if the caller should ask the LLM
+    """
+    model = _current_model() if CATEGORY_CLASSIFIER_ENABLED else None
+    if model is None:
+        return None
+
+    category, confidence = model.predict(_features(text, name))
+    if confidence < CATEGORY_CLASSIFIER_THRESHOLD:
+        print(f"Category classifier unsure ({category}, {confidence:.2f}); asking the model")
+        with _lock:
+            _stats["llm"] += 1
+        return None
+
+    with _lock:
+        _stats["classifier"] += 1
+    return category
+
+
+def classifier_stats():
+    """Suggestions answered locally and passed on to the LLM by this process"""
+    with _lock:
+        return dict(_stats)
+
+
+def load_training_samples(categories):
+    """(term counts, category) of every document a user categorized as one of categories"""
+    documents = list(db.documents.find(
+        {
+            "category": {"$in": list(categories)},
+            "category_source": "user",
+            "text_extracted": True
+        },
+        {"_id": 1, "name": 1, "category": 1}
+    ).sort("_id", 1))
+
+    samples = []
+    for start in range(0, len(documents), 100):
+        batch = documents[start:start + 100]
+        texts = load_texts(document["_id"] for document in batch)
+        for document in batch:
+            if document["_id"] in texts:
+                counts = _features(texts[document["_id"]], document.get("name"))
+                samples.append((counts, document["category"]))
+    return samples
+
+
+def evaluate(samples, folds=CROSS_VALIDATION_FOLDS):
+    """
+    Cross-validated accuracy of models trained on samples.
+
+    Returns:
+        dict with overall accuracy, per-category precision and recall, and
+        for each of REPORT_THRESHOLDS the share of documents that would be
+        answered locally and the accuracy of those answers
+    """
+    predictions = []
+    for fold in range(folds):
+        training = [sample for i, sample in enumerate(samples) if i % folds != fold]
+        held_out = [sample for i, sample in enumerate(samples) if i % folds == fold]
+        if not held_out or len({category for _, category in training}) < 2:
+            continue
+        model = NaiveBayesModel.train(training)
+        for counts, actual in held_out:
+            predicted, confidence = model.predict(counts)
+            predictions.append((actual, predicted, confidence))
+
+    if not predictions:
+        return {"documents": len(samples), "accuracy": None, "categories": {}, "thresholds": []}
+
+    categories = {}
+    for category in sorted({actual for actual, _, _ in predictions}):
+        true_positives = sum(1 for actual, predicted, _ in predictions if actual == predicted == category)
+        predicted_count = sum(1 for _, predicted, _ in predictions if predicted == category)
+        support = sum(1 for actual, _, _ in predictions if actual == category)
+        categories[category] = {
+            "support": support,
+            "precision": round(true_positives / predicted_count, 3) if predicted_count else None,
+            "recall": round(true_positives / support, 3)
+        }
+
+    thresholds = []
+    for threshold in REPORT_THRESHOLDS:
+        answered = [(actual, predicted) for actual, predicted, confidence in predictions if confidence >= threshold]
+        correct = sum(1 for actual, predicted in answered if actual == predicted)
+        thresholds.append({
+            "threshold": threshold,
+            "coverage": round(len(answered) / len(predictions), 3),
+            "accuracy": round(correct / len(answered), 3) if answered else None
+        })
+
+    correct = sum(1 for actual, predicted, _ in predictions if actual == predicted)
+    return {
+        "documents": len(samples),
+        "accuracy": round(correct / len(predictions), 3),
+        "categories": categories,
+        "thresholds": thresholds
+    }
+
+
+def train_classifier():
+    """
+    Train on all user-categorized documents, evaluate and store the model.
+
+    Returns:
+        The accuracy report, or None if there is not enough training data
+    """
+    from app.services.ai_processor import DOCUMENT_CATEGORIES
+
+    samples = load_training_samples(DOCUMENT_CATEGORIES)
+    labels = {category for _, category in samples}
+    if len(samples) < CATEGORY_CLASSIFIER_MIN_DOCUMENTS or len(labels) < 2:
+        print(f"Not enough categorized documents to train on "
+              f"({len(samples)} documents, {len(labels)} categories)")
+        return None
+
+    report = evaluate(samples)
+    model = NaiveBayesModel.train(samples)
+    trained_at = datetime.utcnow()
+    db.category_models.replace_one(
+        {"_id": MODEL_ID},
+        {**model.to_document(), "trained_at": trained_at, "report": report},
+        upsert=True
+    )
+    print(f"Trained category classifier on {len(samples)} documents "
+          f"with {len(model.idf)} features")
+    return report
+
+
+def format_report(report):
+    lines = [f"Documents: {report['documents']}"]
+    if report["accuracy"] is None:
+        return "\n".join(lines + ["Not enough documents to cross-validate"])
+    lines.append(f"Cross-validated accuracy: {report['accuracy']:.3f}")
+    lines.append("")
+    lines.append(f"{'Category':<20}{'Support':>9}{'Precision':>11}{'Recall':>9}")
+    for category, row in report["categories"].items():
+        precision = "-" if row["precision"] is None else f"{row['precision']:.3f}"
+        lines.append(f"{category:<20}{row['support']:>9}{precision:>11}{row['recall']:>9.3f}")
+    lines.append("")
+    lines.append(f"{'Threshold':<11}{'Answered locally':>18}{'Accuracy':>10}")
+    for row in report["thresholds"]:
+        accuracy = "-" if row["accuracy"] is None else f"{row['accuracy']:.3f}"
+        marker = "  <- CATEGORY_CLASSIFIER_THRESHOLD" if row["threshold"] == CATEGORY_CLASSIFIER_THRESHOLD else ""
+        lines.append(f"{row['threshold']:<11}{row['coverage']:>18.1%}{accuracy:>10}{marker}")
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    # python -m app.services.category_classifier train|report
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == 'train':
+        result = train_classifier()
+        if result:
+            print(format_report(result))
+    elif command == 'report':
+        stored = db.category_models.find_one({"_id": MODEL_ID}, {"report": 1, "trained_at": 1})
+        if stored:
+            print(f"Trained at {stored['trained_at']}")
+            print(format_report(stored["report"]))
+        else:
+            print("No category classifier has been trained yet")
+    else:
+        print("Usage: python -m app.services.category_classifier train|report")
@@ -6,8 +6,13 @@ class DocumentComparisonService:
     def __init__(self):
         self.document_processor = DocumentProcessor()
 
-    def compare_documents(self, doc1_content, doc2_content):
-        """Compare two documents and return differences"""
+    def compare_documents(self, doc1_content, doc2_content, doc1_paragraphs=None, doc2_paragraphs=None):
+        """
+        Compare two documents and return differences.
+        
+        When the documents' paragraphs (segmented at ingest) are given, the
+        diff is computed paragraph by paragraph instead of line by line.
+        """
         
         # Extract and preprocess text
         text1 = self.document_processor.preprocess_text(
@@ -19,7 +24,12 @@ class DocumentComparisonService:
         
         # Generate diff
         differ = difflib.Differ()
-        diff = list(differ.compare(text1.splitlines(), text2.splitlines()))
+        if doc1_paragraphs is not None and doc2_paragraphs is not None:
+            lines1 = [self.document_processor.preprocess_text(p) for p in doc1_paragraphs]
+            lines2 = [self.document_processor.preprocess_text(p) for p in doc2_paragraphs]
+        else:
+            lines1, lines2 = text1.splitlines(), text2.splitlines()
+        diff = list(differ.compare(lines1, lines2))
         
         # Calculate similarity ratio
         similarity = SequenceMatcher(None, text1, text2).ratio()
@@ -0,0 +1,187 @@
+# backend/app/services/content_store.py
+
+import sys
+from datetime import datetime
+import pymongo
+from app.config.database import get_database
+from app.services.text_compression import compress_text, decompress_text, search_terms
+
+db = get_database()
+
+# Large text and analysis payloads live in document_content, keyed by the
+# document's _id, so listing documents only moves lightweight metadata
+CONTENT_FIELDS = (
+    "extracted_text",
+    "page_offsets",
+    "segmentation",
+    "summary",
+    "key_info",
+    "risk_assessment",
+    "clause_improvements",
+    "precedent_matches",
+    "compliance_check"
+)
+
+# Stored compressed; see text_compression
+COMPRESSED_FIELDS = ("extracted_text",)
+
+# Projection that keeps content payloads out of documents queries
+METADATA_PROJECTION = {field: 0 for field in CONTENT_FIELDS}
+
+PREVIEW_CHARS = 500
+
+
+def setup_content_indexes():
+    """
+    Create MongoDB indexes for the content store.
+    Should be called during application startup.
+    """
+    try:
+        # Compressed text cannot be indexed; replace an index built on it
+        # with one over the search_terms vocabulary
+        legacy_index = db.document_content.index_information().get("content_search_index")
+        if legacy_index and "extracted_text" in legacy_index.get("weights", {}):
+            db.document_content.drop_index("content_search_index")
+        db.document_content.create_index([("search_terms", "text")], name="content_search_index")
+        db.document_content.create_index([("user_id", pymongo.ASCENDING)], name="content_user_index")
+        print("MongoDB content store indexes have been set up successfully")
+    except Exception as e:
+        print(f"Error setting up content store indexes: {str(e)}")
+
+
+def text_metadata(text):
+    """Lightweight fields describing extracted text, stored on the document itself"""
+    return {"text_preview": text[:PREVIEW_CHARS], "text_length": len(text)}
+
+
+def save_content(document_id, fields, user_id=None):
+    """Store content payloads for a document, merging with what is already there"""
+    update = dict(fields)
+    if isinstance(update.get("extracted_text"), str):
+        update["search_terms"] = search_terms(update["extracted_text"])
+    for field in COMPRESSED_FIELDS:
+        if field in update:
+            update[field] = compress_text(update[field])
+    update["updated_at"] = datetime.utcnow()
+    if user_id is not None:
+        update["user_id"] = user_id
+    db.document_content.update_one({"_id": document_id}, {"$set": update}, upsert=True)
+
+
+def load_content(document_id, fields=CONTENT_FIELDS):
+    """
+    Load content payloads for a document.
+
+    Documents stored before the content store existed keep their payloads
+    inline; those are read from the documents collection instead.
+
+    Returns:
+        dict containing whichever of the requested fields exist
+    """
+    content = db.document_content.find_one({"_id": document_id}, {field: 1 for field in fields}) or {}
+    content.pop("_id", None)
+
+    missing = [field for field in fields if field not in content]
+    if missing:
+        legacy = db.documents.find_one({"_id": document_id}, {field: 1 for field in missing}) or {}
+        legacy.pop("_id", None)
+        content.update(legacy)
+
+    # Decompress only the fields that were asked for
+    for field in COMPRESSED_FIELDS:
+        if field in content:
+            content[field] = decompress_text(content[field])
+    return content
+
+
+def get_document_text(document_id):
+    """Return the extracted text of a document, or None"""
+    return load_content(document_id, ("extracted_text",)).get("extracted_text")
+
+
+def load_texts(document_ids):
+    """Return {document_id: extracted_text} for those of document_ids that have text"""
+    document_ids = list(document_ids)
+    texts = {
+        content["_id"]: decompress_text(content["extracted_text"])
+        for content in db.document_content.find(
+            {"_id": {"$in": document_ids}, "extracted_text": {"$exists": True}},
+            {"extracted_text": 1}
+        )
+    }
+    missing = [document_id for document_id in document_ids if document_id not in texts]
+    if missing:
+        for document in db.documents.find(
+            {"_id": {"$in": missing}, "extracted_text": {"$exists": True}},
+            {"extracted_text": 1}
+        ):
+            texts[document["_id"]] = document["extracted_text"]
+    return texts
+
+
+def copy_content(source_id, target_id, user_id=None, fields=("extracted_text", "page_offsets", "segmentation")):
+    """Copy content payloads from one document to another"""
+    # Copy stored values as they are, without a decompress/compress round trip
+    stored = db.document_content.find_one(
+        {"_id": source_id, "extracted_text": {"$exists": True}},
+        {field: 1 for field in fields + ("search_terms",)}
+    )
+    if stored is None:
+        content = load_content(source_id, fields)
+        if content:
+            save_content(target_id, content, user_id)
+        return bool(content)
+
+    stored.pop("_id")
+    stored["updated_at"] = datetime.utcnow()
+    if user_id is not None:
+        stored["user_id"] = user_id
+    db.document_content.update_one({"_id": target_id}, {"$set": stored}, upsert=True)
+    return True
+
+
+def delete_content(document_id):
+    db.document_content.delete_one({"_id": document_id})
+
+
+def migrate_inline_content(batch_size=100):
+    """
+    Move inline payloads of older documents into the content store.
+
+    Returns:
+        int: Number of documents migrated
+    """
+    query = {"$or": [{field: {"$exists": True}} for field in CONTENT_FIELDS]}
+    migrated = 0
+
+    while True:
+        batch = list(db.documents.find(query).limit(batch_size))
+        if not batch:
+            break
+
+        for document in batch:
+            fields = {field: document[field] for field in CONTENT_FIELDS if field in document}
+            save_content(document["_id"], fields, document.get("user_id"))
+
+            metadata = {}
+            if isinstance(fields.get("extracted_text"), str):
+                metadata = text_metadata(fields["extracted_text"])
+            update = {"$unset": {field: "" for field in fields}}
+            if metadata:
+                update["$set"] = metadata
+            db.documents.update_one({"_id": document["_id"]}, update)
+            migrated += 1
+
+        print(f"Migrated {migrated} documents to the content store")
+
+    return migrated
+
+
+if __name__ == '__main__':
+    # python -m app.services.content_store migrate
+    if len(sys.argv) > 1 and sys.argv[1] == 'migrate':
+        setup_content_indexes()
+        total = migrate_inline_content()
+        print(f"Done. {total} documents migrated.")
+    else:
+        print("Usage: python -m app.services.content_store migrate")
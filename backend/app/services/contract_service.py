@@ -7,7 +7,8 @@ import json
 import base64
 from bson import ObjectId
 from app.config.database import get_database
-from app.services.ai_processor import get_field_suggestions as ai_get_field_suggestions
+from app.services.ai_processor import get_field_suggestions_async as ai_get_field_suggestions_async
+from app.services.llm_client import gather_sync
 import re
 
 db = get_database()
@@ -411,16 +412,16 @@ def get_ai_field_suggestions(template_id, context=None):
     if not fields:
         return {}
     
-    # Get suggestions for each field
+    # Skip fields already provided in context
+    field_ids = [field['id'] for field in fields if not context.get(field['id'])]
+    
+    # Request suggestions for all remaining fields at once
+    suggestions = gather_sync(
+        ai_get_field_suggestions_async(template_id, field_id, context) for field_id in field_ids
+    )
+    
     results = {}
-    for field in fields:
-        field_id = field['id']
-        
-        # Skip fields already provided in context
-        if field_id in context and context[field_id]:
-            continue
-            
-        suggestion = ai_get_field_suggestions(template_id, field_id, context)
+    for field_id, suggestion in zip(field_ids, suggestions):
         if suggestion:
             results[field_id] = suggestion
     
@@ -1,13 +1,116 @@
 import os
 import PyPDF2
-from docx import Document
 import io
+import codecs
+import zipfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from app.config.database import get_database
-from typing import Optional
+from app.config.config import PDF_EXTRACTION_PROCESSES, PDF_PARALLEL_MIN_PAGES
+from app.services.file_storage import hash_file
+from app.services.extraction_cache import get_cached_extraction, put_cached_extraction
+from app.services.docx_extractor import extract_docx_text
+from app.services.content_store import save_content, text_metadata
+from app.services.segmentation import segment_text, SEGMENTATION_VERSION
+from typing import Optional, List, Tuple
+
+# Bump whenever extractor output changes so stale cache entries are ignored
+EXTRACTOR_VERSION = "3"
+
+# Number of leading bytes inspected to identify a file format
+SNIFF_BYTES = 8192
+
+# Format name -> extractor(source, progress_callback) -> (text, page_offsets),
+# where source is a file path or a binary file object
+_EXTRACTORS = {}
+
+# Shared pool for page-parallel PDF extraction, created on first use
+_pdf_executor = None
+_pdf_executor_lock = threading.Lock()
+
+def register_extractor(file_format):
+    """Decorator registering a text extractor for a sniffed file format"""
+    def decorator(func):
+        _EXTRACTORS[file_format] = func
+        return func
+    return decorator
+
+def get_extractor(file_format):
+    """Return the extractor registered for file_format, or None"""
+    return _EXTRACTORS.get(file_format)
+
+def detect_text_encoding(head: bytes) -> Optional[str]:
+    """Guess the encoding of text from its first bytes, or None if it looks binary"""
+    for bom, encoding in ((codecs.BOM_UTF8, 'utf-8-sig'),
+                          (codecs.BOM_UTF16_LE, 'utf-16'),
+                          (codecs.BOM_UTF16_BE, 'utf-16')):
+        if head.startswith(bom):
+            return encoding
+    
+    if b'\x00' in head:
+        return None
+    
+    try:
+        # Not final: the sample may end in the middle of a multi-byte character
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    
+    # Latin-1 decodes anything, so only accept it for mostly printable data
+    control_bytes = sum(1 for byte in head if byte < 32 and byte not in b'\t\n\r\f')
+    if control_bytes <= len(head) * 0.05:
+        return 'latin-1'
+    return None
+
+def detect_format(head: bytes) -> Optional[str]:
+    """
+    Identify a file format from its leading bytes.
+
+    Returns:
+        'pdf', 'docx', 'zip' (an archive that may still be OOXML), 'txt',
+        or None if the format is not recognized
+    """
+    # The PDF header may be preceded by junk, readers look in the first 1 KB
+    if b'%PDF-' in head[:1024]:
+        return 'pdf'
+    if head.startswith(b'PK\x03\x04'):
+        return 'docx' if b'word/' in head else 'zip'
+    if detect_text_encoding(head):
+        return 'txt'
+    return None
+
+def _read_head(source) -> bytes:
+    if isinstance(source, str):
+        with open(source, 'rb') as file:
+            return file.read(SNIFF_BYTES)
+    position = source.tell()
+    head = source.read(SNIFF_BYTES)
+    source.seek(position)
+    return head
+
+def sniff_format(source) -> Optional[str]:
+    """Identify the format of a file path or binary file object from its content"""
+    file_format = detect_format(_read_head(source))
+    
+    if file_format == 'zip':
+        # The word/ entries were not in the sample; consult the central directory
+        try:
+            with zipfile.ZipFile(source) as archive:
+                names = set(archive.namelist())
+        except zipfile.BadZipFile:
+            return None
+        finally:
+            if not isinstance(source, str):
+                source.seek(0)
+        return 'docx' if 'word/document.xml' in names else None
+    
+    return file_format
 
 class DocumentProcessor:
     def __init__(self):
-        self.supported_types = ['pdf', 'docx', 'txt']
+        self.supported_types = sorted(_EXTRACTORS)
 
     def extract_text(self, content: bytes) -> str:
         """Extract text from document content"""
@@ -15,23 +118,13 @@ class DocumentProcessor:
             return content
             
         if isinstance(content, bytes):
-            try:
-                # Try PDF
-                pdf_file = io.BytesIO(content)
-                pdf_reader = PyPDF2.PdfReader(pdf_file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text()
-                return text
-            except:
-                try:
-                    # Try DOCX
-                    doc = Document(io.BytesIO(content))
-                    text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-                    return text
-                except:
-                    # Return raw text if other formats fail
-                    return content.decode('utf-8', errors='ignore')
+            stream = io.BytesIO(content)
+            extractor = get_extractor(sniff_format(stream))
+            if extractor is None:
+                # Unrecognized content is treated as raw text
+                return content.decode('utf-8', errors='ignore')
+            text, _ = extractor(stream)
+            return text
         
         return ""
 
@@ -44,67 +137,215 @@ class DocumentProcessor:
         # Convert to lowercase for better comparison
         return text.lower()
 
-def extract_text_from_document(document_id) -> Optional[str]:
+def extract_text_from_document(document_id, progress_callback=None) -> Optional[str]:
     """Extract text from document based on its file type"""
     try:
-        db = get_database()
-        
-        # Get document from database
-        document = db.documents.find_one({"_id": document_id})
-        if not document:
-            return None
-        
-        file_path = document["file_path"]
-        file_type = document["file_type"].lower()
-        
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"File not found: {file_path}")
-        
-        extracted_text = ""
-        
-        # Extract text based on file type
-        if file_type == "pdf":
-            extracted_text = extract_from_pdf(file_path)
-        elif file_type == "docx":
-            extracted_text = extract_from_docx(file_path)
-        elif file_type == "txt":
-            extracted_text = extract_from_txt(file_path)
-        else:
-            raise ValueError(f"Unsupported file type: {file_type}")
-        
-        # Update document with extracted text
-        if extracted_text:
-            db.documents.update_one(
-                {"_id": document_id},
-                {"$set": {"extracted_text": extracted_text, "text_extracted": True}}
-            )
-        
-        return extracted_text
+        return process_document_text(document_id, progress_callback)
     except Exception as e:
         print(f"Error processing document {document_id}: {str(e)}")
         return None
 
-def extract_from_pdf(file_path: str) -> str:
-    """Extract text from PDF file"""
-    text = ""
+def process_document_text(document_id, progress_callback=None) -> Optional[str]:
+    """
+    Extract and store the text of a document, raising on failure.
+
+    Args:
+        document_id: ObjectId of the document to process
+        progress_callback (callable, optional): Called with a float in [0, 1]
+            as extraction advances
+
+    Returns:
+        The extracted text, or None if the document does not exist
+    """
+    db = get_database()
+    
+    # Get document from database
+    document = db.documents.find_one({"_id": document_id})
+    if not document:
+        return None
+    
+    file_path = document["file_path"]
+    file_type = document["file_type"].lower()
+    
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
+    
+    extracted_text = ""
+    page_offsets = None
+    segmentation = None
+    
+    # Identical content extracted before is served from the cache
+    digest = document.get("file_digest") or hash_file(file_path)
+    cached = get_cached_extraction(digest, EXTRACTOR_VERSION)
+    
+    if cached:
+        extracted_text = cached["text"]
+        page_offsets = cached.get("page_offsets")
+        segmentation = cached.get("segmentation")
+    else:
+        # Dispatch on the sniffed content, falling back to the file extension
+        file_format = sniff_format(file_path) or file_type
+        extractor = get_extractor(file_format)
+        if extractor is None:
+            raise ValueError(f"Unsupported file type: {file_format}")
+        extracted_text, page_offsets = extractor(file_path, progress_callback)
+    
+    # Segment once here so analysis never has to re-split the text
+    if extracted_text and (not segmentation or segmentation.get("version") != SEGMENTATION_VERSION):
+        segmentation = segment_text(extracted_text)
+    
+    if not cached and extracted_text:
+        put_cached_extraction(digest, EXTRACTOR_VERSION, extracted_text, page_offsets, segmentation)
+    
+    if progress_callback:
+        progress_callback(1.0)
+    
+    # Store the text in the content store and keep only metadata on the document
+    if extracted_text:
+        content = {"extracted_text": extracted_text, "segmentation": segmentation}
+        metadata = {
+            "text_extracted": True,
+            "paragraph_count": len(segmentation["paragraphs"]),
+            "clause_count": len(segmentation["clauses"]),
+            **text_metadata(extracted_text)
+        }
+        if page_offsets is not None:
+            content["page_offsets"] = page_offsets
+            metadata["page_count"] = len(page_offsets)
+        
+        save_content(document_id, content, document.get("user_id"))
+        db.documents.update_one({"_id": document_id}, {"$set": metadata})
+    
+    return extracted_text
+
+def _get_pdf_executor() -> ProcessPoolExecutor:
+    """Return the shared process pool, creating it on first use"""
+    global _pdf_executor
+    with _pdf_executor_lock:
+        if _pdf_executor is None:
+            # Spawn rather than fork: the parent runs worker threads and holds
+            # MongoDB sockets that must not be copied into children
+            _pdf_executor = ProcessPoolExecutor(
+                max_workers=PDF_EXTRACTION_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pdf_executor
+
+def _extract_pdf_page_range(file_path: str, start: int, end: int) -> List[str]:
+    """Extract the text of pages [start, end) of a PDF. Runs in a worker process."""
+    with open(file_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        return [(reader.pages[i].extract_text() or "") for i in range(start, end)]
+
+def _split_page_ranges(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    """Split pages into contiguous ranges, a few per worker so progress stays smooth"""
+    chunk_count = max(1, min(page_count, workers * 4))
+    chunk_size = -(-page_count // chunk_count)  # ceiling division
+    return [(start, min(start + chunk_size, page_count)) for start in range(0, page_count, chunk_size)]
+
+def extract_pdf_pages(file_path: str, progress_callback=None) -> List[str]:
+    """
+    Extract the text of every page of a PDF, in page order.
+
+    Documents with at least PDF_PARALLEL_MIN_PAGES pages are split into page
+    ranges that are extracted concurrently in the shared process pool.
+    """
+    with open(file_path, 'rb') as file:
+        page_count = len(PyPDF2.PdfReader(file).pages)
+    
+    if page_count == 0:
+        return []
+    
+    if page_count < PDF_PARALLEL_MIN_PAGES or PDF_EXTRACTION_PROCESSES <= 1:
+        pages = _extract_pdf_page_range(file_path, 0, page_count)
+        if progress_callback:
+            progress_callback(1.0)
+        return pages
+    
+    ranges = _split_page_ranges(page_count, PDF_EXTRACTION_PROCESSES)
+    executor = _get_pdf_executor()
+    futures = {
+        executor.submit(_extract_pdf_page_range, file_path, start, end): start
+        for start, end in ranges
+    }
+    
+    pages = [""] * page_count
+    pages_done = 0
+    for future in as_completed(futures):
+        start = futures[future]
+        range_pages = future.result()
+        pages[start:start + len(range_pages)] = range_pages
+        pages_done += len(range_pages)
+        if progress_callback:
+            progress_callback(pages_done / page_count)
+    
+    return pages
+
+def extract_pdf_with_offsets(file_path: str, progress_callback=None) -> Tuple[str, List[int]]:
+    """
+    Extract text from a PDF file along with page offsets.
+
+    Returns:
+        (text, page_offsets) where page_offsets[i] is the character offset
+        in text at which page i begins
+    """
     try:
-        with open(file_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            for page_num in range(len(reader.pages)):
-                page = reader.pages[page_num]
-                text += page.extract_text() + "\n"
+        pages = extract_pdf_pages(file_path, progress_callback)
     except Exception as e:
         print(f"Error extracting text from PDF: {e}")
         raise
+    
+    page_offsets = []
+    offset = 0
+    for page_text in pages:
+        page_offsets.append(offset)
+        offset += len(page_text) + 1
+    
+    return "".join(page_text + "\n" for page_text in pages), page_offsets
+
+@register_extractor('pdf')
+def _pdf_extractor(source, progress_callback=None):
+    if isinstance(source, str):
+        return extract_pdf_with_offsets(source, progress_callback)
+    
+    # In-memory content cannot be shared with the process pool
+    reader = PyPDF2.PdfReader(source)
+    pages = [(page.extract_text() or "") for page in reader.pages]
+    page_offsets = []
+    offset = 0
+    for page_text in pages:
+        page_offsets.append(offset)
+        offset += len(page_text) + 1
+    return "".join(page_text + "\n" for page_text in pages), page_offsets
+
+@register_extractor('docx')
+def _docx_extractor(source, progress_callback=None):
+    return extract_docx_text(source), None
+
+@register_extractor('txt')
+def _txt_extractor(source, progress_callback=None):
+    if isinstance(source, str):
+        with open(source, 'rb') as file:
+            content = file.read()
+    else:
+        content = source.read()
+    
+    encoding = detect_text_encoding(content[:SNIFF_BYTES]) or 'utf-8'
+    try:
+        return content.decode(encoding), None
+    except UnicodeDecodeError:
+        # The sample looked like UTF-8 but later bytes are not
+        return content.decode('latin-1'), None
+
+def extract_from_pdf(file_path: str) -> str:
+    """Extract text from PDF file"""
+    text, _ = extract_pdf_with_offsets(file_path)
     return text
 
 def extract_from_docx(file_path: str) -> str:
     """Extract text from DOCX file"""
-    text = ""
     try:
-        doc = Document(file_path)
-        for para in doc.paragraphs:
-            text += para.text + "\n"
+        text, _ = _docx_extractor(file_path)
     except Exception as e:
         print(f"Error extracting text from DOCX: {e}")
         raise
@@ -113,16 +354,8 @@ def extract_from_docx(file_path: str) -> str:
 def extract_from_txt(file_path: str) -> str:
     """Extract text from TXT file"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            return file.read()
-    except UnicodeDecodeError:
-        # Try alternative encoding if UTF-8 fails
-        try:
-            with open(file_path, 'r', encoding='latin-1') as file:
-                return file.read()
-        except Exception as e:
-            print(f"Error extracting text from TXT: {e}")
-            raise
+        text, _ = _txt_extractor(file_path)
     except Exception as e:
         print(f"Error extracting text from TXT: {e}")
-        raise
\ No newline at end of file
+        raise
+    return text
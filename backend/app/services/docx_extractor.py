@@ -0,0 +1,127 @@
+# backend/app/services/docx_extractor.py
+
+import re
+import zipfile
+from lxml import etree
+
+# WordprocessingML namespace
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+BODY_PART = 'word/document.xml'
+HEADER_PART = re.compile(r'^word/header(\d*)\.xml$')
+FOOTER_PART = re.compile(r'^word/footer(\d*)\.xml$')
+
+CELL_SEPARATOR = ' | '
+
+
+def _numbered_parts(names, pattern):
+    """Part names matching pattern, ordered header1, header2, ... header10"""
+    matches = [(pattern.match(name), name) for name in names]
+    return [name for match, name in sorted(
+        ((m, n) for m, n in matches if m),
+        key=lambda item: int(item[0].group(1) or 0)
+    )]
+
+
+def _paragraph_text(paragraph):
+    parts = []
+    for node in paragraph.iter(W + 't', W + 'tab', W + 'br', W + 'cr'):
+        if node.tag == W + 't':
+            parts.append(node.text or '')
+        elif node.tag == W + 'tab':
+            parts.append('\t')
+        else:
+            parts.append('\n')
+    return ''.join(parts)
+
+
+def iter_part_blocks(stream):
+    """
+    Yield the text blocks of one WordprocessingML part in reading order.
+
+    Paragraphs outside tables are yielded as they close. Table rows are
+    yielded as one block with cells joined by CELL_SEPARATOR; a nested
+    table is folded into the cell that contains it. Elements are cleared
+    once read so memory stays bounded by the largest table row.
+    """
+    cell_stack = []  # paragraphs of each open table cell
+    row_stack = []   # cells of each open table row
+
+    context = etree.iterparse(
+        stream,
+        events=('start', 'end'),
+        tag=(W + 'p', W + 'tc', W + 'tr', W + 'tbl'),
+        resolve_entities=False,
+        huge_tree=True
+    )
+
+    for event, element in context:
+        tag = element.tag
+
+        if event == 'start':
+            if tag == W + 'tr':
+                row_stack.append([])
+            elif tag == W + 'tc':
+                cell_stack.append([])
+            continue
+
+        if tag == W + 'p':
+            text = _paragraph_text(element)
+            if cell_stack:
+                cell_stack[-1].append(text)
+            else:
+                yield text
+        elif tag == W + 'tc':
+            paragraphs = cell_stack.pop()
+            row_stack[-1].append(' '.join(p for p in paragraphs if p.strip()))
+        elif tag == W + 'tr':
+            cells = row_stack.pop()
+            line = CELL_SEPARATOR.join(cells)
+            if cell_stack:
+                cell_stack[-1].append(line)
+            else:
+                yield line
+
+        # Drop what has been read; paragraphs inside text boxes are cleared
+        # before their host paragraph closes, so nothing is emitted twice
+        element.clear(keep_tail=True)
+        parent = element.getparent()
+        if parent is not None and parent.tag == W + 'body':
+            while element.getprevious() is not None:
+                del parent[0]
+
+    del context
+
+
+def iter_docx_blocks(source):
+    """
+    Yield text blocks of a DOCX file: headers, then the body, then footers.
+
+    Args:
+        source: A file path or binary file object
+
+    Header and footer blocks repeated across sections are yielded once.
+    """
+    with zipfile.ZipFile(source) as archive:
+        names = archive.namelist()
+        if BODY_PART not in names:
+            raise ValueError("Not a Word document: word/document.xml is missing")
+
+        header_parts = _numbered_parts(names, HEADER_PART)
+        footer_parts = _numbered_parts(names, FOOTER_PART)
+
+        for parts in (header_parts, [BODY_PART], footer_parts):
+            seen = set()
+            for part in parts:
+                with archive.open(part) as stream:
+                    for block in iter_part_blocks(stream):
+                        if part != BODY_PART:
+                            if not block.strip() or block in seen:
+                                continue
+                            seen.add(block)
+                        yield block
+
+
+def extract_docx_text(source):
+    """Extract the text of a DOCX file, one block per line"""
+    return ''.join(block + '\n' for block in iter_docx_blocks(source))
@@ -0,0 +1,140 @@
+# backend/app/services/extraction_cache.py
+
+from datetime import datetime
+import bson
+import pymongo
+from pymongo import ReturnDocument
+from bson.errors import InvalidDocument
+from pymongo.errors import PyMongoError
+from app.config.database import get_database
+from app.config.config import EXTRACTION_CACHE_MAX_BYTES
+from app.services.text_compression import compress_text, decompress_text
+from app.services.segmentation import segment_text
+
+db = get_database()
+
+# Entries above this size would approach MongoDB's 16 MB document limit
+MAX_ENTRY_BYTES = 12 * 1024 * 1024
+
+# When the cache is over its limit, evict down to this fraction of it
+EVICTION_LOW_WATERMARK = 0.9
+
+# The total size of all entries is kept in this document of cache_totals,
+# updated as entries are written and evicted, so a write doesn't have to
+# sum the whole collection. It is recounted at startup.
+TOTAL_ID = "extraction_cache"
+
+
+def setup_extraction_cache_indexes():
+    """
+    Create MongoDB indexes for the extraction cache.
+    Should be called during application startup.
+    """
+    try:
+        db.extraction_cache.create_index([("last_used", pymongo.ASCENDING)], name="extraction_cache_lru_index")
+        recount_total()
+        print("MongoDB extraction cache indexes have been set up successfully")
+    except Exception as e:
+        print(f"Error setting up extraction cache indexes: {str(e)}")
+
+
+def cache_key(digest, extractor_version):
+    return f"{digest}:{extractor_version}"
+
+
+def get_cached_extraction(digest, extractor_version):
+    """
+    Look up a previous extraction of the same file content.
+
+    Returns:
+        dict with "text", "page_offsets" and "segmentation", or None
+    """
+    now = datetime.utcnow()
+    entry = db.extraction_cache.find_one_and_update(
+        {"_id": cache_key(digest, extractor_version)},
+        {"$set": {"last_used": now}, "$inc": {"hits": 1}},
+        projection={"text": 1, "page_offsets": 1, "segmentation": 1}
+    )
+    if entry:
+        entry["text"] = decompress_text(entry["text"])
+    return entry
+
+
+def put_cached_extraction(digest, extractor_version, text, page_offsets=None, segmentation=None):
+    """
+    Store an extraction result and evict old entries if the cache is full.
+
+    Caching is best effort: an entry too large to store is skipped, and a
+    failed write is logged, so extraction itself never fails because of it.
+
+    Returns:
+        bool: Whether the entry was stored
+    """
+    now = datetime.utcnow()
+    entry = {
+        "digest": digest,
+        "extractor_version": extractor_version,
+        "text": compress_text(text),
+        "page_offsets": page_offsets,
+        "segmentation": segmentation or segment_text(text),
+        "hits": 0,
+        "created_at": now,
+        "last_used": now
+    }
+    # The whole stored entry counts, not just the text: the segmentation and
+    # page offsets of a long document can be as large as its compressed text
+    size = len(bson.encode(entry))
+    if size > MAX_ENTRY_BYTES:
+        print(f"Not caching extraction of {digest}: entry of {size} bytes is too large")
+        return False
+    entry["size"] = size
+
+    try:
+        previous = db.extraction_cache.find_one_and_replace(
+            {"_id": cache_key(digest, extractor_version)},
+            entry,
+            projection={"size": 1},
+            upsert=True
+        )
+        total = _add_to_total(size - (previous or {}).get("size", 0))
+        if total > EXTRACTION_CACHE_MAX_BYTES:
+            _evict(total)
+    except (PyMongoError, InvalidDocument) as e:
+        print(f"Error caching extraction of {digest}: {str(e)}")
+        return False
+    return True
+
+
+def recount_total():
+    """Sum the sizes of all entries and store the result as the running total"""
+    totals = list(db.extraction_cache.aggregate([
+        {"$group": {"_id": None, "total": {"$sum": "$size"}}}
+    ]))
+    total = totals[0]["total"] if totals else 0
+    db.cache_totals.replace_one({"_id": TOTAL_ID}, {"bytes": total}, upsert=True)
+    return total
+
+
+def _add_to_total(delta):
+    """Adjust the running total by delta bytes and return the new total"""
+    counter = db.cache_totals.find_one_and_update(
+        {"_id": TOTAL_ID},
+        {"$inc": {"bytes": delta}},
+        return_document=ReturnDocument.AFTER
+    )
+    if counter is None:
+        # Not counted yet; the entry just written is included in the sum
+        return recount_total()
+    return counter["bytes"]
+
+
+def _evict(total):
+    """Drop least recently used entries until the cache is back under its low watermark"""
+    target = EXTRACTION_CACHE_MAX_BYTES * EVICTION_LOW_WATERMARK
+    for entry in db.extraction_cache.find({}, {"_id": 1}).sort("last_used", pymongo.ASCENDING):
+        if total <= target:
+            break
+        removed = db.extraction_cache.find_one_and_delete({"_id": entry["_id"]}, projection={"size": 1})
+        if removed:
+            # Another worker may be evicting too; its deletions count here
+            total = _add_to_total(-removed.get("size", 0))
@@ -0,0 +1,181 @@
+# backend/app/services/file_storage.py
+
+import os
+import hashlib
+import tempfile
+import time
+from datetime import datetime, timedelta
+import pymongo
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.config.database import get_database
+
+db = get_database()
+
+# Uploaded files are stored once per content digest under uploads/blobs
+UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'uploads')
+BLOB_FOLDER = os.path.join(UPLOAD_FOLDER, 'blobs')
+os.makedirs(BLOB_FOLDER, exist_ok=True)
+
+CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+# How often an upload checks whether a blob being deleted is gone, and how
+# long a deletion may take before its record is assumed abandoned
+RELEASE_POLL_SECONDS = 0.05
+RELEASE_STALE_SECONDS = 60
+
+
+def setup_storage_indexes():
+    """
+    Create MongoDB indexes used for content-addressed storage.
+    Should be called during application startup.
+    """
+    try:
+        db.documents.create_index([("file_digest", pymongo.ASCENDING)], name="file_digest_index")
+        print("MongoDB storage indexes have been set up successfully")
+    except Exception as e:
+        print(f"Error setting up storage indexes: {str(e)}")
+
+
+def blob_path(digest):
+    """Sharded path for a blob, e.g. blobs/ab/cd/abcd...ef"""
+    return os.path.join(BLOB_FOLDER, digest[:2], digest[2:4], digest)
+
+
+def hash_file(path):
+    """Compute the SHA-256 digest of a file on disk"""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def store_upload(stream):
+    """
+    Stream an upload to disk while hashing it, keeping one copy per digest.
+
+    The data is written to a temporary file next to the blobs as it is
+    hashed, then moved into place. The file is published even if a blob
+    with the same digest exists: the content is identical and the rename
+    atomic, so a blob released at the same moment is never left missing.
+
+    Args:
+        stream: A readable binary file object (e.g. FileStorage.stream)
+
+    Returns:
+        dict: {"digest", "path", "size", "is_new"}
+    """
+    hasher = hashlib.sha256()
+    size = 0
+
+    fd, temp_path = tempfile.mkstemp(dir=BLOB_FOLDER, prefix='.upload-')
+    referenced = None
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                temp_file.write(chunk)
+                size += len(chunk)
+
+        digest = hasher.hexdigest()
+        path = blob_path(digest)
+
+        # Take the reference before publishing the file so a concurrent
+        # release of the last reference cannot unlink it underneath us
+        add_reference(digest, path, size)
+        referenced = digest
+
+        is_new = not os.path.exists(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        if referenced:
+            release_reference(referenced)
+        raise
+
+    return {"digest": digest, "path": path, "size": size, "is_new": is_new}
+
+
+def add_reference(digest, path, size):
+    """
+    Increment the reference count of a blob, creating its record if needed.
+
+    A record marked deleting belongs to a release that is removing the file;
+    wait for it to go rather than reference a file about to disappear.
+    """
+    while True:
+        try:
+            return db.blobs.find_one_and_update(
+                {"_id": digest, "deleting": {"$ne": True}},
+                {
+                    "$inc": {"ref_count": 1},
+                    "$setOnInsert": {"path": path, "size": size, "created_at": datetime.utcnow()}
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # The record is being deleted; take it over if its release died
+            db.blobs.update_one(
+                {
+                    "_id": digest,
+                    "deleting": True,
+                    "deleting_at": {"$lt": datetime.utcnow() - timedelta(seconds=RELEASE_STALE_SECONDS)}
+                },
+                {"$set": {"deleting": False, "ref_count": 0}}
+            )
+            time.sleep(RELEASE_POLL_SECONDS)
+
+
+def release_reference(digest):
+    """
+    Drop one reference to a blob and delete the file when none remain.
+
+    The record is marked deleting before the file is removed and only
+    deleted afterwards, so no upload can reference the blob in between.
+
+    Returns:
+        bool: True if the blob file was removed
+    """
+    blob = db.blobs.find_one_and_update(
+        {"_id": digest},
+        {"$inc": {"ref_count": -1}},
+        return_document=ReturnDocument.AFTER
+    )
+    if not blob or blob["ref_count"] > 0:
+        return False
+
+    claimed = db.blobs.find_one_and_update(
+        {"_id": digest, "ref_count": {"$lte": 0}, "deleting": {"$ne": True}},
+        {"$set": {"deleting": True, "deleting_at": datetime.utcnow()}}
+    )
+    if not claimed:
+        # Someone re-referenced the blob in the meantime
+        return False
+
+    removed = False
+    path = blob.get("path") or blob_path(digest)
+    try:
+        if os.path.exists(path):
+            os.remove(path)
+            removed = True
+    except Exception as e:
+        print(f"Warning: Could not delete blob {path}: {str(e)}")
+    finally:
+        db.blobs.delete_one({"_id": digest, "deleting": True})
+    return removed
+
+
+def find_extracted_copy(digest):
+    """Return text metadata of an existing document with the same content, if any"""
+    return db.documents.find_one(
+        {"file_digest": digest, "text_extracted": True},
+        {"text_extracted": 1, "text_preview": 1, "text_length": 1, "page_count": 1,
+         "paragraph_count": 1, "clause_count": 1}
+    )
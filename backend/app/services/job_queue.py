@@ -0,0 +1,253 @@
+# backend/app/services/job_queue.py
+
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+import pymongo
+from pymongo import ReturnDocument
+from app.config.database import get_database
+from app.config.config import (
+    EXTRACTION_WORKERS,
+    EXTRACTION_POLL_INTERVAL,
+    EXTRACTION_JOB_LEASE_SECONDS,
+    EXTRACTION_MAX_ATTEMPTS
+)
+from app.services.document_processor import process_document_text
+
+db = get_database()
+
+# Status values shared by extraction jobs and the documents they belong to
+STATUS_QUEUED = "queued"
+STATUS_EXTRACTING = "extracting"
+STATUS_EXTRACTED = "extracted"
+STATUS_FAILED = "failed"
+
+_workers = []
+_workers_lock = threading.Lock()
+_stop_event = threading.Event()
+
+
+def setup_job_indexes():
+    """
+    Create MongoDB indexes for the extraction job queue.
+    Should be called during application startup.
+    """
+    try:
+        db.extraction_jobs.create_index(
+            [("status", pymongo.ASCENDING), ("created_at", pymongo.ASCENDING)],
+            name="job_claim_index"
+        )
+        db.extraction_jobs.create_index([("document_id", pymongo.ASCENDING)], name="job_document_index")
+        db.extraction_jobs.create_index([("user_id", pymongo.ASCENDING)], name="job_user_index")
+        print("MongoDB job queue indexes have been set up successfully")
+    except Exception as e:
+        print(f"Error setting up job queue indexes: {str(e)}")
+
+
+def enqueue_extraction(document_id, user_id):
+    """
+    Queue a document for background text extraction
+
+    Args:
+        document_id (ObjectId): The document to extract
+        user_id (str): Owner of the document, used to authorize polling
+
+    Returns:
+        ObjectId: The id of the new job
+    """
+    now = datetime.utcnow()
+    job = {
+        "document_id": document_id,
+        "user_id": user_id,
+        "status": STATUS_QUEUED,
+        "progress": 0.0,
+        "attempts": 0,
+        "error": None,
+        "created_at": now,
+        "updated_at": now
+    }
+    result = db.extraction_jobs.insert_one(job)
+
+    db.documents.update_one(
+        {"_id": document_id},
+        {"$set": {"status": STATUS_QUEUED, "extraction_job_id": str(result.inserted_id)}}
+    )
+
+    return result.inserted_id
+
+
+def get_job(job_id, user_id):
+    """Return a job owned by user_id, or None"""
+    return db.extraction_jobs.find_one({"_id": job_id, "user_id": user_id})
+
+
+def serialize_job(job):
+    """Convert a job record into a JSON-safe dict"""
+    return {
+        "job_id": str(job["_id"]),
+        "document_id": str(job["document_id"]),
+        "status": job["status"],
+        "progress": round(job.get("progress", 0.0), 3),
+        "attempts": job.get("attempts", 0),
+        "error": job.get("error"),
+        "created_at": job["created_at"].isoformat(),
+        "updated_at": job["updated_at"].isoformat(),
+        "finished_at": job["finished_at"].isoformat() if job.get("finished_at") else None
+    }
+
+
+def _fail_abandoned_jobs(now):
+    """Fail jobs whose lease expired after their last allowed attempt"""
+    abandoned = list(db.extraction_jobs.find(
+        {
+            "status": STATUS_EXTRACTING,
+            "lease_expires": {"$lt": now},
+            "attempts": {"$gte": EXTRACTION_MAX_ATTEMPTS}
+        },
+        {"document_id": 1}
+    ))
+    for job in abandoned:
+        _finish_job(job, STATUS_FAILED, error="Extraction worker stopped responding")
+
+
+def claim_next_job(worker_name):
+    """
+    Atomically claim the oldest runnable job.
+
+    A job is runnable when it is queued, or when a previous worker's lease
+    has expired and it still has attempts left.
+    """
+    now = datetime.utcnow()
+    _fail_abandoned_jobs(now)
+
+    return db.extraction_jobs.find_one_and_update(
+        {
+            "$or": [
+                {"status": STATUS_QUEUED},
+                {"status": STATUS_EXTRACTING, "lease_expires": {"$lt": now}}
+            ],
+            "attempts": {"$lt": EXTRACTION_MAX_ATTEMPTS}
+        },
+        {
+            "$set": {
+                "status": STATUS_EXTRACTING,
+                "worker": worker_name,
+                "started_at": now,
+                "updated_at": now,
+                "lease_expires": now + timedelta(seconds=EXTRACTION_JOB_LEASE_SECONDS)
+            },
+            "$inc": {"attempts": 1}
+        },
+        sort=[("created_at", pymongo.ASCENDING)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def _finish_job(job, status, error=None):
+    now = datetime.utcnow()
+    update = {"status": status, "updated_at": now, "finished_at": now, "error": error}
+    if status == STATUS_EXTRACTED:
+        update["progress"] = 1.0
+
+    db.extraction_jobs.update_one({"_id": job["_id"]}, {"$set": update})
+    db.documents.update_one(
+        {"_id": job["document_id"]},
+        {"$set": {"status": status, "processed": status == STATUS_EXTRACTED}}
+    )
+
+
+def run_job(job):
+    """Run a claimed extraction job to completion"""
+    job_id = job["_id"]
+    document_id = job["document_id"]
+
+    db.documents.update_one({"_id": document_id}, {"$set": {"status": STATUS_EXTRACTING}})
+
+    def report_progress(fraction):
+        # Each progress report doubles as a heartbeat that extends the lease
+        now = datetime.utcnow()
+        db.extraction_jobs.update_one(
+            {"_id": job_id},
+            {"$set": {
+                "progress": min(max(fraction, 0.0), 1.0),
+                "updated_at": now,
+                "lease_expires": now + timedelta(seconds=EXTRACTION_JOB_LEASE_SECONDS)
+            }}
+        )
+
+    try:
+        text = process_document_text(document_id, progress_callback=report_progress)
+        if text is None:
+            _finish_job(job, STATUS_FAILED, error="Document not found")
+        elif not text:
+            # e.g. a scanned PDF; nothing downstream could use the document
+            _finish_job(job, STATUS_FAILED, error="No text could be extracted")
+        else:
+            _finish_job(job, STATUS_EXTRACTED)
+    except Exception as e:
+        print(f"Extraction job {job_id} failed for document {document_id}: {str(e)}")
+        _finish_job(job, STATUS_FAILED, error=str(e))
+
+
+def _worker_loop(worker_name):
+    while not _stop_event.is_set():
+        try:
+            job = claim_next_job(worker_name)
+        except Exception as e:
+            print(f"Extraction worker {worker_name} could not claim a job: {str(e)}")
+            job = None
+
+        if job is None:
+            _stop_event.wait(EXTRACTION_POLL_INTERVAL)
+            continue
+
+        run_job(job)
+
+
+def start_extraction_workers(count=None):
+    """
+    Start background threads that drain the extraction queue.
+    Safe to call more than once; workers are only started the first time.
+    """
+    count = EXTRACTION_WORKERS if count is None else count
+
+    with _workers_lock:
+        if _workers or count <= 0:
+            return _workers
+
+        _stop_event.clear()
+        host = f"{socket.gethostname()}:{os.getpid()}"
+        for i in range(count):
+            worker = threading.Thread(
+                target=_worker_loop,
+                args=(f"{host}:{i}",),
+                name=f"extraction-worker-{i}",
+                daemon=True
+            )
+            worker.start()
+            _workers.append(worker)
+
+        print(f"Started {count} extraction workers")
+        return _workers
+
+
+def stop_extraction_workers(timeout=None):
+    """Signal workers to stop and wait for them to exit"""
+    with _workers_lock:
+        _stop_event.set()
+        for worker in _workers:
+            worker.join(timeout)
+        _workers.clear()
+
+
+if __name__ == '__main__':
+    # Run a standalone worker process: python -m app.services.job_queue
+    setup_job_indexes()
+    start_extraction_workers()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stop_extraction_workers()
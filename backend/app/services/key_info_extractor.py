@@ -0,0 +1,214 @@
+# backend/app/services/key_info_extractor.py
+
+import re
+from datetime import datetime
+from app.config.config import KEY_INFO_MIN_CONFIDENCE
+
+# Finds the key information fields in the fixed phrasings most agreements
+# use ("made and entered into as of ... by and between ...", "governed by
+# the laws of ..."), so the LLM is only asked for what these patterns can't
+# resolve. Every field comes with a confidence between 0 and 1 reflecting
+# how specific the phrase that matched it is.
+KEY_INFO_FIELDS = ("Parties", "Effective Date", "Term/Duration", "Governing Law", "Key Payment Terms")
+NOT_SPECIFIED = "Not specified"
+
+MONTHS = {
+    name: number
+    for number, names in enumerate((
+        ("january", "jan"), ("february", "feb"), ("march", "mar"), ("april", "apr"),
+        ("may",), ("june", "jun"), ("july", "jul"), ("august", "aug"),
+        ("september", "sep", "sept"), ("october", "oct"), ("november", "nov"), ("december", "dec")
+    ), start=1)
+    for name in names
+}
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "fifteen": 15,
+    "eighteen": 18, "twenty": 20, "twenty-four": 24, "thirty": 30, "thirty-six": 36,
+    "forty-five": 45, "sixty": 60, "ninety": 90
+}
+
+_MONTH = r"(?:" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")\.?"
+_DAY = r"\d{1,2}(?:st|nd|rd|th)?"
+DATE = (
+    r"(?:" + _MONTH + r"\s+" + _DAY + r",?\s+\d{4}"           # January 15, 2024
+    r"|" + _DAY + r"\s+(?:day\s+of\s+)?" + _MONTH + r",?\s+\d{4}"  # 15th day of January, 2024
+    r"|\d{4}-\d{2}-\d{2}"                                     # 2024-01-15
+    r"|\d{1,2}/\d{1,2}/\d{4})"                                # 01/15/2024
+)
+_NUMBER = r"(?:\d+|" + "|".join(sorted(NUMBER_WORDS, key=len, reverse=True)) + r")"
+_PERIOD = _NUMBER + r"(?:\s*\(\d+\))?\s*(?:calendar\s+)?(years?|months?|weeks?|days?)"
+AMOUNT = (
+    r"(?:(?:US\s?)?\$|USD\s?|EUR\s?|€|GBP\s?|£)\s?\d{1,3}(?:,\d{3})*(?:\.\d{2})?(?:\s?(?:million|thousand))?"
+    r"|\d{1,3}(?:,\d{3})*(?:\.\d{2})?\s?(?:dollars|USD|euros|EUR)"
+)
+
+# A full stop ending a sentence: one not after an abbreviation common in
+# company names, or any followed by a typical sentence opening
+_END = (
+    r"(?:(?<!\bInc)(?<!\bCorp)(?<!\bLtd)(?<!\bCo)(?<!\bSt)(?<!\bNo)(?<!\bL\.L\.C)(?<!\bL\.P)\.(?:\s|$)"
+    r"|\.\s+(?-i:(?:The|This|Each|Either|In|Now|Whereas|WHEREAS|RECITALS|\d))\b)"
+)
+
+# Phrases introducing each field, most specific first, with the confidence
+# of a match. Patterns run on the text with whitespace collapsed.
+EFFECTIVE_DATE_PATTERNS = [
+    (re.compile(r"effective\s+date[\"”’']?\)?\s*(?:shall\s+be|is|means|:)\s*(" + DATE + ")", re.I), 0.95),
+    (re.compile(r"(?:made|entered\s+into)(?:\s+and\s+entered\s+into)?\s+(?:as\s+of|on|this)\s+(?:the\s+)?(" + DATE + ")", re.I), 0.95),
+    (re.compile(r"effective\s+(?:as\s+of|on)\s+(?:the\s+)?(" + DATE + ")", re.I), 0.9),
+    (re.compile(r"\bdated\s+(?:as\s+of\s+)?(?:the\s+)?(" + DATE + ")", re.I), 0.8),
+    (re.compile(r"\bas\s+of\s+(?:the\s+)?(" + DATE + ")", re.I), 0.6),
+]
+PARTIES_PATTERNS = [
+    (re.compile(r"\bby\s+and\s+between\s+(.{3,400}?)(?=" + _END + r"|;|\s+WHEREAS\b|\s+RECITALS\b|\s+\(?(?:each|collectively|hereinafter\s+collectively)\b)", re.I), 0.9),
+    (re.compile(r"\bparties\s*:\s*(.{3,300}?)(?=" + _END + r"|;|$)", re.I), 0.85),
+    (re.compile(r"\bentered\s+into\b[^.;]{0,80}?\bbetween\s+(.{3,300}?)(?=" + _END + r"|;|\s+WHEREAS\b|\s+\(?(?:each|collectively)\b)", re.I), 0.8),
+    (re.compile(r"\bagreement\s+between\s+(.{3,300}?)(?=" + _END + r"|;|\s+WHEREAS\b|\s+\(?(?:each|collectively)\b)", re.I), 0.75),
+]
+TERM_PATTERNS = [
+    (re.compile(r"\b(?:initial\s+)?term\s+of\s+(?:this\s+agreement\s+(?:shall\s+be|is)\s+(?:for\s+)?(?:a\s+period\s+of\s+)?)?(" + _PERIOD + r")", re.I), 0.9),
+    (re.compile(r"\b(?:remains?|continues?)\s+in\s+(?:full\s+)?(?:force\s+and\s+)?effect\s+for\s+(?:a\s+period\s+of\s+)?(" + _PERIOD + r")", re.I), 0.9),
+    (re.compile(r"\bfor\s+(?:a\s+period\s+of\s+)?(" + _PERIOD + r")\s+(?:from|after|following)\s+the\s+effective\s+date", re.I), 0.85),
+    # Often how long obligations survive rather than the term itself
+    (re.compile(r"\bperiod\s+of\s+(" + _PERIOD + r")", re.I), 0.6),
+]
+GOVERNING_LAW_PATTERNS = [
+    (re.compile(r"\bgoverned\s+by,?\s+(?:and\s+(?:shall\s+be\s+)?(?:construed|interpreted|enforced)\s+(?:in\s+accordance\s+with|under),?\s+)?the\s+(?:internal\s+|substantive\s+)?laws?\s+of\s+(?:the\s+)?(.{2,80}?)(?=,|\.\s|\.$|;|\s+without\b|\s+excluding\b|\s+and\s+(?:the|any)\b|\s+applicable\b)", re.I), 0.95),
+    (re.compile(r"\bgoverning\s+law\s*:\s*(?:the\s+)?(?:laws?\s+of\s+(?:the\s+)?)?(.{2,80}?)(?=,|\.\s|\.?$|;|\s+without\b)", re.I), 0.8),
+]
+PAYMENT_WORDS = re.compile(
+    r"\b(?:pay|pays|paid|payment|payable|fees?|compensation|salary|price|invoice[sd]?|royalt(?:y|ies)|consideration)\b",
+    re.I
+)
+AMOUNT_PATTERN = re.compile(AMOUNT, re.I)
+SENTENCE_BREAK = re.compile(r"(?<=[.;])\s+")
+PARTY_ALIAS = re.compile(r"\s*\((?:[^()]*?(?:hereinafter|referred\s+to|the\s+[\"“”]|[\"“”])[^()]*)\)", re.I)
+WHITESPACE = re.compile(r"\s+")
+
+# Longest payment clause kept, in characters
+MAX_PAYMENT_TERMS_CHARS = 400
+# Party descriptions longer than this probably ran on into the next sentence
+MAX_PARTIES_CHARS = 200
+
+
+def parse_date(text):
+    """Parse a date in one of the DATE formats; None if it isn't a real date"""
+    text = text.strip().rstrip(",")
+    match = re.fullmatch(r"(\d{4})-(\d{2})-(\d{2})", text)
+    if match:
+        year, month, day = (int(part) for part in match.groups())
+    else:
+        match = re.fullmatch(r"(\d{1,2})/(\d{1,2})/(\d{4})", text)
+        if match:
+            # US order, which these agreements use
+            month, day, year = (int(part) for part in match.groups())
+        else:
+            words = re.findall(r"[a-z]+|\d+", text.lower())
+            numbers = [int(word) for word in words if word.isdigit()]
+            months = [MONTHS[word] for word in words if word in MONTHS]
+            if len(numbers) != 2 or not months:
+                return None
+            day, year = (numbers[0], numbers[1]) if numbers[0] < 100 else (numbers[1], numbers[0])
+            month = months[0]
+    try:
+        return datetime(year, month, day)
+    except ValueError:
+        return None
+
+
+def parse_period(number, unit):
+    """'three', 'years' -> '3 years'"""
+    count = int(number) if number.isdigit() else NUMBER_WORDS[number.lower()]
+    unit = unit.lower().rstrip("s")
+    return f"{count} {unit}" + ("s" if count != 1 else "")
+
+
+def _clean_parties(raw):
+    """'Acme Inc., a Delaware corporation ("Acme"), and Beta LLC' -> 'Acme Inc., a Delaware corporation and Beta LLC'"""
+    parties = PARTY_ALIAS.sub("", raw)
+    parties = WHITESPACE.sub(" ", parties).strip(" ,:")
+    parties = re.sub(r",\s+and\s+", " and ", parties)
+    return parties
+
+
+def _first(patterns, text):
+    """(match, confidence) of the first pattern that matches"""
+    for pattern, confidence in patterns:
+        match = pattern.search(text)
+        if match:
+            return match, confidence
+    return None, 0.0
+
+
+def extract_key_info_rules(text):
+    """
+    Extract the key information fields of a document with patterns.
+
+    Args:
+        text: Extracted text of the document
+
+    Returns:
+        dict mapping each field of KEY_INFO_FIELDS to (value, confidence);
+        fields that couldn't be found have value None and confidence 0
+    """
+    text = WHITESPACE.sub(" ", text or "")
+    results = {field: (None, 0.0) for field in KEY_INFO_FIELDS}
+
+    match, confidence = _first(PARTIES_PATTERNS, text)
+    if match:
+        parties = _clean_parties(match.group(1))
+        # Two named parties are expected; anything else is less certain, as
+        # is a match that ran past an abbreviation ending the sentence
+        if not re.search(r"\band\b", parties, re.I) or len(parties) > MAX_PARTIES_CHARS:
+            confidence -= 0.3
+        results["Parties"] = (parties, confidence)
+
+    for pattern, confidence in EFFECTIVE_DATE_PATTERNS:
+        match = pattern.search(text)
+        parsed = parse_date(match.group(1)) if match else None
+        if parsed:
+            results["Effective Date"] = (f"{parsed:%B} {parsed.day}, {parsed.year}", confidence)
+            break
+
+    match, confidence = _first(TERM_PATTERNS, text)
+    if match:
+        period = re.match(_PERIOD, match.group(1), re.I)
+        number = re.match(_NUMBER, match.group(1), re.I).group(0)
+        results["Term/Duration"] = (parse_period(number, period.group(1)), confidence)
+
+    match, confidence = _first(GOVERNING_LAW_PATTERNS, text)
+    if match:
+        results["Governing Law"] = (match.group(1).strip(" ."), confidence)
+
+    # The first sentence naming both a payment and an amount
+    for sentence in SENTENCE_BREAK.split(text):
+        if PAYMENT_WORDS.search(sentence) and AMOUNT_PATTERN.search(sentence):
+            clause = sentence.strip()
+            if len(clause) > MAX_PAYMENT_TERMS_CHARS:
+                clause = clause[:MAX_PAYMENT_TERMS_CHARS].rsplit(" ", 1)[0] + "..."
+            results["Key Payment Terms"] = (clause, 0.75)
+            break
+    else:
+        if not PAYMENT_WORDS.search(text) and not AMOUNT_PATTERN.search(text):
+            # Nothing in the whole document talks about money (typical of NDAs)
+            results["Key Payment Terms"] = (NOT_SPECIFIED, 0.8)
+
+    return results
+
+
+def resolve_key_info(text, min_confidence=KEY_INFO_MIN_CONFIDENCE):
+    """
+    The key information fields the patterns found confidently enough.
+
+    Returns:
+        (values, confidence): dicts keyed by field, holding only the fields
+        whose confidence reaches min_confidence; the others are left for the
+        LLM
+    """
+    values = {}
+    confidence = {}
+    for field, (value, field_confidence) in extract_key_info_rules(text).items():
+        if value is not None and field_confidence >= min_confidence:
+            values[field] = value
+            confidence[field] = round(field_confidence, 2)
+    return values, confidence
@@ -0,0 +1,101 @@
+# backend/app/services/keyword_matcher.py
+
+import re
+
+
+def _trie_pattern(keywords):
+    """
+    Regex source matching any of the keywords, factored into a prefix trie.
+
+    re tries alternatives one by one at every position, so a flat
+    "a|b|c" alternation costs a comparison per keyword per character; the
+    trie form only follows the branch for the character actually there.
+    Longer keywords are preferred over their prefixes.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # A keyword ends here, but a longer one may continue
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    Finds every occurrence of a fixed set of keywords in one pass.
+
+    The keywords are compiled into a single trie-shaped regex, wrapped in a
+    lookahead so matches may overlap. The text is lowercased once rather
+    than per keyword. A hit on a keyword also reports the shorter keywords
+    it starts with (e.g. "term:" also reports "term"), so every substring
+    occurrence is found. Build matchers once, at import.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(keyword.lower() for keyword in keywords if keyword))
+        source = "(?=(" + _trie_pattern(self.keywords) + "))"
+        self._pattern = re.compile(source)
+        # For the rare text whose length changes when lowercased, where
+        # offsets into the lowercased copy would be wrong
+        self._pattern_ignorecase = re.compile(source, re.IGNORECASE)
+        # Keywords that another keyword starts with, longest first
+        self._prefixes = {
+            keyword: sorted(
+                (other for other in self.keywords if other != keyword and keyword.startswith(other)),
+                key=len, reverse=True
+            )
+            for keyword in self.keywords
+        }
+
+    def _matches(self, text):
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            return self._pattern.finditer(lowered)
+        return self._pattern_ignorecase.finditer(text)
+
+    def find_all(self, text):
+        """Every keyword occurrence in text as (offset, keyword), in order of offset"""
+        hits = []
+        for match in self._matches(text):
+            keyword = match.group(1).lower()
+            offset = match.start()
+            hits.append((offset, keyword))
+            for prefix in self._prefixes.get(keyword, ()):
+                hits.append((offset, prefix))
+        return hits
+
+    def contains_any(self, text):
+        return next(self._matches(text), None) is not None
+
+    def hits_by_span(self, text, spans):
+        """
+        Group the keyword hits in text by the (start, end) spans they fall in.
+
+        Args:
+            text: Full text
+            spans: Sorted, non-overlapping (start, end) offsets, e.g. paragraphs
+
+        Returns:
+            A list with, for each span, the (offset, keyword) hits lying wholly inside it
+        """
+        grouped = [[] for _ in spans]
+        i = 0
+        for offset, keyword in self.find_all(text):
+            while i < len(spans) and spans[i][1] <= offset:
+                i += 1
+            if i == len(spans):
+                break
+            start, end = spans[i]
+            if offset >= start and offset + len(keyword) <= end:
+                grouped[i].append((offset, keyword))
+        return grouped
@@ -0,0 +1,138 @@
+# backend/app/services/llm_cache.py
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from app.config.database import get_database
+from app.config.config import LLM_CACHE_ENABLED, LLM_CACHE_MEMORY_ENTRIES, LLM_CACHE_TTL_SECONDS
+from app.services.text_compression import compress_text, decompress_text
+
+db = get_database()
+
+# Responses are cached in two tiers: a small LRU in this process, backed by
+# the llm_cache collection, which is shared by all workers and expires
+# entries through a TTL index. Raw response text is cached, so callers can
+# format it however they expect. Memory entries keep the expiry of their
+# stored entry and are dropped once it passes.
+_memory = OrderedDict()
+_lock = threading.Lock()
+_stats = {"memory_hits": 0, "mongo_hits": 0, "misses": 0, "stores": 0}
+
+
+def setup_llm_cache_indexes():
+    """
+    Create MongoDB indexes for the response cache.
+    Should be called during application startup.
+    """
+    try:
+        db.llm_cache.create_index("expires_at", expireAfterSeconds=0, name="llm_cache_ttl_index")
+        print("MongoDB LLM cache indexes have been set up successfully")
+    except Exception as e:
+        print(f"Error setting up LLM cache indexes: {str(e)}")
+
+
+def cache_key(model, messages, temperature=None, max_tokens=None):
+    """Canonical hash of everything that determines a completion"""
+    canonical = json.dumps(
+        {
+            "model": model,
+            "messages": [{"role": m.get("role"), "content": m.get("content")} for m in messages],
+            "temperature": None if temperature is None else float(temperature),
+            "max_tokens": max_tokens
+        },
+        sort_keys=True,
+        separators=(',', ':'),
+        ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _count(name):
+    with _lock:
+        _stats[name] += 1
+
+
+def _remember(key, response_text, expires_at):
+    with _lock:
+        _memory[key] = (response_text, expires_at)
+        _memory.move_to_end(key)
+        while len(_memory) > LLM_CACHE_MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def get_cached_response(key):
+    """Return the cached response text for key, or None"""
+    if not LLM_CACHE_ENABLED:
+        return None
+
+    now = datetime.utcnow()
+    with _lock:
+        entry = _memory.get(key)
+        if entry is not None:
+            response_text, expires_at = entry
+            if expires_at > now:
+                _memory.move_to_end(key)
+                _stats["memory_hits"] += 1
+                return response_text
+            del _memory[key]
+
+    try:
+        entry = db.llm_cache.find_one_and_update(
+            {"_id": key, "expires_at": {"$gt": now}},
+            {"$inc": {"hits": 1}},
+            projection={"response": 1, "expires_at": 1}
+        )
+    except Exception as e:
+        print(f"Error reading LLM cache: {str(e)}")
+        entry = None
+
+    if entry is None:
+        _count("misses")
+        return None
+
+    response_text = decompress_text(entry["response"])
+    _remember(key, response_text, entry["expires_at"])
+    _count("mongo_hits")
+    return response_text
+
+
+def put_cached_response(key, model, response_text):
+    """Store a response in both tiers"""
+    if not LLM_CACHE_ENABLED:
+        return
+
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=LLM_CACHE_TTL_SECONDS)
+    _remember(key, response_text, expires_at)
+    try:
+        db.llm_cache.replace_one(
+            {"_id": key},
+            {
+                "model": model,
+                "response": compress_text(response_text),
+                "hits": 0,
+                "created_at": now,
+                "expires_at": expires_at
+            },
+            upsert=True
+        )
+        _count("stores")
+    except Exception as e:
+        print(f"Error writing LLM cache: {str(e)}")
+
+
+def cache_stats():
+    """Hit and miss counters of this process, plus the in-memory tier size"""
+    with _lock:
+        stats = dict(_stats)
+        stats["memory_entries"] = len(_memory)
+    lookups = stats["memory_hits"] + stats["mongo_hits"] + stats["misses"]
+    stats["hit_rate"] = round((stats["memory_hits"] + stats["mongo_hits"]) / lookups, 4) if lookups else 0.0
+    return stats
+
+
+def clear_memory_cache():
+    with _lock:
+        _memory.clear()
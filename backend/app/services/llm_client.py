@@ -0,0 +1,157 @@
+# backend/app/services/llm_client.py
+
+import asyncio
+import contextvars
+import os
+import queue
+import threading
+import httpx
+import openai
+from app.config.config import OPENAI_BASE_URL, LLM_MAX_CONCURRENCY, LLM_MAX_CONNECTIONS, LLM_REQUEST_TIMEOUT
+
+# All OpenAI requests run on one event loop in a background thread, through
+# a single AsyncOpenAI client whose httpx pool keeps connections alive across
+# calls. Flask handlers and workers stay synchronous and use run_sync() or
+# gather_sync(); independent calls submitted together overlap on the loop,
+# at most LLM_MAX_CONCURRENCY at a time.
+_loop = None
+_loop_thread = None
+_loop_lock = threading.Lock()
+
+# Created on the loop thread the first time they are needed
+_client = None
+_semaphore = None
+
+
+def _get_loop():
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="llm-client-loop", daemon=True)
+            thread.start()
+            _loop, _loop_thread = loop, thread
+    return _loop
+
+
+def get_client():
+    """Return the shared AsyncOpenAI client; only call this on the client loop"""
+    global _client, _semaphore
+    if _client is None:
+        _client = openai.AsyncOpenAI(
+            api_key=openai.api_key or os.environ.get('OPENAI_API_KEY', 'your-api-key-here'),
+            base_url=OPENAI_BASE_URL,
+            # safe_openai_call does its own retrying
+            max_retries=0,
+            timeout=LLM_REQUEST_TIMEOUT,
+            http_client=openai.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_CONNECTIONS
+                ),
+                timeout=LLM_REQUEST_TIMEOUT
+            )
+        )
+        _semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return _client
+
+
+async def create_chat_completion(**params):
+    """Send one chat completion request through the shared client"""
+    client = get_client()
+    async with _semaphore:
+        return await client.chat.completions.create(**params)
+
+
+async def stream_chat_completion(**params):
+    """Send a streaming chat completion request, yielding response chunks as they arrive"""
+    client = get_client()
+    async with _semaphore:
+        stream = await client.chat.completions.create(
+            stream=True,
+            stream_options={"include_usage": True},
+            **params
+        )
+        async for chunk in stream:
+            yield chunk
+
+
+def _in_caller_context(coroutine):
+    # Tasks on the loop would otherwise see the loop thread's context
+    # variables rather than those of the request that submitted them
+    context = contextvars.copy_context()
+
+    async def run():
+        for variable, value in context.items():
+            variable.set(value)
+        return await coroutine
+
+    return run()
+
+
+def submit(coroutine):
+    """Start a coroutine on the client loop without waiting; returns a concurrent Future"""
+    return asyncio.run_coroutine_threadsafe(_in_caller_context(coroutine), _get_loop())
+
+
+def run_sync(coroutine):
+    """Run a coroutine on the client loop and wait for its result"""
+    _get_loop()
+    if threading.current_thread() is _loop_thread:
+        coroutine.close()
+        raise RuntimeError("run_sync() called from the LLM client loop; await the coroutine instead")
+    return submit(coroutine).result()
+
+
+def gather_sync(coroutines):
+    """Run coroutines concurrently on the client loop and return their results in order"""
+    coroutines = list(coroutines)
+
+    async def gather():
+        return await asyncio.gather(*coroutines)
+
+    return run_sync(gather())
+
+
+def iterate_sync(async_iterable):
+    """
+    Consume an async iterable on the client loop from synchronous code.
+
+    Items are handed over through a queue as they are produced. Closing the
+    generator early (e.g. a client disconnecting) cancels the producer.
+    """
+    items = queue.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async for item in async_iterable:
+                items.put((item, None))
+        except Exception as e:
+            items.put((None, e))
+            return
+        items.put((done, None))
+
+    future = submit(pump())
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        future.cancel()
+
+
+def close_client():
+    """Close the connection pool, e.g. before the process exits"""
+    async def close():
+        global _client
+        if _client is not None:
+            await _client.close()
+            _client = None
+
+    if _loop is not None:
+        run_sync(close())
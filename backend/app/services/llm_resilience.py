@@ -0,0 +1,200 @@
+# backend/app/services/llm_resilience.py
+
+import asyncio
+import threading
+import time
+from collections import deque
+import openai
+from app.config.config import (
+    CIRCUIT_BREAKER_ENABLED, CIRCUIT_WINDOW_SECONDS, CIRCUIT_MIN_CALLS,
+    CIRCUIT_ERROR_THRESHOLD, CIRCUIT_OPEN_SECONDS, LLM_REQUEST_TIMEOUT,
+    LLM_HEDGE_ENABLED, LLM_HEDGE_PERCENTILE, LLM_HEDGE_MIN_SAMPLES, LLM_HEDGE_MAX_SHARE
+)
+
+# Protects workers when the provider degrades. A circuit breaker per model
+# watches recent outcomes; once too many fail it opens and calls fail at
+# once instead of holding request threads through retries. After
+# CIRCUIT_OPEN_SECONDS it lets a single probe through (half-open) and closes
+# again if that succeeds. Separately, a request slower than the model's
+# recent p95 latency can be hedged with a second identical request; the
+# first response wins.
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+CIRCUIT_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# Recent successful latencies kept per model for the hedging threshold
+LATENCY_SAMPLES = 200
+
+_lock = threading.Lock()
+_breakers = {}
+_latencies = {}
+_hedge_counts = {}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a model whose circuit is open"""
+
+
+def is_provider_failure(error):
+    """Whether an error says the provider is unhealthy (rather than the request being bad or rate limited)"""
+    if isinstance(error, (openai.APIConnectionError, openai.InternalServerError, asyncio.TimeoutError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker over a sliding time window"""
+
+    def __init__(self, name):
+        self.name = name
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probe_started = None
+        self.outcomes = deque()
+        self.lock = threading.Lock()
+
+    def _trim(self, now):
+        while self.outcomes and self.outcomes[0][0] < now - CIRCUIT_WINDOW_SECONDS:
+            self.outcomes.popleft()
+
+    @property
+    def is_open(self):
+        return self.state == OPEN
+
+    def allow(self):
+        """Whether a request may be sent now"""
+        if not CIRCUIT_BREAKER_ENABLED:
+            return True
+        now = time.monotonic()
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if now - self.opened_at < CIRCUIT_OPEN_SECONDS:
+                    return False
+                self.state = HALF_OPEN
+                print(f"Circuit for {self.name} half-open, probing")
+            # One probe at a time; a probe that never reported is given up on
+            if self.probe_started is not None and now - self.probe_started < LLM_REQUEST_TIMEOUT:
+                return False
+            self.probe_started = now
+            return True
+
+    def record_success(self):
+        with self.lock:
+            if self.state != CLOSED:
+                print(f"Circuit for {self.name} closed")
+            self.state = CLOSED
+            self.probe_started = None
+            now = time.monotonic()
+            self.outcomes.append((now, True))
+            self._trim(now)
+
+    def record_failure(self):
+        now = time.monotonic()
+        with self.lock:
+            if self.state == HALF_OPEN:
+                self._open(now)
+                return
+            self.outcomes.append((now, False))
+            self._trim(now)
+            failures = sum(1 for _, ok in self.outcomes if not ok)
+            if (self.state == CLOSED and len(self.outcomes) >= CIRCUIT_MIN_CALLS
+                    and failures / len(self.outcomes) >= CIRCUIT_ERROR_THRESHOLD):
+                self._open(now)
+
+    def _open(self, now):
+        print(f"Circuit for {self.name} opened for {CIRCUIT_OPEN_SECONDS}s")
+        self.state = OPEN
+        self.opened_at = now
+        self.probe_started = None
+        self.outcomes.clear()
+
+
+def breaker_for(model):
+    with _lock:
+        breaker = _breakers.get(model)
+        if breaker is None:
+            breaker = _breakers[model] = CircuitBreaker(model)
+        return breaker
+
+
+def breaker_states():
+    """Current circuit state of every model called so far"""
+    with _lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.state for breaker in breakers}
+
+
+def record_latency(model, seconds):
+    with _lock:
+        samples = _latencies.get(model)
+        if samples is None:
+            samples = _latencies[model] = deque(maxlen=LATENCY_SAMPLES)
+        samples.append(seconds)
+
+
+def hedge_delay(model):
+    """Seconds after which a request to model is hedged, or None if it shouldn't be"""
+    if not LLM_HEDGE_ENABLED:
+        return None
+    with _lock:
+        samples = sorted(_latencies.get(model, ()))
+        sent, hedged = _hedge_counts.get(model, (0, 0))
+    if len(samples) < LLM_HEDGE_MIN_SAMPLES or hedged >= sent * LLM_HEDGE_MAX_SHARE:
+        return None
+    return samples[min(len(samples) - 1, int(len(samples) * LLM_HEDGE_PERCENTILE))]
+
+
+def hedge_counts():
+    """(requests sent, requests hedged) per model"""
+    with _lock:
+        return dict(_hedge_counts)
+
+
+def _count(model, hedged):
+    with _lock:
+        sent, hedges = _hedge_counts.get(model, (0, 0))
+        _hedge_counts[model] = (sent + 1, hedges + hedged)
+
+
+async def _timed(send):
+    started = time.monotonic()
+    result = await send()
+    return result, time.monotonic() - started
+
+
+async def hedged(model, send, send_hedge):
+    """
+    Await send(), starting send_hedge() as well if it takes longer than the
+    model's recent p95 latency, and return whichever response arrives first.
+
+    Args:
+        model: Model the request is for
+        send: Coroutine function making the request
+        send_hedge: Coroutine function making the duplicate request
+    """
+    delay = hedge_delay(model)
+    first = asyncio.ensure_future(_timed(send))
+    tasks = {first}
+    try:
+        if delay is not None:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                tasks.add(asyncio.ensure_future(_timed(send_hedge)))
+        _count(model, len(tasks) > 1)
+
+        error = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    result, seconds = task.result()
+                    record_latency(model, seconds)
+                    return result
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
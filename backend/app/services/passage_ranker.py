@@ -0,0 +1,131 @@
+# backend/app/services/passage_ranker.py
+
+import math
+from app.services.keyword_matcher import KeywordMatcher
+from app.services.tokenizer import count_tokens, TokenBudget
+
+# BM25 parameters: term frequency saturation and length normalisation
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+SEPARATOR = "\n\n"
+
+
+class PassageRanker:
+    """
+    Scores a document's paragraphs against a task query with BM25.
+
+    The query is a list of terms and phrases (e.g. "governing law:"),
+    counted in every paragraph in one pass by a KeywordMatcher. Terms found
+    in most paragraphs ("shall", "agreement") get little weight, so clauses
+    that are specific to the task outrank boilerplate. Build rankers for
+    fixed queries once, at import.
+    """
+
+    def __init__(self, terms):
+        self.matcher = KeywordMatcher(terms)
+
+    def score(self, text, spans):
+        """BM25 score of each (start, end) span of text"""
+        if not spans:
+            return []
+        hits = self.matcher.hits_by_span(text, spans)
+
+        frequencies = []
+        document_frequency = {}
+        for span_hits in hits:
+            counts = {}
+            for _, term in span_hits:
+                counts[term] = counts.get(term, 0) + 1
+            frequencies.append(counts)
+            for term in counts:
+                document_frequency[term] = document_frequency.get(term, 0) + 1
+
+        total = len(spans)
+        idf = {
+            term: math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+        lengths = [end - start for start, end in spans]
+        average_length = sum(lengths) / total or 1
+
+        scores = []
+        for counts, length in zip(frequencies, lengths):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+            scores.append(sum(
+                idf[term] * count * (BM25_K1 + 1) / (count + norm)
+                for term, count in counts.items()
+            ))
+        return scores
+
+    def build_context(self, segments, max_tokens, model, lead_tokens=0, min_passages=0):
+        """
+        Assemble prompt context from a document within a token budget.
+
+        The opening paragraphs (title, parties, dates) are kept up to
+        lead_tokens. The rest of the budget goes to the highest-scoring
+        paragraphs; if fewer than min_passages match the query, evenly spaced
+        paragraphs fill in. Selected paragraphs appear in document order.
+        A document that fits the budget is returned whole.
+
+        Args:
+            segments: DocumentSegments of the document
+            max_tokens: Token budget for the whole context
+            model: Model whose tokenizer counts the budget
+            lead_tokens: Budget reserved for the opening of the document
+            min_passages: Paragraphs to include even without query matches
+
+        Returns:
+            The context text
+        """
+        text = segments.text
+        if count_tokens(text, model) <= max_tokens:
+            return text
+
+        spans = segments.paragraph_spans
+        paragraphs = segments.paragraphs
+        budget = TokenBudget(max_tokens, model)
+        selected = set()
+
+        # Whole opening paragraphs, or as much of a long first one as fits
+        lead = TokenBudget(min(lead_tokens, max_tokens), model)
+        lead_prefix = ""
+        for index, paragraph in enumerate(paragraphs):
+            if not lead.add(paragraph + SEPARATOR):
+                if index == 0 and lead.add(SEPARATOR):
+                    # The separator after the prefix is reserved with it
+                    lead_prefix = lead.take_prefix(paragraph)
+                    if lead_prefix:
+                        # Its opening is already in; don't add it again whole
+                        selected.add(0)
+                break
+            selected.add(index)
+        budget.remaining -= lead.used
+
+        scores = self.score(text, spans)
+        ranked = sorted(
+            (index for index, score in enumerate(scores) if score > 0 and index not in selected),
+            key=lambda index: scores[index],
+            reverse=True
+        )
+        matched = 0
+        for index in ranked:
+            if budget.exhausted:
+                break
+            if budget.add(paragraphs[index] + SEPARATOR):
+                selected.add(index)
+                matched += 1
+
+        if matched < min_passages and len(paragraphs) > 1:
+            wanted = min_passages - matched
+            step = max(1, len(paragraphs) // (wanted + 1))
+            for index in range(step, len(paragraphs), step):
+                if budget.exhausted or wanted <= 0:
+                    break
+                if index not in selected and budget.add(paragraphs[index] + SEPARATOR):
+                    selected.add(index)
+                    wanted -= 1
+
+        parts = [lead_prefix] if lead_prefix else []
+        parts.extend(paragraphs[index] for index in sorted(selected) if not (index == 0 and lead_prefix))
+        return SEPARATOR.join(parts)
@@ -0,0 +1,207 @@
+# backend/app/services/rate_limiter.py
+
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from app.config.database import get_database
+from app.config.config import (
+    RATE_LIMIT_ENABLED, OPENAI_RPM_LIMIT, OPENAI_TPM_LIMIT,
+    RATE_LIMIT_BURST_SECONDS, RATE_LIMIT_JITTER_SECONDS
+)
+
+db = get_database()
+
+# One token bucket pair (requests and tokens) per model in the rate_limits
+# collection, shared by every worker process. Buckets refill continuously at
+# the per-minute limits and hold at most RATE_LIMIT_BURST_SECONDS worth, so
+# calls are spread out instead of bursting into a 429. A 429 sets
+# blocked_until, pausing all workers for the Retry-After period at once.
+REQUEST_CAPACITY = max(1.0, OPENAI_RPM_LIMIT * RATE_LIMIT_BURST_SECONDS / 60)
+TOKEN_CAPACITY = max(1.0, OPENAI_TPM_LIMIT * RATE_LIMIT_BURST_SECONDS / 60)
+
+# While MongoDB can't be reached, each process paces itself with buckets of
+# its own rather than failing the call; a rate limiter outage must not turn
+# into an OpenAI outage
+ERROR_LOG_INTERVAL = 30  # seconds
+_local_lock = threading.Lock()
+_local_buckets = {}
+_last_error_logged = 0.0
+
+
+def _refill(state, now):
+    elapsed = max(0.0, now - state["updated_at"])
+    requests = min(REQUEST_CAPACITY, state["requests"] + elapsed * OPENAI_RPM_LIMIT / 60)
+    tokens = min(TOKEN_CAPACITY, state["tokens"] + elapsed * OPENAI_TPM_LIMIT / 60)
+    return requests, tokens
+
+
+def _try_acquire(bucket, tokens):
+    """
+    Make one attempt to take a request and tokens from a bucket.
+
+    Returns:
+        0.0 if acquired, seconds to wait before trying again, or None if
+        another worker updated the bucket first and it should be retried now
+    """
+    now = time.time()
+    state = db.rate_limits.find_one({"_id": bucket})
+    if state is None:
+        try:
+            db.rate_limits.insert_one({
+                "_id": bucket,
+                "requests": REQUEST_CAPACITY,
+                "tokens": TOKEN_CAPACITY,
+                "updated_at": now,
+                "blocked_until": 0.0,
+                "version": 0
+            })
+        except DuplicateKeyError:
+            pass
+        return None
+
+    if state.get("blocked_until", 0.0) > now:
+        return state["blocked_until"] - now
+
+    requests, available = _refill(state, now)
+    # A single request larger than the bucket only has to wait for a full one
+    tokens = min(tokens, TOKEN_CAPACITY)
+    if requests < 1 or available < tokens:
+        return _wait_seconds(requests, available, tokens)
+
+    result = db.rate_limits.update_one(
+        {"_id": bucket, "version": state["version"]},
+        {
+            "$set": {"requests": requests - 1, "tokens": available - tokens, "updated_at": now},
+            "$inc": {"version": 1}
+        }
+    )
+    return 0.0 if result.modified_count else None
+
+
+def _wait_seconds(requests, available, tokens):
+    return max(
+        (1 - requests) * 60 / OPENAI_RPM_LIMIT,
+        (tokens - available) * 60 / OPENAI_TPM_LIMIT,
+        0.001
+    )
+
+
+def _local_bucket(bucket, now):
+    state = _local_buckets.get(bucket)
+    if state is None:
+        state = _local_buckets[bucket] = {
+            "requests": REQUEST_CAPACITY,
+            "tokens": TOKEN_CAPACITY,
+            "updated_at": now,
+            "blocked_until": 0.0
+        }
+    return state
+
+
+def _try_acquire_local(bucket, tokens):
+    """_try_acquire against this process's own bucket"""
+    now = time.time()
+    with _local_lock:
+        state = _local_bucket(bucket, now)
+        if state["blocked_until"] > now:
+            return state["blocked_until"] - now
+
+        requests, available = _refill(state, now)
+        tokens = min(tokens, TOKEN_CAPACITY)
+        if requests < 1 or available < tokens:
+            return _wait_seconds(requests, available, tokens)
+
+        state.update(requests=requests - 1, tokens=available - tokens, updated_at=now)
+        return 0.0
+
+
+def _log_error(action, error):
+    """Log a MongoDB failure, at most once per ERROR_LOG_INTERVAL"""
+    global _last_error_logged
+    now = time.monotonic()
+    with _local_lock:
+        if now - _last_error_logged < ERROR_LOG_INTERVAL:
+            return
+        _last_error_logged = now
+    print(f"Rate limiter could not {action} ({str(error)}); pacing each process on its own")
+
+
+async def acquire(bucket, tokens):
+    """Wait until the bucket has room for one request of the given token count"""
+    if not RATE_LIMIT_ENABLED:
+        return
+
+    while True:
+        try:
+            wait = await asyncio.to_thread(_try_acquire, bucket, tokens)
+        except PyMongoError as e:
+            _log_error("reach the shared buckets", e)
+            wait = _try_acquire_local(bucket, tokens)
+        if wait == 0.0:
+            return
+        if wait is None:
+            # Lost a race with another worker; back off only very briefly
+            await asyncio.sleep(random.uniform(0, 0.01))
+            continue
+        # Jitter keeps waiting workers from all waking at the same instant
+        await asyncio.sleep(wait + random.uniform(0, RATE_LIMIT_JITTER_SECONDS))
+
+
+def record_usage(bucket, estimated_tokens, actual_tokens):
+    """Correct a bucket once a response reports how many tokens it really used"""
+    if not RATE_LIMIT_ENABLED or actual_tokens is None:
+        return
+    with _local_lock:
+        if bucket in _local_buckets:
+            _local_buckets[bucket]["tokens"] += estimated_tokens - actual_tokens
+    try:
+        db.rate_limits.update_one(
+            {"_id": bucket},
+            {"$inc": {"tokens": estimated_tokens - actual_tokens, "version": 1}}
+        )
+    except PyMongoError as e:
+        _log_error("record token usage", e)
+
+
+def block_for(bucket, seconds):
+    """Stop all workers from calling with this bucket for the given time"""
+    if not RATE_LIMIT_ENABLED:
+        return
+    blocked_until = time.time() + seconds
+    with _local_lock:
+        state = _local_bucket(bucket, time.time())
+        state["blocked_until"] = max(state["blocked_until"], blocked_until)
+    try:
+        db.rate_limits.update_one(
+            {"_id": bucket},
+            {"$max": {"blocked_until": blocked_until}, "$inc": {"version": 1}}
+        )
+    except PyMongoError as e:
+        _log_error("share a rate limit block", e)
+
+
+def retry_after_seconds(error):
+    """Read the Retry-After delay from a rate limit error's response, if it has one"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return None
@@ -0,0 +1,250 @@
+# backend/app/services/segmentation.py
+
+import re
+from app.services.content_store import load_content, save_content
+from app.services.tokenizer import count_tokens, truncate_to_tokens
+
+# Bump whenever the segmentation rules change; stale results are recomputed
+SEGMENTATION_VERSION = 1
+
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+
+# PDF and DOCX text often has no blank lines at all; blocks longer than this
+# are also split where a line ends a sentence and the next one starts anew
+LONG_BLOCK_CHARS = 1500
+SENTENCE_LINE_BREAK = re.compile(r'(?<=[.;:!?])[ \t]*\n(?=[ \t]*[A-Z0-9(\"\u201c])')
+
+# "1.", "2.3", "4.1.2)", optionally preceded by Section/Article/Clause.
+# Components are capped at three digits so years and amounts don't match.
+CLAUSE_HEADING = re.compile(
+    r'^[ \t]*(?:(?:Section|SECTION|Article|ARTICLE|Clause|CLAUSE)\s+)?'
+    r'(\d{1,3}(?:\.\d{1,3})*)[.)]?[ \t]+(?=\S)',
+    re.MULTILINE
+)
+
+# "ARTICLE IV", "SCHEDULE A" and short all-caps lines such as "1. DEFINITIONS"
+SECTION_HEADING = re.compile(
+    r'^[ \t]*(?:(?:ARTICLE|Article|SCHEDULE|Schedule|EXHIBIT|Exhibit|ANNEX|Annex)\s+[\dIVXLC]+[^\n]*'
+    r'|(?:\d{1,3}[.)]?[ \t]+)?[A-Z][A-Z0-9 ,;:&()\'/-]{3,79})[ \t]*$',
+    re.MULTILINE
+)
+
+
+def paragraph_boundaries(text):
+    """Return [start, end] character offsets of the blank-line separated paragraphs in text"""
+    boundaries = []
+    start = 0
+    for match in PARAGRAPH_BREAK.finditer(text):
+        if match.start() > start:
+            boundaries.append([start, match.start()])
+        start = match.end()
+    if start < len(text):
+        boundaries.append([start, len(text)])
+    return boundaries
+
+
+def _trim(text, start, end):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def segment_text(text):
+    """
+    Split a document into paragraphs, numbered clauses and sections.
+
+    Paragraphs are blank-line separated blocks, further split where a
+    numbered clause begins and, for long blocks, at sentence-ending line
+    breaks (PDF and DOCX text often has no blank lines). Clauses
+    run from their heading to the next clause heading; sections from a
+    top-level heading to the next one.
+
+    Returns:
+        dict: {"version", "paragraphs": [[start, end]],
+               "clauses": [{"number", "level", "start", "end"}],
+               "sections": [{"title", "start", "end"}]}
+    """
+    clause_starts = [(match.start(), match.group(1)) for match in CLAUSE_HEADING.finditer(text)]
+
+    # Paragraphs
+    paragraphs = []
+    starts = [start for start, _ in clause_starts]
+    position = 0
+    for block_start, block_end in paragraph_boundaries(text):
+        cuts = [s for s in starts[position:] if block_start < s < block_end]
+        position += sum(1 for s in starts[position:] if s < block_end)
+        edges = [block_start] + cuts + [block_end]
+        for start, end in zip(edges, edges[1:]):
+            pieces = [start]
+            if end - start > LONG_BLOCK_CHARS:
+                pieces += [match.end() for match in SENTENCE_LINE_BREAK.finditer(text, start, end)]
+            pieces.append(end)
+            for piece_start, piece_end in zip(pieces, pieces[1:]):
+                piece_start, piece_end = _trim(text, piece_start, piece_end)
+                if piece_end > piece_start:
+                    paragraphs.append([piece_start, piece_end])
+
+    # Clauses
+    clauses = []
+    for i, (start, number) in enumerate(clause_starts):
+        end = clause_starts[i + 1][0] if i + 1 < len(clause_starts) else len(text)
+        start, end = _trim(text, start, end)
+        clauses.append({"number": number, "level": number.count('.') + 1, "start": start, "end": end})
+
+    # Sections: explicit headings, or top-level numbered clauses if there are none
+    headings = [(match.start(), match.group(0).strip()) for match in SECTION_HEADING.finditer(text)]
+    if not headings:
+        headings = [
+            (clause["start"], text[clause["start"]:clause["end"]].split('\n', 1)[0].strip())
+            for clause in clauses if clause["level"] == 1
+        ]
+    sections = []
+    for i, (start, title) in enumerate(headings):
+        end = headings[i + 1][0] if i + 1 < len(headings) else len(text)
+        start, end = _trim(text, start, end)
+        sections.append({"title": title[:200], "start": start, "end": end})
+
+    return {
+        "version": SEGMENTATION_VERSION,
+        "paragraphs": paragraphs,
+        "clauses": clauses,
+        "sections": sections
+    }
+
+
+class DocumentSegments:
+    """Extracted text plus its segmentation, with passages sliced on demand"""
+
+    def __init__(self, text, segmentation):
+        self.text = text
+        self.segmentation = segmentation
+
+    @property
+    def paragraph_spans(self):
+        return self.segmentation["paragraphs"]
+
+    @property
+    def paragraphs(self):
+        return [self.text[start:end] for start, end in self.segmentation["paragraphs"]]
+
+    def paragraph(self, index):
+        start, end = self.segmentation["paragraphs"][index]
+        return self.text[start:end]
+
+    @property
+    def clauses(self):
+        return [dict(clause, text=self.text[clause["start"]:clause["end"]])
+                for clause in self.segmentation["clauses"]]
+
+    @property
+    def sections(self):
+        return [dict(section, text=self.text[section["start"]:section["end"]])
+                for section in self.segmentation["sections"]]
+
+
+def _split_span(text, start, end, max_tokens, model):
+    """Split an over-long span into consecutive spans of at most max_tokens"""
+    spans = []
+    while start < end:
+        piece = truncate_to_tokens(text[start:end], max_tokens, model)
+        # Prefer to cut at the last line break of the piece
+        cut = piece.rfind("\n", len(piece) // 2) if len(piece) < end - start else -1
+        length = cut + 1 if cut > 0 else max(len(piece), 1)
+        spans.append((start, start + length))
+        start += length
+    return spans
+
+
+def section_chunks(segments, max_tokens, model, min_tokens=None):
+    """
+    Split a document into chunks that follow its section boundaries.
+
+    Consecutive sections are packed into a chunk until it holds at least
+    min_tokens (half of max_tokens by default); a section too long for one
+    chunk is split at paragraph breaks. Where a chunk ends depends only on
+    the sections since the previous chunk, so a small edit changes the chunk
+    it falls in and leaves the others as they were.
+
+    Args:
+        segments: DocumentSegments of the document
+        max_tokens: Largest chunk, in tokens
+        model: Model whose tokenizer counts the tokens
+        min_tokens: Size at which a chunk is closed at the next section end
+
+    Returns:
+        list of chunk texts, in document order, covering the whole document
+    """
+    text = segments.text
+    if min_tokens is None:
+        min_tokens = max_tokens // 2
+
+    # Sections, plus whatever precedes the first heading
+    units = [(section["start"], section["end"]) for section in segments.segmentation["sections"]]
+    if not units:
+        units = [tuple(span) for span in segments.paragraph_spans]
+    if not units:
+        return [text] if text.strip() else []
+    if units[0][0] > 0:
+        units.insert(0, (0, units[0][0]))
+
+    # Break up sections longer than a chunk, at paragraphs where possible
+    pieces = []
+    paragraphs = segments.paragraph_spans
+    for start, end in units:
+        if count_tokens(text[start:end], model) <= max_tokens:
+            pieces.append((start, end))
+            continue
+        edges = [start] + [p_start for p_start, _ in paragraphs if start < p_start < end] + [end]
+        for p_start, p_end in zip(edges, edges[1:]):
+            if count_tokens(text[p_start:p_end], model) <= max_tokens:
+                pieces.append((p_start, p_end))
+            else:
+                pieces.extend(_split_span(text, p_start, p_end, max_tokens, model))
+
+    # Pack consecutive pieces; each chunk runs from its first piece to its
+    # last so text between sections is not lost
+    chunks = []
+    chunk_start = None
+    chunk_tokens = 0
+    for start, end in pieces:
+        tokens = count_tokens(text[start:end], model)
+        if chunk_start is not None and chunk_tokens + tokens > max_tokens:
+            chunks.append((chunk_start, start))
+            chunk_start = None
+        if chunk_start is None:
+            chunk_start, chunk_tokens = start, 0
+        chunk_tokens += tokens
+        if chunk_tokens >= min_tokens:
+            chunks.append((chunk_start, end))
+            chunk_start = None
+    if chunk_start is not None:
+        chunks.append((chunk_start, len(text)))
+    elif chunks:
+        chunks[-1] = (chunks[-1][0], len(text))
+
+    return [text[start:end] for start, end in chunks if text[start:end].strip()]
+
+
+def load_segments(document_id):
+    """
+    Load a document's text and segmentation.
+
+    Documents processed before segmentation existed (or under older rules)
+    are segmented now and the result is stored for next time.
+
+    Returns:
+        DocumentSegments, or None if the document has no extracted text
+    """
+    content = load_content(document_id, ("extracted_text", "segmentation"))
+    text = content.get("extracted_text")
+    if text is None:
+        return None
+
+    segmentation = content.get("segmentation")
+    if not segmentation or segmentation.get("version") != SEGMENTATION_VERSION:
+        segmentation = segment_text(text)
+        save_content(document_id, {"segmentation": segmentation})
+
+    return DocumentSegments(text, segmentation)
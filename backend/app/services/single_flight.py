@@ -0,0 +1,146 @@
+# backend/app/services/single_flight.py
+
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from app.config.database import get_database
+from app.config.config import SINGLE_FLIGHT_LEASE_SECONDS, SINGLE_FLIGHT_POLL_INTERVAL
+from app.services.text_compression import compress_text, decompress_text
+
+db = get_database()
+
+# Identical calls running at the same time are made once. Within a process
+# callers share an asyncio future (every call runs on the llm_client loop).
+# Across processes the first caller takes a lease in llm_inflight; others
+# poll it until the leader stores its result there. A leader that fails
+# drops the lease so a waiter can take over; one that dies lets it expire.
+# If MongoDB can't be reached the call is simply made; sharing is an
+# optimisation and must never fail a call.
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# How long a finished result stays available to waiters still polling
+RESULT_SECONDS = 30
+
+_inflight = {}
+
+
+def setup_single_flight_indexes():
+    """
+    Create MongoDB indexes for in-flight call leases.
+    Should be called during application startup.
+    """
+    try:
+        db.llm_inflight.create_index("expires_at", expireAfterSeconds=0, name="llm_inflight_ttl_index")
+        print("MongoDB single-flight indexes have been set up successfully")
+    except Exception as e:
+        print(f"Error setting up single-flight indexes: {str(e)}")
+
+
+def _acquire_lease(key):
+    """
+    Try to become the worker that makes the call for key.
+
+    Returns:
+        None if this worker now holds the lease, otherwise the current
+        lease document ({} if it vanished in the meantime)
+    """
+    now = datetime.utcnow()
+    lease = {
+        "owner": WORKER_ID,
+        "status": "running",
+        "expires_at": now + timedelta(seconds=SINGLE_FLIGHT_LEASE_SECONDS)
+    }
+    try:
+        db.llm_inflight.insert_one({"_id": key, **lease})
+        return None
+    except DuplicateKeyError:
+        pass
+
+    # Take over a lease that expired because its holder died or hung
+    if db.llm_inflight.find_one_and_update({"_id": key, "expires_at": {"$lte": now}}, {"$set": lease}):
+        return None
+    return db.llm_inflight.find_one({"_id": key}) or {}
+
+
+def _release_lease(key, response_text):
+    try:
+        if response_text is None:
+            db.llm_inflight.delete_one({"_id": key, "owner": WORKER_ID})
+            return
+        now = datetime.utcnow()
+        db.llm_inflight.update_one(
+            {"_id": key, "owner": WORKER_ID},
+            {"$set": {
+                "status": "done",
+                "response": compress_text(response_text),
+                "finished_at": now,
+                "expires_at": now + timedelta(seconds=RESULT_SECONDS)
+            }}
+        )
+    except PyMongoError as e:
+        # The lease expires on its own
+        print(f"Error releasing single-flight lease: {str(e)}")
+
+
+async def _run_across_workers(key, call, reuse_results=True):
+    # Without reuse, only a result finished after this call started will do
+    started = datetime.utcnow()
+    while True:
+        try:
+            lease = await asyncio.to_thread(_acquire_lease, key)
+        except PyMongoError as e:
+            print(f"Single-flight unavailable, calling directly: {str(e)}")
+            return await call(), True
+
+        if lease is None:
+            response_text = None
+            try:
+                response_text = await call()
+            finally:
+                await asyncio.to_thread(_release_lease, key, response_text)
+            return response_text, True
+
+        if lease.get("status") == "done" and lease.get("expires_at", datetime.min) > datetime.utcnow():
+            if reuse_results or lease.get("finished_at", datetime.min) >= started:
+                return decompress_text(lease["response"]), False
+            # A stale result from before this call; make a fresh one
+            return await call(), True
+        await asyncio.sleep(SINGLE_FLIGHT_POLL_INTERVAL)
+
+
+async def run_once(key, call, reuse_results=True):
+    """
+    Run call() unless an identical call is already in flight, then share its result.
+
+    Args:
+        key: Hash identifying the request
+        call: Coroutine function returning the response text, or None on failure
+        reuse_results: Set to False when cached responses must not be used;
+            a result another worker finished before this call started is
+            then not accepted
+
+    Returns:
+        (response_text, is_leader) where is_leader tells whether this caller
+        made the call itself
+    """
+    if not reuse_results:
+        # In-process callers may be sharing an older worker's result
+        return await _run_across_workers(key, call, reuse_results=False)
+
+    future = _inflight.get(key)
+    if future is not None:
+        response_text, _ = await asyncio.shield(future)
+        return response_text, False
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    result = (None, True)
+    try:
+        result = await _run_across_workers(key, call)
+        return result
+    finally:
+        del _inflight[key]
+        future.set_result(result)
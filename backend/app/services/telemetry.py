@@ -0,0 +1,353 @@
+# backend/app/services/telemetry.py
+
+import atexit
+import contextvars
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from app.config.database import get_database
+from app.config.config import (
+    TELEMETRY_ENABLED, TELEMETRY_BATCH_SIZE, TELEMETRY_FLUSH_SECONDS,
+    TELEMETRY_MAX_BUFFER, TELEMETRY_RETENTION_DAYS
+)
+
+db = get_database()
+
+# Every AI call is recorded twice: into fixed-bucket histograms and counters
+# in this process (exposed at /metrics), and into a buffer that a background
+# thread writes to the ai_usage collection in batches, for spend reports
+# across workers. Memory stays bounded: histograms have fixed buckets per
+# feature and model, and the buffer drops its oldest records when Mongo
+# can't keep up.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+# USD per 1K tokens as (input, output); model names are matched by prefix,
+# longest first, so dated snapshots such as gpt-4o-2024-08-06 resolve too
+MODEL_PRICING = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4": (0.03, 0.06)
+}
+
+# User the current request acts for; tasks on the LLM client loop inherit it
+# from the thread that submitted them (see llm_client.submit)
+current_user_id = contextvars.ContextVar("current_user_id", default=None)
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = defaultdict(float)
+_buffer = []
+_dropped = 0
+_flush_event = threading.Event()
+_flusher = None
+
+
+def estimate_cost(input_tokens, output_tokens, model="gpt-3.5-turbo"):
+    """Estimate cost in USD based on current OpenAI pricing"""
+    for name in sorted(MODEL_PRICING, key=len, reverse=True):
+        if model.startswith(name):
+            input_price, output_price = MODEL_PRICING[name]
+            break
+    else:  # Default to GPT-4 pricing
+        input_price, output_price = MODEL_PRICING["gpt-4"]
+
+    return (input_tokens / 1000) * input_price + (output_tokens / 1000) * output_price
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """(upper bound, count of observations at or below it) pairs, ending with +Inf"""
+        total = 0
+        result = []
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+def setup_telemetry_indexes():
+    """
+    Create MongoDB indexes for AI usage records.
+    Should be called during application startup.
+    """
+    try:
+        db.ai_usage.create_index(
+            "timestamp",
+            expireAfterSeconds=TELEMETRY_RETENTION_DAYS * 24 * 60 * 60,
+            name="ai_usage_ttl_index"
+        )
+        db.ai_usage.create_index([("user_id", 1), ("timestamp", -1)], name="ai_usage_user_index")
+        db.ai_usage.create_index([("feature", 1), ("timestamp", -1)], name="ai_usage_feature_index")
+        print("MongoDB telemetry indexes have been set up successfully")
+    except Exception as e:
+        print(f"Error setting up telemetry indexes: {str(e)}")
+
+
+def bind_request_user():
+    """Remember the signed-in user, if any, for AI calls made during this request"""
+    user_id = None
+    try:
+        from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+        if verify_jwt_in_request(optional=True):
+            user_id = get_jwt_identity()
+    except Exception:
+        # Invalid tokens are rejected by the endpoint itself
+        pass
+    current_user_id.set(user_id)
+
+
+def _observe(name, labels, buckets, value):
+    key = (name, labels)
+    histogram = _histograms.get(key)
+    if histogram is None:
+        histogram = _histograms[key] = Histogram(buckets)
+    histogram.observe(value)
+
+
+def record_call(feature, model, latency, prompt_tokens=0, completion_tokens=0,
+                retries=0, cache_hit=False, shared=False, success=True, streamed=False,
+                circuit_open=False):
+    """
+    Record one AI call.
+
+    Args:
+        feature: Name of the feature that made the call
+        model: Model requested
+        latency: Seconds until the result was available
+        prompt_tokens, completion_tokens: Usage reported by the API; zero
+            when no request was sent
+        retries: Attempts made after the first one
+        cache_hit: Answered from the response cache
+        shared: Answered by an identical call already in flight
+        success: False if the call fell back to its default result
+        streamed: Made as a streaming request
+        circuit_open: Turned away by the model's open circuit breaker
+            without a request being sent
+    """
+    if not TELEMETRY_ENABLED:
+        return
+    global _dropped
+
+    feature = feature or "unknown"
+    cost = estimate_cost(prompt_tokens, completion_tokens, model) if prompt_tokens or completion_tokens else 0.0
+    source = "cache" if cache_hit else "shared" if shared else "circuit_open" if circuit_open else "api"
+    labels = (("feature", feature), ("model", model))
+
+    with _lock:
+        _observe("ai_call_latency_seconds", labels + (("source", source),), LATENCY_BUCKETS, latency)
+        # Calls that reported no usage (failures among them) would only
+        # skew the token histograms towards zero
+        if source == "api" and (prompt_tokens or completion_tokens):
+            _observe("ai_prompt_tokens", labels, TOKEN_BUCKETS, prompt_tokens)
+            _observe("ai_completion_tokens", labels, TOKEN_BUCKETS, completion_tokens)
+        _counters[("ai_calls_total", labels + (("source", source),))] += 1
+        if not success:
+            _counters[("ai_call_failures_total", labels)] += 1
+        _counters[("ai_retries_total", labels)] += retries
+        _counters[("ai_prompt_tokens_total", labels)] += prompt_tokens
+        _counters[("ai_completion_tokens_total", labels)] += completion_tokens
+        _counters[("ai_cost_usd_total", labels)] += cost
+
+        _buffer.append({
+            "timestamp": datetime.utcnow(),
+            "feature": feature,
+            "model": model,
+            "user_id": current_user_id.get(),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "latency_ms": round(latency * 1000, 1),
+            "retries": retries,
+            "cache_hit": cache_hit,
+            "shared": shared,
+            "success": success,
+            "streamed": streamed,
+            "circuit_open": circuit_open,
+            "cost": cost
+        })
+        if len(_buffer) > TELEMETRY_MAX_BUFFER:
+            overflow = len(_buffer) - TELEMETRY_MAX_BUFFER
+            del _buffer[:overflow]
+            _dropped += overflow
+        if len(_buffer) >= TELEMETRY_BATCH_SIZE:
+            _flush_event.set()
+
+
+def flush():
+    """Write buffered usage records to MongoDB; returns how many were written"""
+    global _dropped
+    with _lock:
+        batch = _buffer[:]
+        del _buffer[:]
+    if not batch:
+        return 0
+    try:
+        db.ai_usage.insert_many(batch, ordered=False)
+        return len(batch)
+    except Exception as e:
+        print(f"Error writing AI usage records: {str(e)}")
+        # Put the batch back for the next flush, within the buffer limit
+        with _lock:
+            _buffer[:0] = batch
+            if len(_buffer) > TELEMETRY_MAX_BUFFER:
+                overflow = len(_buffer) - TELEMETRY_MAX_BUFFER
+                del _buffer[:overflow]
+                _dropped += overflow
+        return 0
+
+
+def _flush_loop():
+    while True:
+        _flush_event.wait(TELEMETRY_FLUSH_SECONDS)
+        _flush_event.clear()
+        flush()
+
+
+def start_telemetry_flusher():
+    """
+    Start the background thread that writes usage records in batches.
+    Safe to call more than once; the thread is only started the first time.
+    """
+    global _flusher
+    if not TELEMETRY_ENABLED:
+        return
+    with _lock:
+        if _flusher is not None:
+            return
+        _flusher = threading.Thread(target=_flush_loop, name="telemetry-flusher", daemon=True)
+        _flusher.start()
+    atexit.register(flush)
+
+
+def _format_labels(labels):
+    return ",".join(f'{name}="{str(value)}"' for name, value in labels)
+
+
+def render_metrics():
+    """This process's AI metrics in the Prometheus text exposition format"""
+    from app.services.llm_cache import cache_stats
+    from app.services.llm_resilience import breaker_states, hedge_counts, CIRCUIT_STATE_VALUES
+    from app.services.category_classifier import classifier_stats
+
+    with _lock:
+        histograms = {key: (h.cumulative(), h.sum, h.count) for key, h in _histograms.items()}
+        counters = dict(_counters)
+        buffered = len(_buffer)
+        dropped = _dropped
+
+    lines = []
+    seen = set()
+
+    def header(name, kind, help_text):
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    help_texts = {
+        "ai_call_latency_seconds": "Time until an AI call returned its result",
+        "ai_prompt_tokens": "Prompt tokens per AI request that reported usage",
+        "ai_completion_tokens": "Completion tokens per AI request that reported usage",
+        "ai_calls_total": "AI calls by where the result came from (circuit_open: turned away unsent)",
+        "ai_call_failures_total": "AI calls that fell back to their default result",
+        "ai_retries_total": "AI request attempts after the first",
+        "ai_prompt_tokens_total": "Prompt tokens sent",
+        "ai_completion_tokens_total": "Completion tokens received",
+        "ai_cost_usd_total": "Estimated spend in USD"
+    }
+
+    for (name, labels), (buckets, total, count) in sorted(histograms.items()):
+        header(name, "histogram", help_texts[name])
+        for bound, cumulative in buckets:
+            lines.append(f'{name}_bucket{{{_format_labels(labels + (("le", bound),))}}} {cumulative}')
+        lines.append(f"{name}_sum{{{_format_labels(labels)}}} {total}")
+        lines.append(f"{name}_count{{{_format_labels(labels)}}} {count}")
+
+    for (name, labels), value in sorted(counters.items()):
+        header(name, "counter", help_texts[name])
+        lines.append(f"{name}{{{_format_labels(labels)}}} {value:g}")
+
+    header("ai_usage_buffered_records", "gauge", "Usage records waiting to be written to MongoDB")
+    lines.append(f"ai_usage_buffered_records {buffered}")
+    header("ai_usage_dropped_records_total", "counter", "Usage records dropped because the buffer was full")
+    lines.append(f"ai_usage_dropped_records_total {dropped}")
+
+    header("ai_circuit_state", "gauge", "Circuit breaker state per model (0 closed, 1 half-open, 2 open)")
+    for model, state in sorted(breaker_states().items()):
+        lines.append(f'ai_circuit_state{{model="{model}"}} {CIRCUIT_STATE_VALUES[state]}')
+    header("ai_requests_sent_total", "counter", "API requests sent, not counting hedges")
+    header("ai_requests_hedged_total", "counter", "API requests duplicated because they were slow")
+    for model, (sent, hedged) in sorted(hedge_counts().items()):
+        lines.append(f'ai_requests_sent_total{{model="{model}"}} {sent}')
+        lines.append(f'ai_requests_hedged_total{{model="{model}"}} {hedged}')
+
+    stats = cache_stats()
+    header("llm_cache_lookups_total", "counter", "Response cache lookups by result")
+    for result in ("memory_hits", "mongo_hits", "misses"):
+        lines.append(f'llm_cache_lookups_total{{result="{result}"}} {stats[result]}')
+    header("llm_cache_memory_entries", "gauge", "Responses held in the in-process cache")
+    lines.append(f"llm_cache_memory_entries {stats['memory_entries']}")
+
+    header("category_suggestions_total", "counter", "Category suggestions by whether the local classifier answered")
+    for answered_by, count in sorted(classifier_stats().items()):
+        lines.append(f'category_suggestions_total{{answered_by="{answered_by}"}} {count}')
+
+    return "\n".join(lines) + "\n"
+
+
+def user_spend(user_id=None, days=30):
+    """
+    Aggregate recorded AI usage by feature for one user, or by user for all.
+
+    Returns:
+        List of dicts with calls, cache hits, tokens, cost and mean latency,
+        most expensive first
+    """
+    match = {"timestamp": {"$gte": datetime.utcnow() - timedelta(days=days)}}
+    if user_id is not None:
+        match["user_id"] = user_id
+    group_by = "$feature" if user_id is not None else "$user_id"
+
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": group_by,
+            "calls": {"$sum": 1},
+            "cache_hits": {"$sum": {"$cond": ["$cache_hit", 1, 0]}},
+            "failures": {"$sum": {"$cond": ["$success", 0, 1]}},
+            "prompt_tokens": {"$sum": "$prompt_tokens"},
+            "completion_tokens": {"$sum": "$completion_tokens"},
+            "cost": {"$sum": "$cost"},
+            "avg_latency_ms": {"$avg": "$latency_ms"}
+        }},
+        {"$sort": {"cost": -1}}
+    ]
+
+    results = []
+    for row in db.ai_usage.aggregate(pipeline):
+        row["feature" if user_id is not None else "user_id"] = row.pop("_id")
+        row["cost"] = round(row["cost"], 6)
+        row["avg_latency_ms"] = round(row["avg_latency_ms"] or 0, 1)
+        results.append(row)
+    return results
+
@@ -0,0 +1,104 @@
+# backend/app/services/text_compression.py
+
+import re
+import sys
+import zlib
+from bson.binary import Binary
+from app.config.database import get_database
+from app.config.config import TEXT_COMPRESSION_LEVEL, TEXT_COMPRESSION_MIN_CHARS
+
+# Compressed text is stored as {"codec": "zlib", "version": 1, "data": <bytes>,
+# "length": <chars>}. Plain strings are still accepted everywhere, so short
+# values and records written before compression need no special handling.
+CODEC_ZLIB = "zlib"
+FORMAT_VERSION = 1
+
+WORD = re.compile(r'\w+')
+
+
+def is_compressed(value):
+    return isinstance(value, dict) and "codec" in value and "data" in value
+
+
+def compress_text(text):
+    """Compress text for storage, leaving short strings as they are"""
+    if not isinstance(text, str) or len(text) < TEXT_COMPRESSION_MIN_CHARS:
+        return text
+    return {
+        "codec": CODEC_ZLIB,
+        "version": FORMAT_VERSION,
+        "data": Binary(zlib.compress(text.encode('utf-8'), TEXT_COMPRESSION_LEVEL)),
+        "length": len(text)
+    }
+
+
+def decompress_text(value):
+    """Return the text of a stored value, whether compressed or plain"""
+    if not is_compressed(value):
+        return value
+    if value["codec"] != CODEC_ZLIB:
+        raise ValueError(f"Unsupported text codec: {value['codec']}")
+    return zlib.decompress(value["data"]).decode('utf-8')
+
+
+def search_terms(text):
+    """
+    Distinct lowercase words of a text.
+
+    Compressed text cannot be covered by a MongoDB text index, so this much
+    smaller vocabulary is indexed in its place.
+    """
+    return " ".join(sorted(set(WORD.findall(text.lower()))))
+
+
+def migrate_compress_text(batch_size=100):
+    """
+    Compress plain-string text already stored in MongoDB.
+
+    Covers document_content.extracted_text (also adding search_terms),
+    translations.translated_text and extraction_cache.text.
+
+    Returns:
+        dict: Number of records updated per collection
+    """
+    db = get_database()
+    targets = (
+        (db.document_content, "extracted_text"),
+        (db.translations, "translated_text"),
+        (db.extraction_cache, "text")
+    )
+    counts = {}
+
+    for collection, field in targets:
+        counts[collection.name] = 0
+        records = collection.find({field: {"$type": "string"}}, {field: 1, "search_terms": 1}, batch_size=batch_size)
+        for record in records:
+            text = record[field]
+            update = {}
+
+            stored = compress_text(text)
+            if stored is not text:
+                update[field] = stored
+                if collection.name == "extraction_cache":
+                    update["size"] = len(stored["data"])
+            if collection.name == "document_content" and "search_terms" not in record:
+                update["search_terms"] = search_terms(text)
+
+            if update:
+                collection.update_one({"_id": record["_id"]}, {"$set": update})
+                counts[collection.name] += 1
+        print(f"Updated {counts[collection.name]} records in {collection.name}")
+
+    # Entry sizes changed; bring the cache's running total up to date
+    from app.services.extraction_cache import recount_total
+    recount_total()
+
+    return counts
+
+
+if __name__ == '__main__':
+    # python -m app.services.text_compression migrate
+    if len(sys.argv) > 1 and sys.argv[1] == 'migrate':
+        print(f"Done. {migrate_compress_text()}")
+    else:
+        print("Usage: python -m app.services.text_compression migrate")
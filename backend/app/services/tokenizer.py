@@ -0,0 +1,172 @@
+# backend/app/services/tokenizer.py
+
+import math
+import re
+import threading
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+DEFAULT_ENCODING = "cl100k_base"
+
+# Texts up to this size (paragraphs, prompts) have their counts cached
+CACHEABLE_CHARS = 16 * 1024
+
+# Chat formatting adds a few tokens around every message and the reply
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+# Pre-tokenizer similar to cl100k_base's, used to approximate counts when
+# tiktoken or its encoding files are not available. Like cl100k_base it keeps
+# a run of blank lines in one piece, so paragraphs joined with "\n\n" count
+# the same as apart
+APPROXIMATE_PIECE = re.compile(
+    r"'(?:[sdmt]|ll|ve|re)| ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+",
+    re.IGNORECASE
+)
+
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+
+def get_encoding(model=DEFAULT_MODEL):
+    """
+    Return the tiktoken encoding for a model, or None if it cannot be loaded.
+
+    tiktoken downloads encoding files on first use (set TIKTOKEN_CACHE_DIR
+    to ship them with the deployment); without them counts are approximated.
+    """
+    with _encodings_lock:
+        if model in _encodings:
+            return _encodings[model]
+
+        encoding = None
+        if tiktoken is not None:
+            try:
+                try:
+                    encoding = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    encoding = tiktoken.get_encoding(DEFAULT_ENCODING)
+            except Exception as e:
+                print(f"Could not load tokenizer for {model}, approximating token counts: {str(e)}")
+        _encodings[model] = encoding
+        return encoding
+
+
+def _approximate_pieces(text):
+    # Long words are split into several tokens by BPE; assume ~4 chars each
+    return [max(1, math.ceil(len(piece.strip() or piece) / 4)) for piece in APPROXIMATE_PIECE.findall(text)]
+
+
+@lru_cache(maxsize=8192)
+def _cached_count(model, text):
+    encoding = get_encoding(model)
+    if encoding is None:
+        return sum(_approximate_pieces(text))
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_tokens(text, model=DEFAULT_MODEL):
+    """Count the tokens text takes up for a model"""
+    if not text:
+        return 0
+    if len(text) <= CACHEABLE_CHARS:
+        return _cached_count(model, text)
+
+    encoding = get_encoding(model)
+    if encoding is None:
+        return sum(_approximate_pieces(text))
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages, model=DEFAULT_MODEL):
+    """Count the prompt tokens of a list of chat messages"""
+    total = TOKENS_PER_REPLY
+    for message in messages:
+        total += TOKENS_PER_MESSAGE
+        total += count_tokens(message.get("content") or "", model)
+        total += count_tokens(message.get("role") or "", model)
+    return total
+
+
+def truncate_to_tokens(text, max_tokens, model=DEFAULT_MODEL):
+    """Return the longest prefix of text that fits in max_tokens"""
+    if max_tokens <= 0 or not text:
+        return ""
+
+    encoding = get_encoding(model)
+    if encoding is None:
+        used = 0
+        end = 0
+        for piece in APPROXIMATE_PIECE.finditer(text):
+            size = max(1, math.ceil(len(piece.group().strip() or piece.group()) / 4))
+            if used + size > max_tokens:
+                break
+            used += size
+            end = piece.end()
+        return text[:end]
+
+    # Only encode as much of the text as could possibly be needed
+    window = max_tokens * 8
+    while True:
+        tokens = encoding.encode(text[:window], disallowed_special=())
+        if len(tokens) > max_tokens or window >= len(text):
+            break
+        window *= 2
+    if len(tokens) <= max_tokens:
+        return text[:window]
+    # A cut through a multi-byte character decodes to U+FFFD; drop whole
+    # tokens until the decoded text is a real prefix again
+    tokens = tokens[:max_tokens]
+    while tokens:
+        prefix = encoding.decode(tokens)
+        if text.startswith(prefix):
+            return prefix
+        tokens.pop()
+    return ""
+
+
+class TokenBudget:
+    """
+    Tracks how many tokens are left while a prompt is assembled.
+
+    Parts are counted separately. Parts joined at whitespace, such as
+    paragraphs ending in a blank line, normally count the same joined as
+    apart, but neither BPE nor the approximation guarantees it: the joined
+    text may come out a token or so off the budget.
+    """
+
+    def __init__(self, max_tokens, model=DEFAULT_MODEL):
+        self.max_tokens = max_tokens
+        self.model = model
+        self.remaining = max_tokens
+
+    @property
+    def used(self):
+        return self.max_tokens - self.remaining
+
+    @property
+    def exhausted(self):
+        return self.remaining <= 0
+
+    def fits(self, text):
+        return count_tokens(text, self.model) <= self.remaining
+
+    def add(self, text):
+        """Reserve room for text if it fits whole; returns whether it did"""
+        size = count_tokens(text, self.model)
+        if size > self.remaining:
+            return False
+        self.remaining -= size
+        return True
+
+    def take_prefix(self, text, max_tokens=None):
+        """Reserve and return as much of the start of text as fits"""
+        limit = self.remaining if max_tokens is None else min(max_tokens, self.remaining)
+        prefix = truncate_to_tokens(text, limit, self.model)
+        self.remaining -= count_tokens(prefix, self.model)
+        return prefix
@@ -6,7 +6,10 @@ from app.config.database import get_database
 from bson import ObjectId
 from datetime import datetime
 import json
-from app.services.ai_processor import safe_openai_call
+from app.services.ai_processor import safe_openai_call, async_openai_call, stream_openai_call, format_text_stream
+from app.services.llm_client import gather_sync, submit
+from app.services.content_store import METADATA_PROJECTION, get_document_text
+from app.services.text_compression import compress_text, decompress_text
 
 db = get_database()
 
@@ -54,7 +57,8 @@ TEXT:
             ],
             max_tokens=10,
             expected_format='text',
-            default_result="en"  # Default to English if detection fails
+            default_result="en",  # Default to English if detection fails
+            feature="language_detection"
         )
         
         # Clean up response to ensure it's just a language code
@@ -69,14 +73,21 @@ TEXT:
             
         return lang_code
     
-    def translate_document(self, document_id, target_language="en"):
-        """Translate a document to the target language"""
-        document = db.documents.find_one({"_id": ObjectId(document_id)})
-        if not document or "extracted_text" not in document:
-            return {"error": "Document not found or text extraction failed"}
+    def _prepare_translation(self, document_id, target_language):
+        """
+        Work out what translating a document involves
+        
+        Returns:
+            (result, None, None) if no API calls are needed, otherwise
+            (None, source_language, chunk_requests) with one async_openai_call
+            argument dict per chunk
+        """
+        document = db.documents.find_one({"_id": ObjectId(document_id)}, METADATA_PROJECTION)
         
         # Get document text
-        original_text = document.get("extracted_text", "")
+        original_text = get_document_text(ObjectId(document_id)) if document else None
+        if original_text is None:
+            return {"error": "Document not found or text extraction failed"}, None, None
         
         # Detect source language if not already in metadata
         source_language = document.get("detected_language")
@@ -96,7 +107,7 @@ TEXT:
                 "translated_text": original_text,
                 "source_language": source_language,
                 "target_language": target_language
-            }
+            }, None, None
         
         # Check if we already have this translation cached
         existing_translation = db.translations.find_one({
@@ -107,39 +118,44 @@ TEXT:
         if existing_translation and "translated_text" in existing_translation:
             return {
                 "message": "Retrieved cached translation",
-                "translated_text": existing_translation["translated_text"],
+                "translated_text": decompress_text(existing_translation["translated_text"]),
                 "source_language": source_language,
                 "target_language": target_language
-            }
+            }, None, None
         
         # For long documents, split into chunks for translation
         max_chunk_size = 4000  # Characters
         chunks = [original_text[i:i+max_chunk_size] for i in range(0, len(original_text), max_chunk_size)]
         
-        translated_chunks = []
+        source_name = self.supported_languages.get(source_language, source_language)
+        target_name = self.supported_languages.get(target_language, target_language)
+        
+        chunk_requests = []
         for i, chunk in enumerate(chunks):
             # Skip empty chunks
             if not chunk.strip():
                 continue
                 
-            prompt = f"""Translate the following text from {self.supported_languages.get(source_language, source_language)} to {self.supported_languages.get(target_language, target_language)}. Maintain formatting, legal terminology, and structure as much as possible:
+            prompt = f"""Translate the following text from {source_name} to {target_name}. Maintain formatting, legal terminology, and structure as much as possible:
 
 {chunk}
 """
             
-            translated_chunk = safe_openai_call(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": f"You are a professional legal translator from {self.supported_languages.get(source_language, source_language)} to {self.supported_languages.get(target_language, target_language)}."},
+            chunk_requests.append({
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": f"You are a professional legal translator from {source_name} to {target_name}."},
                     {"role": "user", "content": prompt}
                 ],
-                max_tokens=4000,
-                expected_format='text',
-                default_result=f"[Translation error for chunk {i+1}]"
-            )
-            
-            translated_chunks.append(translated_chunk)
+                "max_tokens": 4000,
+                "expected_format": 'text',
+                "default_result": f"[Translation error for chunk {i+1}]",
+                "feature": "document_translation"
+            })
         
+        return None, source_language, chunk_requests
+    
+    def _save_translation(self, document_id, source_language, target_language, translated_chunks):
         # Combine all translated chunks
         translated_text = "\n".join(translated_chunks)
         
@@ -148,7 +164,7 @@ TEXT:
             "document_id": ObjectId(document_id),
             "source_language": source_language,
             "target_language": target_language,
-            "translated_text": translated_text,
+            "translated_text": compress_text(translated_text),
             "created_at": datetime.utcnow()
         }
         
@@ -169,6 +185,69 @@ TEXT:
             "target_language": target_language
         }
     
+    def translate_document(self, document_id, target_language="en"):
+        """Translate a document to the target language"""
+        result, source_language, chunk_requests = self._prepare_translation(document_id, target_language)
+        if result is not None:
+            return result
+        
+        # Translate all chunks concurrently; results keep the chunk order
+        translated_chunks = gather_sync(async_openai_call(**request) for request in chunk_requests)
+        
+        return self._save_translation(document_id, source_language, target_language, translated_chunks)
+    
+    def stream_document_translation(self, document_id, target_language="en"):
+        """
+        Translate a document to the target language, streaming the text
+        
+        The first chunk is streamed as it is translated while the remaining
+        chunks are translated concurrently in the background; each of those
+        is sent whole, in order, once the text before it has been sent.
+        
+        Yields:
+            ("delta", {"text": ...}) pieces of the translation, then
+            ("result", translation) once it has been saved
+        """
+        result, source_language, chunk_requests = self._prepare_translation(document_id, target_language)
+        if result is not None:
+            if "error" in result:
+                yield "error", {"message": result["error"]}
+            else:
+                yield "result", result
+            return
+        
+        if not chunk_requests:
+            yield "result", self._save_translation(document_id, source_language, target_language, [])
+            return
+        
+        first, rest = chunk_requests[0], chunk_requests[1:]
+        pending = [submit(async_openai_call(**request)) for request in rest]
+        
+        try:
+            parts = []
+            # Cleaned as it streams, like the chunks formatted whole below
+            for text in format_text_stream(stream_openai_call(
+                model=first["model"],
+                messages=first["messages"],
+                max_tokens=first["max_tokens"],
+                expected_format=first["expected_format"],
+                feature=first["feature"]
+            )):
+                parts.append(text)
+                yield "delta", {"text": text}
+            translated_chunks = ["".join(parts)]
+            
+            for future in pending:
+                translated_chunk = future.result()
+                translated_chunks.append(translated_chunk)
+                yield "delta", {"text": "\n" + translated_chunk}
+        finally:
+            # Stop background chunks if the client went away
+            for future in pending:
+                future.cancel()
+        
+        yield "result", self._save_translation(document_id, source_language, target_language, translated_chunks)
+    
     def translate_search_query(self, query, target_languages=None):
         """Translate a search query to multiple languages for cross-language search"""
         if not target_languages:
@@ -179,6 +258,8 @@ TEXT:
         source_language = self.detect_language(query)
         
         translations = {}
+        pending = []
+        calls = []
         for lang in target_languages:
             # Skip translation if language is the same as source
             if lang == source_language:
@@ -192,7 +273,8 @@ TEXT:
 Provide only the translated text.
 """
             
-            translated_query = safe_openai_call(
+            pending.append(lang)
+            calls.append(async_openai_call(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "You are a search query translator. Provide only the translated query."},
@@ -200,9 +282,12 @@ Provide only the translated text.
                 ],
                 max_tokens=100,
                 expected_format='text',
-                default_result=query  # If translation fails, use original query
-            )
-            
+                default_result=query,  # If translation fails, use original query
+                feature="query_translation"
+            ))
+        
+        # Translate into all languages concurrently
+        for lang, translated_query in zip(pending, gather_sync(calls)):
             translations[lang] = translated_query.strip()
         
         return {
@@ -0,0 +1,37 @@
+# backend/app/utils/sse.py
+
+import json
+from flask import Response, stream_with_context
+
+
+def sse_event(event, data):
+    """Format one server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def sse_response(events):
+    """
+    Stream (event, data) pairs to the client as server-sent events.
+
+    An exception raised by the generator is reported as a final "error"
+    event, since the status code has already been sent by then.
+    """
+    def generate():
+        # Sent at once so the client sees the stream open immediately
+        yield ": stream open\n\n"
+        try:
+            for event, data in events:
+                yield sse_event(event, data)
+        except Exception as e:
+            print(f"Error while streaming response: {str(e)}")
+            yield sse_event("error", {"message": str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            # Stop reverse proxies from buffering the stream
+            'X-Accel-Buffering': 'no'
+        }
+    )
@@ -0,0 +1,178 @@
+# backend/loadtest/fixtures.py
+
+import json
+
+# Canned responses for each prompt family the backend sends, matched on a
+# fragment of the system prompt. JSON fixtures follow the keys each prompt
+# asks for, so callers parse them exactly as they would a real response.
+FIXTURES = [
+    {
+        "name": "document_analysis",
+        "match": "summarizes, extracts key information from and classifies",
+        "response": {
+            "summary": "Mutual non-disclosure agreement between Acme Corporation and Beta Industries LLC, effective January 1, 2025, for a term of two years. Both parties must keep shared confidential information secret and use it only to evaluate a business relationship. Either party may terminate with 30 days written notice.",
+            "key_info": {
+                "Parties": "Acme Corporation and Beta Industries LLC",
+                "Effective Date": "January 1, 2025",
+                "Term/Duration": "Two years",
+                "Governing Law": "State of Delaware",
+                "Key Payment Terms": "Not specified"
+            },
+            "category": "NDA"
+        }
+    },
+    {
+        "name": "summary",
+        "match": "creates concise summaries",
+        "response": "Mutual non-disclosure agreement between Acme Corporation and Beta Industries LLC, effective January 1, 2025, for two years. Both parties must protect shared confidential information. Either party may terminate with 30 days written notice."
+    },
+    {
+        "name": "key_info",
+        "match": "extracts specific key information",
+        "response": {
+            "Parties": "Acme Corporation and Beta Industries LLC",
+            "Effective Date": "January 1, 2025",
+            "Term/Duration": "Two years",
+            "Governing Law": "State of Delaware",
+            "Key Payment Terms": "Not specified"
+        }
+    },
+    {
+        "name": "category",
+        "match": "legal document classifier",
+        "response": "NDA"
+    },
+    {
+        "name": "field_suggestion",
+        "match": "contract drafting assistant",
+        "response": "Acme Corporation"
+    },
+    {
+        "name": "contract_analysis",
+        "match": "insights for improving contracts",
+        "response": {
+            "issues": ["No limitation of liability clause", "Termination notice period is not defined"],
+            "suggestions": ["Add a mutual limitation of liability", "State a 30 day termination notice period"],
+            "overall_assessment": "Generally complete with a few gaps in risk allocation.",
+            "completeness_score": 7
+        }
+    },
+    {
+        "name": "template_recommendation",
+        "match": "recommend appropriate contract templates",
+        "response": {
+            "recommended_template": "nda",
+            "confidence": 0.9,
+            "reason": "The requirements describe sharing confidential information between two companies."
+        }
+    },
+    {
+        "name": "risk_assessment",
+        "match": "contract analysis and risk assessment",
+        "response": {
+            "risk_summary": "Moderate overall risk, mainly from broad confidentiality definitions and missing liability caps.",
+            "risk_score": 5,
+            "identified_risks": [
+                {
+                    "clause": "Definition of Confidential Information",
+                    "issue": "Definition is broad and has no standard exclusions.",
+                    "recommendation": "Exclude publicly available and independently developed information.",
+                    "risk_score": 6
+                },
+                {
+                    "clause": "Remedies",
+                    "issue": "No cap on damages.",
+                    "recommendation": "Add a mutual limitation of liability.",
+                    "risk_score": 5
+                }
+            ],
+            "missing_elements": ["Limitation of liability", "Return of materials"]
+        }
+    },
+    {
+        "name": "clause_recommendations",
+        "match": "contract drafting and improvement",
+        "response": {
+            "improvement_summary": "Tighten definitions and add standard exclusions.",
+            "clause_improvements": [
+                {
+                    "original_text": "Confidential Information means all information disclosed by either party.",
+                    "issues": "Overly broad definition.",
+                    "suggestions": "Add exclusions for public and independently developed information.",
+                    "improved_text": "Confidential Information means non-public information disclosed by either party, excluding information that is publicly available or independently developed."
+                }
+            ]
+        }
+    },
+    {
+        "name": "precedent_matching",
+        "match": "case law and legal precedents",
+        "response": {
+            "legal_issues": ["Scope of confidentiality obligations", "Enforceability of injunctive relief"],
+            "relevant_precedents": [
+                {
+                    "case_name": "Example Corp. v. Sample Inc.",
+                    "jurisdiction": "Delaware",
+                    "year": "2015",
+                    "summary": "Court enforced a mutual NDA with a broad confidentiality definition.",
+                    "relevance": "Addresses scope of confidential information."
+                }
+            ],
+            "applicable_statutes": [
+                {"name": "Defend Trade Secrets Act", "jurisdiction": "United States", "relevance": "Protection of trade secrets"}
+            ]
+        }
+    },
+    {
+        "name": "compliance_check",
+        "match": "regulatory compliance",
+        "response": {
+            "compliance_summary": "Largely compliant; data protection terms should be expanded.",
+            "jurisdiction": "Delaware, United States",
+            "regulations": [
+                {"name": "Defend Trade Secrets Act", "compliance_status": True, "issues": "None"},
+                {"name": "GDPR", "compliance_status": False, "issues": "No data processing terms for personal data"}
+            ],
+            "required_actions": ["Add data processing terms if personal data is shared"]
+        }
+    },
+    {
+        "name": "language_detection",
+        "match": "language identification tool",
+        "response": "de"
+    },
+    {
+        "name": "document_translation",
+        "match": "professional legal translator",
+        "response": "This Non-Disclosure Agreement is entered into between Acme Corporation and Beta Industries LLC. Both parties agree to keep all confidential information strictly secret."
+    },
+    {
+        "name": "query_translation",
+        "match": "search query translator",
+        "response": "confidentiality agreement"
+    }
+]
+
+DEFAULT_RESPONSE = "OK"
+
+
+def find_fixture(messages):
+    """Return the fixture for a list of chat messages, or None if no family matches"""
+    system_prompt = " ".join(
+        message.get("content") or "" for message in messages if message.get("role") == "system"
+    )
+    for fixture in FIXTURES:
+        if fixture["match"] in system_prompt:
+            return fixture
+    return None
+
+
+def response_text(messages):
+    """Return (family name, response text) for a list of chat messages"""
+    fixture = find_fixture(messages)
+    if fixture is None:
+        return "unknown", DEFAULT_RESPONSE
+    response = fixture["response"]
+    if isinstance(response, str):
+        return fixture["name"], response
+    return fixture["name"], json.dumps(response)
@@ -0,0 +1,250 @@
+# backend/loadtest/harness.py
+"""
+Load-test harness for the Flask API.
+
+Signs in a load-test user, uploads sample documents, then drives the chosen
+endpoints from concurrent clients for a fixed time and reports latency
+percentiles and throughput per endpoint. Run it against a backend that uses
+a local mongod and the stub OpenAI server:
+
+    python -m loadtest.stub_server --port 8001
+    MONGODB_URI=mongodb://localhost:27017/legalassistant \\
+        OPENAI_BASE_URL=http://localhost:8001/v1 OPENAI_API_KEY=stub python app.py
+    python -m loadtest.harness --concurrency 16 --duration 60 --stub-url http://localhost:8001
+
+Each sample document gets a unique nonce, so with --documents N the first N
+calls per endpoint miss the LLM cache; set LLM_CACHE_ENABLED=false on the
+backend to measure uncached calls only.
+"""
+
+import argparse
+import math
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+import httpx
+
+SAMPLE_DOCUMENT = """NON-DISCLOSURE AGREEMENT
+
+This Non-Disclosure Agreement (the "Agreement") is entered into as of January 1, 2025 (the "Effective Date") by and between Acme Corporation, a Delaware corporation ("Acme"), and Beta Industries LLC, a California limited liability company ("Beta").
+
+1. Definition of Confidential Information. "Confidential Information" means all non-public business, technical and financial information disclosed by either party to the other, whether orally or in writing.
+
+2. Obligations. The receiving party shall hold Confidential Information in strict confidence and use it solely to evaluate a potential business relationship between the parties.
+
+3. Term. This Agreement remains in effect for two (2) years from the Effective Date. Either party may terminate this Agreement with thirty (30) days written notice.
+
+4. Return of Materials. Upon termination, the receiving party shall return or destroy all Confidential Information.
+
+5. Governing Law. This Agreement is governed by the laws of the State of Delaware.
+
+6. Remedies. The disclosing party is entitled to seek injunctive relief for any breach of this Agreement.
+
+Reference: {nonce}
+"""
+
+# name -> (method, path, JSON body, streams server-sent events)
+ENDPOINTS = {
+    "list_documents": ("GET", "/documents/", None, False),
+    "search": ("GET", "/search?q=confidential", None, False),
+    "summarize": ("POST", "/documents/{document_id}/summarize", {}, False),
+    "extract_info": ("POST", "/documents/{document_id}/extract-info", {}, False),
+    "suggest_category": ("POST", "/documents/{document_id}/suggest-category", {}, False),
+    "analyze": ("POST", "/documents/{document_id}/analyze", {}, False),
+    "risk_assessment": ("POST", "/advanced-analysis/risk-assessment/{document_id}", {}, False),
+    "risk_assessment_stream": ("POST", "/advanced-analysis/risk-assessment/{document_id}/stream", {}, True),
+    "clause_recommendations": ("POST", "/advanced-analysis/clause-recommendations/{document_id}", {}, False),
+    "precedent_matching": ("POST", "/advanced-analysis/precedent-matching/{document_id}", {}, False),
+    "compliance_check": ("POST", "/advanced-analysis/compliance-check/{document_id}", {}, False),
+    "translate_document": ("POST", "/translation/document/{document_id}", {"target_language": "fr"}, False),
+    "translate_document_stream": ("POST", "/translation/document/{document_id}/stream", {"target_language": "fr"}, True),
+    "detect_language": ("POST", "/translation/detect", {"text": "Dieser Vertrag wird zwischen den Parteien geschlossen."}, False),
+    "translate_query": ("POST", "/translation/search-query", {"query": "Geheimhaltungsvereinbarung", "target_languages": ["en", "fr"]}, False),
+    "suggest_fields": ("POST", "/contracts/template/nda/suggest-fields", {"context": {}}, False),
+    "recommend_template": ("POST", "/contracts/recommend-template", {"requirements": "We need to share confidential designs with a supplier."}, False)
+}
+
+DEFAULT_ENDPOINTS = [
+    "summarize", "extract_info", "suggest_category", "analyze", "risk_assessment",
+    "risk_assessment_stream", "compliance_check", "translate_document_stream", "list_documents"
+]
+
+
+def percentile(values, share):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(share * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Results:
+    """Latencies and failures per endpoint, shared by the client threads"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.first_event = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint, status, latency, first_event=None):
+        with self.lock:
+            self.statuses[endpoint][status] += 1
+            if status is None or status >= 400:
+                self.errors[endpoint] += 1
+                return
+            self.latencies[endpoint].append(latency)
+            if first_event is not None:
+                self.first_event[endpoint].append(first_event)
+
+
+def sign_in(client, email, password):
+    client.post("/auth/register", json={"name": "Load Test", "email": email, "password": password})
+    response = client.post("/auth/login", json={"email": email, "password": password})
+    response.raise_for_status()
+    return response.json()["token"]
+
+
+def upload_documents(client, count, timeout=120):
+    """Upload count distinct sample documents and wait until their text is extracted"""
+    document_ids = []
+    for _ in range(count):
+        text = SAMPLE_DOCUMENT.format(nonce=uuid.uuid4().hex)
+        response = client.post(
+            "/documents/",
+            files={"file": (f"loadtest_{uuid.uuid4().hex[:8]}.txt", text.encode("utf-8"), "text/plain")},
+            data={"category": "Uncategorized"}
+        )
+        response.raise_for_status()
+        upload = response.json()
+        document_ids.append(upload["document_id"])
+
+        job_id = upload.get("job_id")
+        deadline = time.time() + timeout
+        while job_id and time.time() < deadline:
+            job = client.get(f"/documents/jobs/{job_id}").json().get("job", {})
+            if job.get("status") == "extracted":
+                break
+            if job.get("status") == "failed":
+                raise RuntimeError(f"Extraction failed for {upload['document_id']}")
+            time.sleep(0.5)
+    return document_ids
+
+
+def call_endpoint(client, name, document_id):
+    """Make one request; returns (status, seconds, seconds to first streamed event)"""
+    method, path, body, streams = ENDPOINTS[name]
+    path = path.format(document_id=document_id)
+    start = time.perf_counter()
+
+    if not streams:
+        response = client.request(method, path, json=body)
+        return response.status_code, time.perf_counter() - start, None
+
+    first_event = None
+    failed = False
+    with client.stream(method, path, json=body, headers={"Accept": "text/event-stream"}) as response:
+        for line in response.iter_lines():
+            if line.startswith("event: "):
+                if first_event is None and line != "event: result":
+                    first_event = time.perf_counter() - start
+                if line == "event: error":
+                    failed = True
+        status = 500 if failed else response.status_code
+    return status, time.perf_counter() - start, first_event
+
+
+def run_client(base_url, token, endpoints, document_ids, deadline, results, request_timeout):
+    with httpx.Client(base_url=base_url, headers={"Authorization": f"Bearer {token}"},
+                      timeout=request_timeout) as client:
+        while time.time() < deadline:
+            name = random.choice(endpoints)
+            try:
+                status, latency, first_event = call_endpoint(client, name, random.choice(document_ids))
+            except httpx.HTTPError as e:
+                print(f"Request to {name} failed: {str(e)}")
+                status, latency, first_event = None, 0.0, None
+            results.record(name, status, latency, first_event)
+
+
+def print_report(results, elapsed):
+    print()
+    print(f"{'endpoint':<28}{'ok':>7}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'first ms':>10}{'req/s':>9}")
+    total = 0
+    for name in sorted(set(results.statuses)):
+        latencies = results.latencies[name]
+        first = results.first_event[name]
+        total += len(latencies) + results.errors[name]
+        print(
+            f"{name:<28}{len(latencies):>7}{results.errors[name]:>6}"
+            f"{percentile(latencies, 0.50) * 1000:>10.0f}"
+            f"{percentile(latencies, 0.95) * 1000:>10.0f}"
+            f"{percentile(latencies, 0.99) * 1000:>10.0f}"
+            f"{(percentile(first, 0.50) * 1000 if first else 0):>10.0f}"
+            f"{len(latencies) / elapsed:>9.2f}"
+        )
+    print(f"\n{total} requests in {elapsed:.1f}s ({total / elapsed:.2f} req/s)")
+    for name in sorted(results.statuses):
+        failures = {status: n for status, n in results.statuses[name].items() if status is None or status >= 400}
+        if failures:
+            print(f"  {name} failures by status: {failures}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Flask API")
+    parser.add_argument("--base-url", default="http://localhost:5000/api")
+    parser.add_argument("--stub-url", help="Stub OpenAI server, to report the calls it received")
+    parser.add_argument("--email", default="loadtest@example.com")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--documents", type=int, default=4, help="Distinct sample documents to upload")
+    parser.add_argument("--endpoints", default=",".join(DEFAULT_ENDPOINTS),
+                        help=f"Comma-separated subset of: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--request-timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    endpoints = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = [name for name in endpoints if name not in ENDPOINTS]
+    if unknown:
+        parser.error(f"Unknown endpoints: {', '.join(unknown)}")
+
+    with httpx.Client(base_url=args.base_url, timeout=args.request_timeout) as client:
+        token = sign_in(client, args.email, args.password)
+        client.headers["Authorization"] = f"Bearer {token}"
+        print(f"Uploading {args.documents} sample documents...")
+        document_ids = upload_documents(client, args.documents)
+
+    if args.stub_url:
+        httpx.delete(f"{args.stub_url}/stats")
+
+    print(f"Running {args.concurrency} clients for {args.duration:.0f}s against {', '.join(endpoints)}")
+    results = Results()
+    start = time.time()
+    deadline = start + args.duration
+    threads = [
+        threading.Thread(
+            target=run_client,
+            args=(args.base_url, token, endpoints, document_ids, deadline, results, args.request_timeout)
+        )
+        for _ in range(args.concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print_report(results, time.time() - start)
+
+    if args.stub_url:
+        print("\nStub server calls:")
+        for name, n in sorted(httpx.get(f"{args.stub_url}/stats").json().items()):
+            print(f"  {name}: {n}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+# backend/loadtest/stub_server.py
+"""
+OpenAI-compatible stand-in for load testing without calling OpenAI.
+
+Serves POST /v1/chat/completions (plain and streaming) with canned responses
+from loadtest/fixtures.py, after a latency drawn from a configurable
+distribution, and can answer a share of requests with 429 or 500 errors.
+
+Run it and point the backend at it:
+
+    python -m loadtest.stub_server --port 8001 --latency lognormal:0.8,0.5 --rate-limit-share 0.02
+    OPENAI_BASE_URL=http://localhost:8001/v1 OPENAI_API_KEY=stub python app.py
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from flask import Flask, Response, jsonify, request
+from loadtest.fixtures import response_text
+
+# Characters sent per streamed chunk, roughly one token
+STREAM_CHUNK_CHARS = 4
+
+
+class LatencyDistribution:
+    """
+    Time to first token, parsed from "<kind>:<params>":
+
+        fixed:SECONDS
+        uniform:LOW,HIGH
+        normal:MEAN,STDDEV
+        lognormal:MEDIAN,SIGMA
+    """
+
+    def __init__(self, spec):
+        kind, _, params = spec.partition(":")
+        self.kind = kind
+        self.params = [float(value) for value in params.split(",") if value]
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if kind not in expected or len(self.params) != expected[kind]:
+            raise ValueError(f"Invalid latency distribution: {spec}")
+
+    def sample(self):
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return random.uniform(*self.params)
+        if self.kind == "normal":
+            return max(0.0, random.gauss(*self.params))
+        median, sigma = self.params
+        return random.lognormvariate(math.log(median), sigma)
+
+
+def _usage(messages, text):
+    # About four characters per token is close enough for a stand-in
+    prompt_tokens = sum(len(message.get("content") or "") for message in messages) // 4 + 1
+    completion_tokens = len(text) // 4 + 1
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+
+def create_stub_app(latency, token_delay=0.0, rate_limit_share=0.0, error_share=0.0, retry_after=1.0):
+    """
+    Build the stub server app.
+
+    Args:
+        latency: LatencyDistribution for the time before the first token
+        token_delay: Seconds between streamed chunks
+        rate_limit_share: Share of requests answered with 429
+        error_share: Share of requests answered with 500
+        retry_after: Retry-After seconds sent with 429 responses
+    """
+    app = Flask(__name__)
+    stats = Counter()
+    stats_lock = threading.Lock()
+
+    def count(name):
+        with stats_lock:
+            stats[name] += 1
+
+    @app.route('/v1/chat/completions', methods=['POST'])
+    def chat_completions():
+        body = request.get_json(force=True)
+        messages = body.get("messages", [])
+        model = body.get("model", "gpt-3.5-turbo")
+        family, text = response_text(messages)
+        count(f"requests.{family}")
+
+        roll = random.random()
+        if roll < rate_limit_share:
+            count("responses.429")
+            response = jsonify({"error": {
+                "message": "Rate limit reached (stub server)",
+                "type": "requests",
+                "code": "rate_limit_exceeded"
+            }})
+            response.status_code = 429
+            response.headers["Retry-After"] = str(retry_after)
+            return response
+        if roll < rate_limit_share + error_share:
+            count("responses.500")
+            response = jsonify({"error": {"message": "Internal error (stub server)", "type": "server_error"}})
+            response.status_code = 500
+            return response
+
+        time.sleep(latency.sample())
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        usage = _usage(messages, text)
+
+        if not body.get("stream"):
+            count("responses.200")
+            return jsonify({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            })
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        def chunk(delta, finish_reason=None):
+            return {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+
+        def generate():
+            yield f"data: {json.dumps(chunk({'role': 'assistant', 'content': ''}))}\n\n"
+            for start in range(0, len(text), STREAM_CHUNK_CHARS):
+                if token_delay:
+                    time.sleep(token_delay)
+                yield f"data: {json.dumps(chunk({'content': text[start:start + STREAM_CHUNK_CHARS]}))}\n\n"
+            yield f"data: {json.dumps(chunk({}, 'stop'))}\n\n"
+            if include_usage:
+                final = chunk({})
+                final["choices"] = []
+                final["usage"] = usage
+                yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        count("responses.200")
+        return Response(generate(), mimetype='text/event-stream')
+
+    @app.route('/stats', methods=['GET'])
+    def get_stats():
+        with stats_lock:
+            return jsonify(dict(stats))
+
+    @app.route('/stats', methods=['DELETE'])
+    def reset_stats():
+        with stats_lock:
+            stats.clear()
+        return jsonify({"message": "Stats reset"})
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server for load testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", default="lognormal:0.8,0.5",
+                        help="Time to first token: fixed:S, uniform:LO,HI, normal:MEAN,SD or lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--token-delay", type=float, default=0.01,
+                        help="Seconds between streamed chunks")
+    parser.add_argument("--rate-limit-share", type=float, default=0.0,
+                        help="Share of requests answered with 429 (0-1)")
+    parser.add_argument("--error-share", type=float, default=0.0,
+                        help="Share of requests answered with 500 (0-1)")
+    parser.add_argument("--retry-after", type=float, default=1.0,
+                        help="Retry-After seconds sent with 429 responses")
+    args = parser.parse_args()
+
+    app = create_stub_app(
+        LatencyDistribution(args.latency),
+        token_delay=args.token_delay,
+        rate_limit_share=args.rate_limit_share,
+        error_share=args.error_share,
+        retry_after=args.retry_after
+    )
+    print(f"Stub OpenAI server listening on http://{args.host}:{args.port}/v1")
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,7 +7,7 @@ import {
   Divider, Tabs, Tab
 } from '@mui/material';
 import TranslateIcon from '@mui/icons-material/Translate';
-import { getSupportedLanguages, translateDocument } from '../services/translation';
+import { getSupportedLanguages, streamDocumentTranslation } from '../services/translation';
 
 const DocumentTranslation = ({ documentId, documentText }) => {
   const [loading, setLoading] = useState(false);
@@ -49,7 +49,16 @@ const DocumentTranslation = ({ documentId, documentText }) => {
       console.log("Starting translation for document:", documentId);
       console.log("Target language:", selectedLanguage);
       
-      const result = await translateDocument(documentId, selectedLanguage);
+      // Show the translation as it streams in
+      setTranslatedText('');
+      let receivedText = false;
+      const result = await streamDocumentTranslation(documentId, selectedLanguage, (text) => {
+        setTranslatedText((current) => current + text);
+        if (!receivedText) {
+          receivedText = true;
+          setTabValue(1);
+        }
+      });
       console.log("Translation result:", result);
       
       if (!result.translated_text) {
@@ -8,20 +8,24 @@ import {
 } from '@mui/material';
 import ExpandMoreIcon from '@mui/icons-material/ExpandMore';
 import WarningIcon from '@mui/icons-material/Warning';
-import { assessContractRisks } from '../services/advancedAnalysis';
+import { streamContractRisks } from '../services/advancedAnalysis';
 
 const RiskAssessment = ({ documentId }) => {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
   const [riskData, setRiskData] = useState(null);
+  const [receivedChars, setReceivedChars] = useState(0);
   
   useEffect(() => {
     const loadRiskAssessment = async () => {
       setLoading(true);
       setError(null);
+      setReceivedChars(0);
       
       try {
-        const results = await assessContractRisks(documentId);
+        const results = await streamContractRisks(documentId, (text) => {
+          setReceivedChars((count) => count + text.length);
+        });
         setRiskData(results);
       } catch (err) {
         setError(err.message || "Failed to load risk assessment");
@@ -44,7 +48,9 @@ const RiskAssessment = ({ documentId }) => {
       <Box sx={{ display: 'flex', flexDirection: 'column', alignItems: 'center', py: 4 }}>
         <CircularProgress />
         <Typography variant="body1" sx={{ mt: 2 }}>
-          Analyzing contract for legal risks...
+          {receivedChars > 0
+            ? `Receiving risk assessment... (${receivedChars} characters)`
+            : 'Analyzing contract for legal risks...'}
         </Typography>
       </Box>
     );
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { suggestDocumentCategory } from '../services/api';
+import { analyzeDocument, waitForExtraction } from '../services/api';
 
 const DocumentUpload = () => {
   const [file, setFile] = useState(null);
@@ -104,7 +104,15 @@ const DocumentUpload = () => {
       if (useAutoCategory && response.document_id) {
         setSuggestingCategory(true);
         try {
-          const categoryResponse = await suggestDocumentCategory(response.document_id);
+          // Text is extracted in the background; wait for it before categorizing
+          if (response.job_id) {
+            const job = await waitForExtraction(response.job_id);
+            if (job.status === 'failed') {
+              throw new Error(job.error || 'Text extraction failed');
+            }
+          }
+          // One call also prepares the summary and key information
+          const categoryResponse = await analyzeDocument(response.document_id);
           setMessage(`Document uploaded successfully! AI suggested category: ${categoryResponse.category}`);
         } catch (categoryError) {
           console.error('Error suggesting category:', categoryError);
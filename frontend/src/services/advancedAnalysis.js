@@ -1,6 +1,6 @@
 // frontend/src/services/advancedAnalysis.js
 
-import api from './api';
+import api, { streamEvents } from './api';
 
 export const assessContractRisks = async (documentId) => {
   try {
@@ -11,6 +11,13 @@ export const assessContractRisks = async (documentId) => {
   }
 };
 
+// Streams the assessment; onText receives each piece of the response as it arrives
+export const streamContractRisks = async (documentId, onText) => {
+  return streamEvents(`/advanced-analysis/risk-assessment/${documentId}/stream`, {}, (event, data) => {
+    if (event === 'delta' && onText) onText(data.text);
+  });
+};
+
 export const getClauseRecommendations = async (documentId, clauseText = null) => {
   try {
     const response = await api.post(`/advanced-analysis/clause-recommendations/${documentId}`, 
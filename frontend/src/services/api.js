@@ -90,6 +90,48 @@ export const uploadDocument = async (formData) => {
   }
 };
 
+// Upload several files, or one ZIP archive, in a single request
+export const uploadDocumentBatch = async (files, category = 'Uncategorized') => {
+  try {
+    const formData = new FormData();
+    files.forEach((file) => formData.append('files', file));
+    formData.append('category', category);
+
+    const response = await api.post('/documents/batch', formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+    });
+    return response.data;
+  } catch (error) {
+    console.error('Error uploading document batch:', error);
+    throw error;
+  }
+};
+
+export const getExtractionJob = async (jobId) => {
+  try {
+    const response = await api.get(`/documents/jobs/${jobId}`);
+    return response.data.job;
+  } catch (error) {
+    console.error(`Error fetching extraction job ${jobId}:`, error);
+    throw error;
+  }
+};
+
+// Poll an extraction job until it finishes or the timeout elapses
+export const waitForExtraction = async (jobId, { intervalMs = 1000, timeoutMs = 120000 } = {}) => {
+  const deadline = Date.now() + timeoutMs;
+  while (Date.now() < deadline) {
+    const job = await getExtractionJob(jobId);
+    if (job.status === 'extracted' || job.status === 'failed') {
+      return job;
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+  throw new Error('Timed out waiting for text extraction');
+};
+
 export const deleteDocument = async (docId) => {
   try {
     const response = await api.delete(`/documents/${docId}`);
@@ -110,6 +152,17 @@ export const suggestDocumentCategory = async (docId) => {
   }
 };
 
+// Summary, key information and category in one request
+export const analyzeDocument = async (docId) => {
+  try {
+    const response = await api.post(`/documents/${docId}/analyze`);
+    return response.data;
+  } catch (error) {
+    console.error('Error analyzing document:', error);
+    throw error;
+  }
+};
+
 export const compareDocuments = async (documentIds) => {
   try {
     const response = await api.post('/documents/compare', { documentIds });
@@ -230,6 +283,57 @@ export const verifyToken = async () => {
   }
 };
 
+// POST to an endpoint that answers with server-sent events, calling
+// onEvent(event, data) for each one. Resolves with the data of the final
+// "result" event; an "error" event rejects.
+export const streamEvents = async (path, body, onEvent) => {
+  const token = localStorage.getItem('token');
+  const response = await fetch(`${api.defaults.baseURL}${path}`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'Accept': 'text/event-stream',
+      ...(token ? { Authorization: `Bearer ${token}` } : {}),
+    },
+    body: JSON.stringify(body || {}),
+  });
+  if (!response.ok) {
+    const data = await response.json().catch(() => ({}));
+    throw new Error(data.message || `Request failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let result = null;
+
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const block = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = 'message';
+      let data = '';
+      block.split('\n').forEach((line) => {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      });
+      if (!data) continue;
+
+      const payload = JSON.parse(data);
+      if (event === 'error') throw new Error(payload.message);
+      if (event === 'result') result = payload;
+      if (onEvent) onEvent(event, payload);
+    }
+  }
+  return result;
+};
+
 // Export both the axios instance methods and the service functions
 export default {
   // Core axios methods
@@ -246,6 +350,7 @@ export default {
   uploadDocument,
   deleteDocument,
   suggestDocumentCategory,
+  analyzeDocument,
   compareDocuments,
   generateContract,
   verifyToken,
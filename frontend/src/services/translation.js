@@ -1,6 +1,6 @@
 // frontend/src/services/translation.js
 
-import api from './api';
+import api, { streamEvents } from './api';
 
 export const getSupportedLanguages = async () => {
   try {
@@ -31,6 +31,15 @@ export const translateDocument = async (documentId, targetLanguage = 'en') => {
   }
 };
 
+// Streams the translation; onText receives each piece of text as it arrives
+export const streamDocumentTranslation = async (documentId, targetLanguage = 'en', onText) => {
+  return streamEvents(`/translation/document/${documentId}/stream`, {
+    target_language: targetLanguage
+  }, (event, data) => {
+    if (event === 'delta' && onText) onText(data.text);
+  });
+};
+
 export const translateSearchQuery = async (query, targetLanguages = null) => {
   try {
     const response = await api.post('/translation/search-query', {